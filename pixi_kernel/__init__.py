@@ -1,6 +1,14 @@
-from jupyter_server.serverapp import ServerApp
+from collections.abc import Coroutine
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
-from .handlers import setup_handlers
+if TYPE_CHECKING:
+    import asyncio
+
+    from jupyter_server.serverapp import ServerApp
+
+# Keep references to background tasks so they are not garbage collected while running
+_background_tasks: "set[asyncio.Task[None]]" = set()
 
 
 def _jupyter_labextension_paths() -> list[dict[str, str]]:
@@ -11,6 +19,66 @@ def _jupyter_server_extension_points() -> list[dict[str, str]]:
     return [{"module": "pixi_kernel"}]
 
 
-def _load_jupyter_server_extension(server_app: ServerApp) -> None:
+def _start_background_task(operation: str, coroutine: Coroutine[Any, Any, None]) -> None:
+    import asyncio
+
+    from .blocking import measure_blocking
+
+    task = asyncio.ensure_future(measure_blocking(operation, coroutine))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def _load_jupyter_server_extension(server_app: "ServerApp") -> None:
+    # Imported here, so that the fallback kernel, started with `python -m pixi_kernel`, doesn't
+    # pay for importing the Jupyter server
+    from .blocking import configure_blocking
+    from .compatibility import probe_pixi
+    from .config import load_config
+    from .handlers import setup_handlers
+    from .scheduler import configure_scheduler
+    from .store import configure_store
+    from .tracing import configure_tracing
+
     setup_handlers(server_app.web_app)
     server_app.log.info("Registered pixi_kernel server extension")
+
+    config = load_config(server_app.log)
+    configure_blocking(threads=config.fs_threads, timeout=config.fs_timeout)
+    configure_store(config.store_dir)
+    configure_scheduler(
+        concurrency=config.pixi_concurrency,
+        project_concurrency=config.pixi_project_concurrency,
+        queue_limit=config.pixi_queue_limit,
+    )
+    configure_tracing(trace_file=config.trace_file, opentelemetry=config.trace_opentelemetry)
+
+    # Run `pixi --version` now rather than when the first kernel is launched
+    server_app.io_loop.add_callback(
+        _start_background_task, "pixi-probe", probe_pixi(server_app.log)
+    )
+
+    if config.watch:
+        from .watcher import start_project_watcher
+
+        watcher = start_project_watcher(
+            poll_interval=config.watch_interval,
+            reinstall=config.watch_reinstall,
+            debounce=config.watch_debounce,
+            logger=server_app.log,
+            policy=config.launch_policy,
+        )
+        server_app.io_loop.add_callback(_start_background_task, "watch", watcher.run())
+
+    if config.warm_up:
+        from .warmup import warm_up_projects
+
+        warm_up = warm_up_projects(
+            Path(server_app.root_dir).expanduser(),
+            max_depth=config.warm_up_depth,
+            ignore=config.warm_up_ignore,
+            concurrency=config.warm_up_concurrency,
+            logger=server_app.log,
+            policy=config.launch_policy,
+        )
+        server_app.io_loop.add_callback(_start_background_task, "warm-up", warm_up)
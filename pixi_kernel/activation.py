@@ -0,0 +1,95 @@
+import logging
+from pathlib import Path
+
+import msgspec
+from returns.result import Failure, Result, Success
+
+from .blocking import run_blocking
+from .compatibility import run_pixi
+from .config import LOCKFILE_OPTIONS, LaunchPolicy
+from .fingerprint import ProjectFingerprint
+
+# Stored alongside the install state, see `install.INSTALL_STATE_FILE`
+ACTIVATION_STATE_FILE = Path("conda-meta") / "pixi-kernel-activation"
+
+
+class ShellHook(msgspec.Struct, frozen=True, kw_only=True):
+    environment_variables: dict[str, str]
+
+
+class ActivationState(msgspec.Struct, frozen=True, kw_only=True):
+    environment: str
+    fingerprint: ProjectFingerprint
+    # Activation prepends to the PATH it was run with, so it is only valid for that same PATH
+    base_path: str | None
+    environment_variables: dict[str, str]
+
+
+def _read_activation_state(prefix: str) -> ActivationState | None:
+    try:
+        content = (Path(prefix) / ACTIVATION_STATE_FILE).read_bytes()
+        return msgspec.json.decode(content, type=ActivationState)
+    except (OSError, msgspec.MsgspecError):
+        return None
+
+
+def _write_activation_state(prefix: str, state: ActivationState) -> None:
+    try:
+        (Path(prefix) / ACTIVATION_STATE_FILE).write_bytes(msgspec.json.encode(state))
+    except OSError:
+        pass
+
+
+async def get_activation_env(
+    *,
+    environment_name: str,
+    prefix: str,
+    fingerprint: ProjectFingerprint,
+    cwd: Path,
+    env: dict[str, str],
+    logger: logging.Logger,
+    policy: LaunchPolicy = "strict",
+) -> Result[dict[str, str], str]:
+    """Return the environment variables set by activating the Pixi environment.
+
+    The output of `pixi shell-hook --json` is persisted in the environment prefix and reused for as
+    long as the manifest, lockfile and base PATH stay the same. Only variables that differ from
+    `env` are returned.
+    """
+    base_path = env.get("PATH")
+    state = await run_blocking(_read_activation_state, prefix)
+    if (
+        state is not None
+        and state.environment == environment_name
+        and state.fingerprint == fingerprint
+        and state.base_path == base_path
+    ):
+        logger.info(f"Using cached activation for Pixi environment {environment_name}")
+        variables = state.environment_variables
+    else:
+        returncode, stdout, stderr = await run_pixi(
+            "shell-hook",
+            "--json",
+            *LOCKFILE_OPTIONS[policy],
+            "--environment",
+            environment_name,
+            cwd=cwd,
+            env=env,
+        )
+        if returncode != 0:
+            return Failure(f"Failed to run 'pixi shell-hook': {stderr}")
+
+        try:
+            variables = msgspec.json.decode(stdout, type=ShellHook).environment_variables
+        except msgspec.MsgspecError as exception:
+            return Failure(f"Failed to parse 'pixi shell-hook' output: {stdout}\n{exception}")
+
+        state = ActivationState(
+            environment=environment_name,
+            fingerprint=fingerprint,
+            base_path=base_path,
+            environment_variables=variables,
+        )
+        await run_blocking(_write_activation_state, prefix, state)
+
+    return Success({key: value for key, value in variables.items() if env.get(key) != value})
@@ -1,9 +1,24 @@
 import platform
+import re
 import subprocess
-from asyncio import SelectorEventLoop, create_subprocess_exec, get_running_loop
-from asyncio.subprocess import PIPE
+from asyncio import (
+    CancelledError,
+    SelectorEventLoop,
+    StreamReader,
+    create_subprocess_exec,
+    gather,
+    get_running_loop,
+)
+from asyncio.subprocess import PIPE, Process
+from collections.abc import Callable
 from typing import Any
 
+# How much of the output of a streamed subprocess is kept for error messages
+OUTPUT_TAIL_SIZE = 64 * 1024
+
+# Progress bars redraw the current line with a carriage return
+_LINE_SEPARATOR = re.compile(rb"\r\n|\r|\n")
+
 
 async def subprocess_exec(program: str, *args: str, **kwargs: Any) -> tuple[int, str, str]:
     # The SelectorEventLoop does not support asyncio.subprocess
@@ -13,7 +28,72 @@ async def subprocess_exec(program: str, *args: str, **kwargs: Any) -> tuple[int,
         return result.returncode, result.stdout, result.stderr
     else:
         process = await create_subprocess_exec(program, *args, stdout=PIPE, stderr=PIPE, **kwargs)
-        stdout_bytes, stderr_bytes = await process.communicate()
+        try:
+            stdout_bytes, stderr_bytes = await process.communicate()
+        except CancelledError:
+            _kill(process)
+            raise
         assert process.returncode is not None
         stdout, stderr = stdout_bytes.decode("utf-8"), stderr_bytes.decode("utf-8")
         return process.returncode, stdout, stderr
+
+
+async def subprocess_stream(
+    program: str,
+    *args: str,
+    on_output: Callable[[str], None],
+    max_output: int = OUTPUT_TAIL_SIZE,
+    **kwargs: Any,
+) -> tuple[int, str, str]:
+    """Run a subprocess like `subprocess_exec`, passing output lines to `on_output` as they arrive.
+
+    Only the last `max_output` bytes of stdout and stderr are kept and returned.
+    """
+    if isinstance(get_running_loop(), SelectorEventLoop) and platform.system() == "Windows":
+        returncode, stdout, stderr = await subprocess_exec(program, *args, **kwargs)
+        for line in _LINE_SEPARATOR.split(f"{stdout}\n{stderr}".encode()):
+            if line.strip():
+                on_output(line.decode("utf-8"))
+        return returncode, stdout[-max_output:], stderr[-max_output:]
+
+    process = await create_subprocess_exec(program, *args, stdout=PIPE, stderr=PIPE, **kwargs)
+    assert process.stdout is not None
+    assert process.stderr is not None
+    try:
+        stdout, stderr = await gather(
+            _read_lines(process.stdout, on_output, max_output),
+            _read_lines(process.stderr, on_output, max_output),
+        )
+        returncode = await process.wait()
+    except CancelledError:
+        _kill(process)
+        raise
+    return returncode, stdout, stderr
+
+
+def _kill(process: Process) -> None:
+    # Don't leave Pixi running when whoever was waiting for it is gone
+    try:
+        process.kill()
+    except ProcessLookupError:
+        pass
+
+
+async def _read_lines(
+    stream: StreamReader, on_output: Callable[[str], None], max_output: int
+) -> str:
+    tail = bytearray()
+    pending = b""
+    while chunk := await stream.read(4096):
+        tail += chunk
+        del tail[:-max_output]
+
+        *lines, pending = _LINE_SEPARATOR.split(pending + chunk)
+        for line in lines:
+            if line.strip():
+                on_output(line.decode("utf-8", errors="replace"))
+
+    if pending.strip():
+        on_output(pending.decode("utf-8", errors="replace"))
+
+    return tail.decode("utf-8", errors="replace")
@@ -0,0 +1,142 @@
+import asyncio
+import contextvars
+import functools
+import time
+import types
+from collections.abc import Callable, Coroutine, Generator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, ParamSpec, TypeVar, cast
+
+from .tracing import current_span
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+FILE_SYSTEM_TIMEOUT = """The file system did not respond within {timeout} seconds ({operation}).
+This happens with slow or unavailable network file systems, like NFS home directories. Restart
+the kernel once the file system responds again.
+
+If this keeps happening, raise the `fs-timeout` setting of Pixi kernel.
+"""
+
+
+class FileSystemTimeoutError(TimeoutError):
+    pass
+
+
+# Created on first use, so that threads are only started when needed
+_executor: ThreadPoolExecutor | None = None
+_threads = 4
+_timeout = 10.0
+
+_blocking_observers: list[Callable[[str, float], None]] = []
+
+
+def configure_blocking(*, threads: int, timeout: float) -> None:
+    global _executor, _threads, _timeout
+
+    _timeout = timeout
+    if threads != _threads:
+        # Calls already submitted still finish in the old pool
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = None
+        _threads = threads
+
+
+async def run_blocking(func: Callable[P, T], *args: P.args, **kwargs: P.kwargs) -> T:
+    """Run blocking file system work in a bounded thread pool instead of on the event loop.
+
+    Raises FileSystemTimeoutError if `func` doesn't return within the configured timeout. Its
+    thread can't be interrupted, but the pool size bounds how many threads can hang.
+    """
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(_threads, thread_name_prefix="pixi-kernel-fs")
+
+    # Like asyncio.to_thread, keep the current span and Pixi priority in the thread
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    future = asyncio.get_running_loop().run_in_executor(_executor, call)
+    try:
+        return await asyncio.wait_for(future, _timeout)
+    except asyncio.TimeoutError:
+        operation = getattr(func, "__qualname__", repr(func))
+        message = FILE_SYSTEM_TIMEOUT.format(timeout=_timeout, operation=operation)
+        raise FileSystemTimeoutError(message) from None
+
+
+def add_blocking_observer(observer: Callable[[str, float], None]) -> None:
+    """Call `observer` with the operation and duration of every step of a measured coroutine.
+
+    A step is the code a coroutine runs between two suspensions, during which the event loop,
+    and every other request of the Jupyter server, waits.
+    """
+    _blocking_observers.append(observer)
+
+
+async def measure_blocking(operation: str, coroutine: Coroutine[Any, Any, T]) -> T:
+    """Await `coroutine`, reporting the time its steps block the event loop as `operation`.
+
+    The total is also added to the current span as `blocking_time`.
+    """
+    result, blocking_time = await _drive(operation, coroutine)
+    parent = current_span()
+    if parent is not None:
+        previous = parent.attributes.get("blocking_time", 0)
+        parent.set(blocking_time=float(previous) + blocking_time)
+    return result
+
+
+def measured(
+    operation: str,
+) -> Callable[[Callable[P, Coroutine[Any, Any, T]]], Callable[P, Coroutine[Any, Any, T]]]:
+    """Decorate a coroutine function to measure its event loop blocking, like measure_blocking."""
+
+    def decorator(
+        func: Callable[P, Coroutine[Any, Any, T]],
+    ) -> Callable[P, Coroutine[Any, Any, T]]:
+        @functools.wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            return await measure_blocking(operation, func(*args, **kwargs))
+
+        return wrapper
+
+    return decorator
+
+
+@types.coroutine
+def _drive(
+    operation: str, coroutine: Coroutine[Any, Any, T]
+) -> Generator[Any, Any, tuple[T, float]]:
+    # Step through `coroutine` like `await` does, timing each step
+    total = 0.0
+    value: Any = None
+    error: BaseException | None = None
+    while True:
+        start = time.perf_counter()
+        try:
+            if error is None:
+                yielded = coroutine.send(value)
+            else:
+                yielded = coroutine.throw(error)
+        except StopIteration as stop:
+            return cast(T, stop.value), total + _report(operation, start)
+        except BaseException:
+            _report(operation, start)
+            raise
+        total += _report(operation, start)
+
+        try:
+            value, error = (yield yielded), None
+        except BaseException as exception:  # noqa: BLE001
+            # E.g. cancellation, which must reach the coroutine
+            value, error = None, exception
+
+
+def _report(operation: str, start: float) -> float:
+    elapsed = time.perf_counter() - start
+    for observer in _blocking_observers:
+        observer(operation, elapsed)
+    return elapsed
@@ -1,11 +1,25 @@
+import logging
+import os
+import re
 import shutil
 import sys
+import time
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any
+from typing import Any, NamedTuple
 
 from returns.result import Failure, Result, Success
 
-from .async_subprocess import subprocess_exec
+from .async_subprocess import subprocess_exec, subprocess_stream
+from .blocking import run_blocking
+from .config import get_config_file
+from .fingerprint import FileFingerprint, file_fingerprint, find_project_root
+from .metrics import record_cache_lookup
+from .scheduler import PixiBusyError, current_priority, get_scheduler
+from .singleflight import SingleFlight
+from .store import get_store
+from .tracing import Span, span
 
 if sys.version_info >= (3, 11):
     import tomllib
@@ -43,12 +57,43 @@ If you continue to face issues, report them at https://github.com/renan-r-santos
 """
 
 
-# Cache for the Pixi path
-_pixi_path_cache: str | None = None
+# `pixi 0.50.2`, also with a pre-release or build suffix like `pixi 0.51.0-beta.1+abc123`
+PIXI_VERSION_PATTERN = re.compile(
+    r"^pixi\s+v?(\d+)\.(\d+)\.(\d+)(?:-([0-9A-Za-z.-]+))?(?:\+\S*)?(?:\s|$)", re.MULTILINE
+)
+
+
+class PixiVersion(NamedTuple):
+    major: int
+    minor: int
+    patch: int
+    prerelease: str = ""
+
+    def is_at_least(self, minimum: tuple[int, int, int]) -> bool:
+        # Like in semantic versioning, pre-releases come before their release
+        release = (self.major, self.minor, self.patch)
+        return release > minimum or (release == minimum and not self.prerelease)
+
+    def __str__(self) -> str:
+        version = f"{self.major}.{self.minor}.{self.patch}"
+        return f"{version}-{self.prerelease}" if self.prerelease else version
+
+
+def parse_pixi_version(output: str) -> PixiVersion | None:
+    match = PIXI_VERSION_PATTERN.search(output)
+    if match is None:
+        return None
+    major, minor, patch, prerelease = match.groups()
+    return PixiVersion(int(major), int(minor), int(patch), prerelease or "")
 
 
-def get_config_file() -> Path:
-    return Path.home() / ".config" / "pixi-kernel" / "config.toml"
+# Where the Pixi binary was found, looked up again if it disappears
+_pixi_path_cache: str | None = None
+
+# `pixi --version` results by resolved binary path, valid while the binary is unchanged, e.g.
+# until `pixi self-update` replaces it
+_pixi_probes: dict[str, tuple[FileFingerprint, Result[None, str]]] = {}
+_pixi_probe_flights: SingleFlight[tuple[str, FileFingerprint], Result[None, str]] = SingleFlight()
 
 
 def get_default_pixi_path() -> Path:
@@ -59,10 +104,6 @@ def get_default_pixi_path() -> Path:
 
 
 def find_pixi_binary() -> Result[str, None]:
-    # Return cached result if available
-    if _pixi_path_cache is not None:
-        return Success(_pixi_path_cache)
-
     # 1. Check if the Pixi binary is available in the system PATH
     pixi_path = shutil.which("pixi")
     if pixi_path is not None:
@@ -89,38 +130,153 @@ def find_pixi_binary() -> Result[str, None]:
     return Failure(None)
 
 
-async def has_compatible_pixi() -> Result[None, str]:
+async def get_pixi_binary() -> Result[str, None]:
+    """Like `find_pixi_binary`, without blocking the event loop on the file system."""
     global _pixi_path_cache
 
-    if _pixi_path_cache is not None:
-        return Success(None)
+    if _pixi_path_cache is None:
+        result = await run_blocking(find_pixi_binary)
+        if isinstance(result, Failure):
+            return result
+        _pixi_path_cache = result.unwrap()
+    return Success(_pixi_path_cache)
 
-    result = find_pixi_binary()
 
-    if isinstance(result, Failure):
+def _binary_identity(pixi_path: str) -> tuple[str, FileFingerprint] | None:
+    resolved = os.path.realpath(pixi_path)
+    fingerprint = file_fingerprint(Path(resolved))
+    return None if fingerprint is None else (resolved, fingerprint)
+
+
+async def _locate_pixi() -> tuple[str, FileFingerprint] | None:
+    global _pixi_path_cache
+
+    for _ in range(2):
+        result = await get_pixi_binary()
+        if isinstance(result, Failure):
+            return None
+        identity = await run_blocking(_binary_identity, result.unwrap())
+        if identity is not None:
+            return identity
+        # Moved or removed since it was found, look for it again
+        _pixi_path_cache = None
+    return None
+
+
+async def has_compatible_pixi() -> Result[None, str]:
+    identity = await _locate_pixi()
+    if identity is None:
         return Failure(PIXI_NOT_FOUND)
-    else:
-        pixi_path = result.unwrap()
 
-    returncode, stdout, _ = await subprocess_exec(pixi_path, "--version")
-    if returncode != 0 or not stdout.startswith("pixi "):
+    resolved, fingerprint = identity
+    cached = _pixi_probes.get(resolved)
+    hit = cached is not None and cached[0] == fingerprint
+    record_cache_lookup("pixi-version", hit=hit)
+    if cached is not None and hit:
+        return cached[1]
+
+    return await _pixi_probe_flights.run(identity, lambda: _probe_pixi(resolved, fingerprint))
+
+
+async def _probe_pixi(pixi_path: str, fingerprint: FileFingerprint) -> Result[None, str]:
+    # Skip running `pixi --version` if this very binary was found compatible before
+    store = get_store()
+    if store is not None:
+        stored = await store.get("pixi-version", pixi_path, fingerprint, str)
+        record_cache_lookup("pixi-version-store", hit=stored is not None)
+        if stored is not None:
+            _pixi_probes[pixi_path] = (fingerprint, Success(None))
+            return Success(None)
+
+    with span("pixi --version") as version_span:
+        returncode, stdout, stderr = await subprocess_exec(pixi_path, "--version")
+        _record_output(version_span, returncode, stdout, stderr)
+    # Not cached, Pixi may work next time
+    pixi_version = parse_pixi_version(stdout) if returncode == 0 else None
+    if pixi_version is None:
         return Failure(PIXI_VERSION_ERROR)
 
-    pixi_version = stdout[len("pixi ") :].strip()
-    major, minor, patch = map(int, pixi_version.split("."))
-
-    if (major, minor, patch) < MINIMUM_PIXI_VERSION:
+    result: Result[None, str] = Success(None)
+    if not pixi_version.is_at_least(MINIMUM_PIXI_VERSION):
         minimum_version = ".".join(map(str, MINIMUM_PIXI_VERSION))
-        return Failure(PIXI_OUTDATED.format(minimum_version=minimum_version))
+        result = Failure(PIXI_OUTDATED.format(minimum_version=minimum_version))
+    elif store is not None:
+        await store.put("pixi-version", pixi_path, fingerprint, str(pixi_version))
 
-    # We found a compatible Pixi binary, cache it
-    _pixi_path_cache = pixi_path
-    return Success(None)
+    _pixi_probes[pixi_path] = (fingerprint, result)
+    return result
+
+
+async def probe_pixi(logger: logging.Logger) -> None:
+    """Check the Pixi binary ahead of the first kernel launch."""
+    start = time.perf_counter()
+    result = await has_compatible_pixi()
+    if isinstance(result, Failure):
+        logger.warning(f"Pixi kernel can't use Pixi: {result.failure()}")
+    else:
+        logger.info(f"Checked Pixi for Pixi kernel in {time.perf_counter() - start:.2f}s")
 
 
 async def run_pixi(*args: str, **kwargs: Any) -> tuple[int, str, str]:
     # It is safe to unwrap as `has_compatible_pixi()` would already have checked for a compatible
     # Pixi binary.
-    pixi = find_pixi_binary().unwrap()
+    pixi = (await get_pixi_binary()).unwrap()
 
-    return await subprocess_exec(pixi, *args, **kwargs)
+    with span(f"pixi {args[0]}", args=" ".join(args)) as pixi_span:
+        try:
+            async with _pixi_slot(kwargs.get("cwd"), pixi_span):
+                returncode, stdout, stderr = await subprocess_exec(pixi, *args, **kwargs)
+        except PixiBusyError as exception:
+            pixi_span.set(rejected=True)
+            return 1, "", str(exception)
+        _record_output(pixi_span, returncode, stdout, stderr)
+    return returncode, stdout, stderr
+
+
+async def run_pixi_stream(
+    *args: str, on_output: Callable[[str], None], **kwargs: Any
+) -> tuple[int, str, str]:
+    pixi = (await get_pixi_binary()).unwrap()
+
+    # Only the end of the output is returned, so measure all of it as it goes by
+    output_bytes = 0
+
+    def measure_output(line: str) -> None:
+        nonlocal output_bytes
+        # Lines are decoded and stripped of their newline
+        output_bytes += len(line.encode()) + 1
+        on_output(line)
+
+    with span(f"pixi {args[0]}", args=" ".join(args)) as pixi_span:
+        try:
+            async with _pixi_slot(kwargs.get("cwd"), pixi_span):
+                returncode, stdout, stderr = await subprocess_stream(
+                    pixi, *args, on_output=measure_output, **kwargs
+                )
+        except PixiBusyError as exception:
+            pixi_span.set(rejected=True)
+            return 1, "", str(exception)
+        pixi_span.set(exit_code=returncode, output_bytes=output_bytes)
+    return returncode, stdout, stderr
+
+
+@asynccontextmanager
+async def _pixi_slot(cwd: str | Path | None, pixi_span: Span) -> AsyncIterator[None]:
+    # Pixi commands are only limited once the scheduler is configured, e.g. by the server extension
+    scheduler = get_scheduler()
+    if scheduler is None:
+        yield
+        return
+
+    project = None
+    if cwd is not None:
+        project = await run_blocking(find_project_root, Path(cwd)) or Path(cwd)
+
+    start = time.perf_counter()
+    async with scheduler.slot(project, current_priority()):
+        pixi_span.set(queue_time=time.perf_counter() - start)
+        yield
+
+
+def _record_output(pixi_span: Span, returncode: int, stdout: str, stderr: str) -> None:
+    pixi_span.set(exit_code=returncode, stdout_length=len(stdout), stderr_length=len(stderr))
@@ -0,0 +1,119 @@
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Any, Literal
+
+import msgspec
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
+
+
+LaunchMode = Literal["pixi-run", "direct"]
+LAUNCH_MODES: tuple[LaunchMode, ...] = ("pixi-run", "direct")
+
+LaunchPolicy = Literal["strict", "locked", "frozen", "trusted"]
+LAUNCH_POLICIES: tuple[LaunchPolicy, ...] = ("strict", "locked", "frozen", "trusted")
+
+# Options of the Pixi commands that may update the lockfile and install the environment:
+# `--locked` fails instead of solving when the lockfile is outdated, `--frozen` installs what the
+# lockfile has without checking it against the manifest. Trusted environments are only installed
+# when their prefix doesn't exist, then like frozen ones.
+LOCKFILE_OPTIONS: dict[LaunchPolicy, tuple[str, ...]] = {
+    "strict": (),
+    "locked": ("--locked",),
+    "frozen": ("--frozen",),
+    "trusted": ("--frozen",),
+}
+
+
+class Config(msgspec.Struct, frozen=True, kw_only=True, rename="kebab"):
+    """Global Pixi kernel settings.
+
+    Every setting can be overridden by a `PIXI_KERNEL_<SETTING>` environment variable, e.g.
+    `PIXI_KERNEL_LAUNCH_MODE=direct` for the `launch-mode` setting. List settings are given as
+    comma-separated values.
+    """
+
+    launch_mode: LaunchMode = "pixi-run"
+    # How much Pixi may solve and install before kernels start, see LOCKFILE_OPTIONS
+    launch_policy: LaunchPolicy = "strict"
+    # Idle kernels kept per (working directory, environment, kernel), 0 disables the kernel pool
+    pool_size: int = 0
+    # Seconds after which an idle pooled kernel is shut down
+    pool_idle_ttl: float = 600
+    # Maximum number of idle pooled kernels across all projects
+    pool_max_kernels: int = 32
+    # Install the environments of every Pixi project under the server root when the server starts
+    warm_up: bool = False
+    # How many directory levels below the server root are searched for Pixi projects
+    warm_up_depth: int = 2
+    # Directory name patterns skipped when searching for Pixi projects
+    warm_up_ignore: list[str] = msgspec.field(default_factory=lambda: [".*", "node_modules"])
+    # Maximum number of environments installed at the same time
+    warm_up_concurrency: int = 2
+    # Watch the projects kernels were launched from and drop cached state when they change. Off by
+    # default: cached state is checked against the project files anyway, watching frees it earlier.
+    watch: bool = False
+    # Seconds between checks when polling, or to group file events when watchfiles is installed
+    watch_interval: float = 2
+    # Run `pixi install` in the background for changed projects that ran kernels
+    watch_reinstall: bool = False
+    # Seconds without further changes before the background `pixi install` starts
+    watch_debounce: float = 5
+    # Directory of a database persisting Pixi state across server restarts, disabled if not set
+    store_dir: str | None = None
+    # File the timings of every kernel launch phase are appended to as JSON lines
+    trace_file: str | None = None
+    # Also send launch timings to the OpenTelemetry tracer provider, if opentelemetry is installed
+    trace_opentelemetry: bool = False
+    # Threads for file system access, which can stall for long on network file systems
+    fs_threads: int = 4
+    # Seconds after which file system access is given up and a fallback kernel is launched
+    fs_timeout: float = 10
+    # Pixi commands running at the same time, not counting kernels started with `pixi run`
+    pixi_concurrency: int = 8
+    # Pixi commands running at the same time in one project
+    pixi_project_concurrency: int = 2
+    # Waiting Pixi commands of the same or higher priority at which new ones are rejected
+    pixi_queue_limit: int = 100
+
+
+def get_config_file() -> Path:
+    return Path.home() / ".config" / "pixi-kernel" / "config.toml"
+
+
+def load_config(logger: logging.Logger | None = None) -> Config:
+    """Load the config file and environment variables, ignoring invalid settings."""
+    config_file = get_config_file()
+    content: dict[str, Any] = {}
+    try:
+        content = tomllib.loads(config_file.read_text())
+    except OSError:
+        pass
+    except tomllib.TOMLDecodeError as exception:
+        if logger is not None:
+            logger.warning(f"Ignoring invalid Pixi kernel config file {config_file}: {exception}")
+
+    for field in msgspec.structs.fields(Config):
+        value = os.environ.get(f"PIXI_KERNEL_{field.name.upper()}")
+        if value is not None:
+            content[field.encode_name] = value.split(",") if field.type == list[str] else value
+
+    # Validate settings one by one, so that a bad value only resets its own setting
+    valid: dict[str, Any] = {}
+    for name, value in content.items():
+        try:
+            msgspec.convert({name: value}, type=Config, strict=False)
+        except msgspec.ValidationError as exception:
+            if logger is not None:
+                logger.warning(
+                    f"Ignoring Pixi kernel setting {name}, using its default: {exception}"
+                )
+            continue
+        valid[name] = value
+
+    return msgspec.convert(valid, type=Config, strict=False)
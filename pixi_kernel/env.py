@@ -1,30 +1,71 @@
+import asyncio
+import hashlib
 import os
 from pathlib import Path
 
 import msgspec
+from returns.result import Result
 
-from .compatibility import run_pixi
-from .types import PixiInfo
+from .blocking import run_blocking
+from .fingerprint import find_project_root, project_fingerprint
+from .info import get_pixi_info
 
 DEFAULT_ENVIRONMENT = "default"
 
+# Maximum number of `pixi info` commands run at the same time for a batch of paths
+BATCH_CONCURRENCY = 4
+
 
 async def envs_from_path(path: Path) -> list[str]:
+    return (await get_envs(path)).value_or([DEFAULT_ENVIRONMENT])
+
+
+async def get_envs(path: Path) -> Result[list[str], str]:
     # Remove PIXI_IN_SHELL for when JupyterLab is started from a Pixi shell
     # https://github.com/renan-r-santos/pixi-kernel/issues/35
     env = os.environ.copy()
     env.pop("PIXI_IN_SHELL", None)
 
-    returncode, stdout, _ = await run_pixi("info", "--json", cwd=path, env=env)
-    if returncode != 0:
-        return [DEFAULT_ENVIRONMENT]
+    result = await get_pixi_info(cwd=path, env=env)
+    return result.map(
+        lambda pixi_info: (
+            sorted([env.name for env in pixi_info.environments]) or [DEFAULT_ENVIRONMENT]
+        )
+    )
+
+
+def envs_etag(path: Path) -> str:
+    """Return an ETag for the environments of `path` that changes whenever they may change."""
+    root = find_project_root(path)
+    fingerprint = () if root is None else project_fingerprint(root)
+    # Outside of a project, the answer depends on the directory itself
+    key = [str(root or path), fingerprint, os.environ.get("PIXI_KERNEL_DEFAULT_ENVIRONMENT")]
+    return '"' + hashlib.sha256(msgspec.json.encode(key)).hexdigest()[:32] + '"'
+
+
+async def envs_from_paths(
+    paths: list[Path], *, concurrency: int = BATCH_CONCURRENCY
+) -> dict[Path, list[str]]:
+    """Return the Pixi environments of many notebook directories.
+
+    Directories are grouped by their Pixi project, so Pixi runs once per project.
+    """
+    groups: dict[Path, list[Path]] = {}
+    roots = await asyncio.gather(*(run_blocking(find_project_root, path) for path in paths))
+    for path, root in zip(paths, roots, strict=True):
+        # Directories outside of a project are left to Pixi, which reports the error
+        groups.setdefault(root or path, []).append(path)
 
-    try:
-        pixi_info = msgspec.json.decode(stdout, type=PixiInfo)
-    except msgspec.MsgspecError:
-        return [DEFAULT_ENVIRONMENT]
+    semaphore = asyncio.Semaphore(concurrency)
 
-    if len(pixi_info.environments) == 0:
-        return [DEFAULT_ENVIRONMENT]
+    async def group_envs(path: Path) -> list[str]:
+        async with semaphore:
+            return await envs_from_path(path)
 
-    return sorted([env.name for env in pixi_info.environments])
+    group_roots = list(groups)
+    envs = await asyncio.gather(*(group_envs(groups[root][0]) for root in group_roots))
+    return {
+        path: group_env
+        for root, group_env in zip(group_roots, envs, strict=True)
+        for path in groups[root]
+    }
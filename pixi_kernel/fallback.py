@@ -1,17 +1,195 @@
-import sys
+"""A minimal Jupyter kernel that answers every execution with an error message.
+
+It is launched instead of the Pixi kernel when the Pixi environment isn't usable, so it only
+depends on pyzmq and the standard library. Importing IPython and ipykernel would take about a
+second and tens of megabytes per broken notebook.
+"""
+
+import hmac
+import json
+import signal
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
 from typing import Any
 
-from ipykernel.ipkernel import IPythonKernel
-from ipykernel.kernelapp import IPKernelApp
+import zmq
+
+PROTOCOL_VERSION = "5.3"
+DELIMITER = b"<IDS|MSG>"
+
+Message = dict[str, Any]
+
+
+class FallbackKernel:
+    """Speak enough of the Jupyter messaging protocol to show `message` to the user."""
+
+    def __init__(self, *, message: str, connection_info: dict[str, Any]) -> None:
+        self.message = message
+        self.session = uuid.uuid4().hex
+        self.execution_count = 0
+        self.running = True
+
+        key = connection_info.get("key", "").encode()
+        scheme = connection_info.get("signature_scheme", "hmac-sha256")
+        self._auth = hmac.new(key, digestmod=scheme.removeprefix("hmac-")) if key else None
+
+        self._context = zmq.Context()
+        transport = connection_info["transport"]
+        ip = connection_info["ip"]
+
+        def bind(socket_type: int, port_name: str) -> zmq.Socket[bytes]:
+            socket: zmq.Socket[bytes] = self._context.socket(socket_type)
+            socket.linger = 1000
+            separator = "-" if transport == "ipc" else ":"
+            socket.bind(f"{transport}://{ip}{separator}{connection_info[port_name]}")
+            return socket
+
+        self.shell = bind(zmq.ROUTER, "shell_port")
+        self.control = bind(zmq.ROUTER, "control_port")
+        self.stdin = bind(zmq.ROUTER, "stdin_port")
+        self.iopub = bind(zmq.PUB, "iopub_port")
+        self.heartbeat = bind(zmq.REP, "hb_port")
+
+    def run(self) -> None:
+        poller = zmq.Poller()
+        for socket in (self.shell, self.control, self.heartbeat):
+            poller.register(socket, zmq.POLLIN)
+
+        while self.running:
+            for socket, _ in poller.poll():
+                if socket is self.heartbeat:
+                    self.heartbeat.send(self.heartbeat.recv())
+                    continue
+
+                received = self._receive(socket)
+                if received is not None:
+                    self._handle(socket, *received)
+
+        self._context.destroy()
+
+    def _handle(
+        self, socket: zmq.Socket[bytes], identities: list[bytes], request: Message
+    ) -> None:
+        msg_type = request["header"]["msg_type"]
+        content = request["content"]
+        self._publish("status", {"execution_state": "busy"}, parent=request)
+
+        reply: Message | None = None
+        if msg_type == "kernel_info_request":
+            reply = {
+                "status": "ok",
+                "protocol_version": PROTOCOL_VERSION,
+                "implementation": "pixi-kernel",
+                "implementation_version": "",
+                "language_info": {"name": "python", "file_extension": ".py"},
+                "banner": self.message,
+                "help_links": [],
+            }
+        elif msg_type == "execute_request":
+            reply = self._execute(content, request)
+        elif msg_type == "shutdown_request":
+            reply = {"status": "ok", "restart": content.get("restart", False)}
+            self.running = False
+        elif msg_type == "interrupt_request":
+            reply = {"status": "ok"}
+        elif msg_type == "is_complete_request":
+            reply = {"status": "complete"}
+        elif msg_type == "complete_request":
+            cursor = content.get("cursor_pos", 0)
+            reply = {
+                "status": "ok",
+                "matches": [],
+                "cursor_start": cursor,
+                "cursor_end": cursor,
+                "metadata": {},
+            }
+        elif msg_type == "inspect_request":
+            reply = {"status": "ok", "found": False, "data": {}, "metadata": {}}
+        elif msg_type == "history_request":
+            reply = {"status": "ok", "history": []}
+        elif msg_type == "comm_info_request":
+            reply = {"status": "ok", "comms": {}}
+
+        if reply is not None:
+            reply_type = msg_type.removesuffix("_request") + "_reply"
+            self._send(socket, reply_type, reply, parent=request, identities=identities)
+        self._publish("status", {"execution_state": "idle"}, parent=request)
+
+    def _execute(self, content: Message, request: Message) -> Message:
+        if not content.get("silent", False):
+            self.execution_count += 1
+            self._publish(
+                "execute_input",
+                {"code": content.get("code", ""), "execution_count": self.execution_count},
+                parent=request,
+            )
+            self._publish("stream", {"name": "stderr", "text": self.message}, parent=request)
+
+        return {
+            "status": "error",
+            "execution_count": self.execution_count,
+            "ename": "PixiKernelError",
+            "evalue": self.message,
+            "traceback": [],
+        }
+
+    def _sign(self, parts: list[bytes]) -> bytes:
+        if self._auth is None:
+            return b""
+        auth = self._auth.copy()
+        for part in parts:
+            auth.update(part)
+        return auth.hexdigest().encode()
+
+    def _receive(self, socket: zmq.Socket[bytes]) -> tuple[list[bytes], Message] | None:
+        frames = socket.recv_multipart()
+        if DELIMITER not in frames:
+            return None
+        index = frames.index(DELIMITER)
+        identities = frames[:index]
+        signature, *parts = frames[index + 1 : index + 6]
+        if len(parts) < 4 or not hmac.compare_digest(signature, self._sign(parts)):
+            return None
+
+        header, parent_header, metadata, content = (json.loads(part) for part in parts[:4])
+        request = {
+            "header": header,
+            "parent_header": parent_header,
+            "metadata": metadata,
+            "content": content,
+        }
+        return identities, request
+
+    def _send(
+        self,
+        socket: zmq.Socket[bytes],
+        msg_type: str,
+        content: Message,
+        *,
+        parent: Message,
+        identities: list[bytes],
+    ) -> None:
+        header = {
+            "msg_id": uuid.uuid4().hex,
+            "session": self.session,
+            "username": "pixi-kernel",
+            "date": datetime.now(timezone.utc).isoformat(),
+            "msg_type": msg_type,
+            "version": PROTOCOL_VERSION,
+        }
+        parts = [
+            json.dumps(part).encode() for part in (header, parent.get("header", {}), {}, content)
+        ]
+        socket.send_multipart([*identities, DELIMITER, self._sign(parts), *parts])
+
+    def _publish(self, msg_type: str, content: Message, *, parent: Message) -> None:
+        self._send(self.iopub, msg_type, content, parent=parent, identities=[msg_type.encode()])
 
 
 def start_fallback_kernel(*, message: str, connection_file: str) -> None:
-    class FallbackKernel(IPythonKernel):
-        def do_execute(self, *args: Any, **kwargs: Any) -> dict[str, str]:
-            print(message, file=sys.stderr)
-            return {"status": "error", "ename": "PixiKernelError", "evalue": message}
-
-    IPKernelApp.launch_instance(
-        argv=["python", "-m", "ipykernel_launcher", "-f", connection_file],
-        kernel_class=FallbackKernel,
-    )
+    # Interrupting the kernel sends SIGINT, which must not stop it
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    connection_info = json.loads(Path(connection_file).read_text())
+    FallbackKernel(message=message, connection_info=connection_info).run()
@@ -0,0 +1,49 @@
+from pathlib import Path
+from typing import NamedTuple
+
+PROJECT_FILES = ("pixi.toml", "pyproject.toml", "pixi.lock")
+
+
+class FileFingerprint(NamedTuple):
+    size: int
+    mtime_ns: int
+    inode: int
+
+
+ProjectFingerprint = tuple[FileFingerprint | None, ...]
+
+
+def file_fingerprint(path: Path) -> FileFingerprint | None:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return FileFingerprint(size=stat.st_size, mtime_ns=stat.st_mtime_ns, inode=stat.st_ino)
+
+
+def project_fingerprint(root: Path) -> ProjectFingerprint:
+    return tuple(file_fingerprint(root / name) for name in PROJECT_FILES)
+
+
+def is_project_root(directory: Path) -> bool:
+    """Check for a `pixi.toml` or a `pyproject.toml` with a `[tool.pixi]` table in `directory`."""
+    if (directory / "pixi.toml").is_file():
+        return True
+
+    try:
+        return "[tool.pixi" in (directory / "pyproject.toml").read_text(encoding="utf-8")
+    except (OSError, UnicodeDecodeError):
+        return False
+
+
+def find_project_root(cwd: Path) -> Path | None:
+    """Find the directory holding the Pixi manifest the same way Pixi does.
+
+    Pixi walks up from the working directory and stops at the first `pixi.toml`, or at the first
+    `pyproject.toml` that has a `[tool.pixi]` table.
+    """
+    for directory in (cwd, *cwd.parents):
+        if is_project_root(directory):
+            return directory
+
+    return None
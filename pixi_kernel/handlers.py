@@ -1,19 +1,110 @@
+import asyncio
 import json
 import os
+import time
 from pathlib import Path
+from typing import Any
 
 import tornado
-from jupyter_server.base.handlers import APIHandler
+from jupyter_server.base.handlers import APIHandler, JupyterHandler
 from jupyter_server.serverapp import ServerWebApplication
 from jupyter_server.utils import url_path_join
+from prometheus_client import CONTENT_TYPE_LATEST
 from returns.result import Failure
 
+from .blocking import measured, run_blocking
 from .compatibility import has_compatible_pixi
-from .env import DEFAULT_ENVIRONMENT, envs_from_path
+from .env import DEFAULT_ENVIRONMENT, envs_etag, envs_from_path, envs_from_paths, get_envs
+from .fingerprint import find_project_root
+from .metrics import generate_metrics
+from .progress import get_install_progress
+from .scheduler import Priority, pixi_priority
+
+
+async def notebook_dir_from_body(body: dict[str, str] | None) -> Path:
+    if body is None:
+        raise tornado.web.HTTPError(400, "Missing request body")
+
+    return await run_blocking(notebook_dir, body["serverRoot"], body["localPath"])
+
+
+def notebook_dir(server_root: str, local_path: str) -> Path:
+    notebook_path = Path(server_root).expanduser().joinpath(local_path).resolve()
+    if notebook_path.is_file():
+        notebook_path = notebook_path.parent
+
+    return notebook_path
+
+
+def envs_response(envs: list[str]) -> dict[str, Any]:
+    default_env = os.environ.get("PIXI_KERNEL_DEFAULT_ENVIRONMENT")
+    if default_env not in envs:
+        default_env = DEFAULT_ENVIRONMENT
+
+    return {"environments": envs, "default": default_env}
 
 
 class EnvHandler(APIHandler):
     @tornado.web.authenticated
+    @measured("envs")
+    async def get(self) -> None:
+        """Cacheable variant of `post` taking `serverRoot` and `localPath` as query arguments.
+
+        The ETag is derived from the fingerprints of the Pixi project files, so requests for
+        unchanged projects are answered with 304 Not Modified without running Pixi.
+        """
+        notebook_path = await run_blocking(
+            notebook_dir,
+            self.get_query_argument("serverRoot"),
+            self.get_query_argument("localPath"),
+        )
+
+        self.set_header("Etag", await run_blocking(envs_etag, notebook_path))
+        if self.check_etag_header():
+            self.set_status(304)
+            await self.finish()
+            return
+
+        result = await has_compatible_pixi()
+        if isinstance(result, Failure):
+            raise tornado.web.HTTPError(500, result.failure())
+
+        with pixi_priority(Priority.ENVS):
+            envs_result = await get_envs(notebook_path)
+        if isinstance(envs_result, Failure):
+            # Pixi may work next time, so don't let clients reuse the fallback response
+            self.clear_header("Etag")
+
+        await self.finish(json.dumps(envs_response(envs_result.value_or([DEFAULT_ENVIRONMENT]))))
+
+    def compute_etag(self) -> str | None:
+        # ETags are only set by `get`, never computed from the response body
+        return None
+
+    @tornado.web.authenticated
+    @measured("envs")
+    async def post(self) -> None:
+        result = await has_compatible_pixi()
+        if isinstance(result, Failure):
+            raise tornado.web.HTTPError(500, result.failure())
+
+        notebook_path = await notebook_dir_from_body(self.get_json_body())
+
+        with pixi_priority(Priority.ENVS):
+            envs = await envs_from_path(notebook_path)
+
+        await self.finish(json.dumps(envs_response(envs)))
+
+
+class BatchEnvHandler(APIHandler):
+    """Like EnvHandler, for many notebooks at once.
+
+    Takes `{"serverRoot": ..., "localPaths": [...]}` and returns `{"environments": {...}}` mapping
+    each local path to the response EnvHandler would give for it.
+    """
+
+    @tornado.web.authenticated
+    @measured("envs-batch")
     async def post(self) -> None:
         result = await has_compatible_pixi()
         if isinstance(result, Failure):
@@ -23,24 +114,65 @@ class EnvHandler(APIHandler):
         if body is None:
             raise tornado.web.HTTPError(400, "Missing request body")
 
-        server_root = body["serverRoot"]
-        local_path = body["localPath"]
+        local_paths = body.get("localPaths")
+        if not isinstance(local_paths, list) or not all(isinstance(p, str) for p in local_paths):
+            raise tornado.web.HTTPError(400, "'localPaths' must be a list of strings")
+
+        paths = await asyncio.gather(
+            *(run_blocking(notebook_dir, body["serverRoot"], path) for path in local_paths)
+        )
+        notebook_dirs = dict(zip(local_paths, paths, strict=True))
+        with pixi_priority(Priority.ENVS):
+            envs = await envs_from_paths(list(set(notebook_dirs.values())))
+
+        response = {path: envs_response(envs[notebook_dirs[path]]) for path in local_paths}
+        await self.finish(json.dumps({"environments": response}))
+
+
+class ProgressHandler(APIHandler):
+    """Report the `pixi install` commands running for the project of a notebook."""
+
+    @tornado.web.authenticated
+    @measured("progress")
+    async def post(self) -> None:
+        notebook_path = await notebook_dir_from_body(self.get_json_body())
+
+        installs = []
+        project_root = await run_blocking(find_project_root, notebook_path)
+        if project_root is not None:
+            for progress in get_install_progress(project_root):
+                installs.append(
+                    {
+                        "environment": progress.environment,
+                        "elapsed": time.time() - progress.started_at,
+                        "lines": list(progress.lines),
+                    }
+                )
+
+        await self.finish(json.dumps({"installs": installs}))
+
 
-        notebook_path = Path(server_root).expanduser().joinpath(local_path).resolve()
-        if notebook_path.is_file():
-            notebook_path = notebook_path.parent
+class MetricsHandler(JupyterHandler):
+    """Serve the Pixi kernel metrics in the Prometheus text format.
 
-        envs = await envs_from_path(notebook_path)
+    Like the `/metrics` endpoint of Jupyter Server, authentication is only required when
+    `ServerApp.authenticate_prometheus` is set.
+    """
 
-        default_env = os.environ.get("PIXI_KERNEL_DEFAULT_ENVIRONMENT")
-        if default_env not in envs:
-            default_env = DEFAULT_ENVIRONMENT
+    def get(self) -> None:
+        if self.settings.get("authenticate_prometheus", True) and not self.logged_in:
+            raise tornado.web.HTTPError(403)
 
-        response = {"environments": envs, "default": default_env}
-        await self.finish(json.dumps(response))
+        self.set_header("Content-Type", CONTENT_TYPE_LATEST)
+        self.finish(generate_metrics())
 
 
 def setup_handlers(web_app: ServerWebApplication) -> None:
     base_url = web_app.settings["base_url"]
-    url_path = url_path_join(base_url, "pixi-kernel", "envs")
-    web_app.add_handlers(".*$", [(url_path, EnvHandler)])  # type: ignore[no-untyped-call]
+    handlers = [
+        (url_path_join(base_url, "pixi-kernel", "envs"), EnvHandler),
+        (url_path_join(base_url, "pixi-kernel", "envs", "batch"), BatchEnvHandler),
+        (url_path_join(base_url, "pixi-kernel", "progress"), ProgressHandler),
+        (url_path_join(base_url, "pixi-kernel", "metrics"), MetricsHandler),
+    ]
+    web_app.add_handlers(".*$", handlers)  # type: ignore[no-untyped-call]
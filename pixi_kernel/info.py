@@ -0,0 +1,108 @@
+import logging
+from pathlib import Path
+
+import msgspec
+from returns.result import Failure, Result, Success
+
+from .blocking import run_blocking
+from .cache import LRUCache
+from .compatibility import run_pixi
+from .fingerprint import ProjectFingerprint, find_project_root, project_fingerprint
+from .metrics import record_cache_lookup
+from .singleflight import SingleFlight
+from .store import get_store
+from .types import PixiInfo
+
+PIXI_INFO_CACHE_SIZE = 256
+
+# Decoded `pixi info --json` results keyed by project root. Entries are only reused while the
+# manifest and lockfile fingerprints are unchanged.
+_pixi_info_cache: LRUCache[Path, tuple[ProjectFingerprint, PixiInfo]] = LRUCache(
+    maxsize=PIXI_INFO_CACHE_SIZE
+)
+
+# Concurrent launches from the same project share a single `pixi info` run
+_pixi_info_flights: SingleFlight[tuple[Path, ProjectFingerprint], Result[PixiInfo, str]] = (
+    SingleFlight()
+)
+
+
+async def get_pixi_info(
+    *,
+    cwd: Path,
+    env: dict[str, str],
+    logger: logging.Logger | None = None,
+) -> Result[PixiInfo, str]:
+    """Return the `pixi info --json` output for the project containing `cwd`.
+
+    Only successful results for an existing project are cached, so error messages always come
+    from a fresh Pixi run.
+    """
+    root = await run_blocking(find_project_root, cwd)
+    if root is not None:
+        fingerprint = await run_blocking(project_fingerprint, root)
+        cached = _pixi_info_cache.get(root)
+        hit = cached is not None and cached[0] == fingerprint
+        record_cache_lookup("pixi-info", hit=hit)
+        if cached is not None and hit:
+            if logger is not None:
+                logger.info(f"Using cached 'pixi info' output for {root}")
+            return Success(cached[1])
+
+        store = get_store()
+        stored = (
+            None
+            if store is None
+            else await store.get("pixi-info", str(root), fingerprint, PixiInfo)
+        )
+        if store is not None:
+            record_cache_lookup("pixi-info-store", hit=stored is not None)
+        if stored is not None:
+            if logger is not None:
+                logger.info(f"Using stored 'pixi info' output for {root}")
+            _pixi_info_cache.put(root, (fingerprint, stored))
+            return Success(stored)
+
+        key = (root, fingerprint)
+        if key in _pixi_info_flights and logger is not None:
+            logger.info(f"Waiting for the running 'pixi info' of {root}")
+        return await _pixi_info_flights.run(
+            key, lambda: _run_pixi_info(cwd=cwd, env=env, key=key, logger=logger)
+        )
+
+    return await _run_pixi_info(cwd=cwd, env=env, key=None, logger=logger)
+
+
+async def _run_pixi_info(
+    *,
+    cwd: Path,
+    env: dict[str, str],
+    key: tuple[Path, ProjectFingerprint] | None,
+    logger: logging.Logger | None,
+) -> Result[PixiInfo, str]:
+    returncode, stdout, stderr = await run_pixi("info", "--json", cwd=cwd, env=env)
+
+    if logger is not None:
+        logger.info(f"pixi info stderr: {stderr}")
+        logger.info(f"pixi info stdout: {stdout}")
+    if returncode != 0:
+        return Failure(f"Failed to run 'pixi info': {stderr}")
+
+    try:
+        pixi_info = msgspec.json.decode(stdout, type=PixiInfo)
+    except msgspec.MsgspecError as exception:
+        return Failure(f"Failed to parse 'pixi info' output: {stdout}\n{exception}")
+
+    if key is not None and pixi_info.project is not None:
+        root, fingerprint = key
+        _pixi_info_cache.put(root, (fingerprint, pixi_info))
+        store = get_store()
+        if store is not None:
+            await store.put("pixi-info", str(root), fingerprint, pixi_info)
+
+    return Success(pixi_info)
+
+
+def invalidate_pixi_info(project_root: Path) -> None:
+    """Drop the cached `pixi info` result of the project in `project_root`."""
+    _pixi_info_cache.pop(project_root)
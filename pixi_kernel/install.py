@@ -0,0 +1,182 @@
+import logging
+from pathlib import Path
+
+import msgspec
+from returns.result import Failure, Result, Success
+
+from .blocking import run_blocking
+from .compatibility import run_pixi_stream
+from .config import LOCKFILE_OPTIONS, LaunchPolicy
+from .fingerprint import ProjectFingerprint, project_fingerprint
+from .metrics import record_cache_lookup
+from .progress import finish_install_progress, start_install_progress
+from .singleflight import SingleFlight
+from .store import get_store
+
+# Stored next to the `conda-meta/pixi` file that Pixi itself writes into every environment, so it
+# goes away together with the environment.
+INSTALL_STATE_FILE = Path("conda-meta") / "pixi-kernel"
+
+# Concurrent launches of the same environment share a single `pixi install` run instead of
+# fighting over the environment prefix, unless they install with different lockfile options
+_install_flights: SingleFlight[
+    tuple[Path, str, ProjectFingerprint, tuple[str, ...]], Result[None, str]
+] = SingleFlight()
+
+
+# Lockfile options from the strictest to the least strict, as the launch policies are ordered. A
+# `--frozen` install of an outdated lockfile doesn't make the environment current for a strict
+# launch, which would have solved it again.
+LOCKFILE_STRICTNESS = list(dict.fromkeys(LOCKFILE_OPTIONS.values()))
+
+
+class InstallState(msgspec.Struct, frozen=True, kw_only=True):
+    environment: str
+    fingerprint: ProjectFingerprint
+    # Lockfile options of the install, records without them were written by strict installs
+    options: tuple[str, ...] = ()
+
+    def satisfies(
+        self, *, environment: str, fingerprint: ProjectFingerprint, options: tuple[str, ...]
+    ) -> bool:
+        return (
+            self.environment == environment
+            and self.fingerprint == fingerprint
+            and self.options in LOCKFILE_STRICTNESS
+            and LOCKFILE_STRICTNESS.index(self.options) <= LOCKFILE_STRICTNESS.index(options)
+        )
+
+
+def _read_install_state(prefix: str) -> InstallState | None:
+    try:
+        content = (Path(prefix) / INSTALL_STATE_FILE).read_bytes()
+        return msgspec.json.decode(content, type=InstallState)
+    except (OSError, msgspec.MsgspecError):
+        return None
+
+
+def _write_install_state(prefix: str, state: InstallState) -> None:
+    try:
+        (Path(prefix) / INSTALL_STATE_FILE).write_bytes(msgspec.json.encode(state))
+    except OSError:
+        # Not being able to record the install only means the next launch won't skip it
+        pass
+
+
+async def is_install_current(
+    *,
+    prefix: str,
+    environment: str,
+    fingerprint: ProjectFingerprint,
+    options: tuple[str, ...] = (),
+) -> bool:
+    """Check whether `pixi install` already ran successfully for this manifest and lockfile.
+
+    Only installs with the same or stricter lockfile `options` count.
+    """
+    # Without a lockfile `pixi install` has to solve and write one, so it can never be skipped
+    if fingerprint[-1] is None:
+        return False
+
+    def satisfies(state: InstallState | None) -> bool:
+        return state is not None and state.satisfies(
+            environment=environment, fingerprint=fingerprint, options=options
+        )
+
+    if satisfies(await run_blocking(_read_install_state, prefix)):
+        return True
+
+    # Installs into read-only prefixes can only be recorded in the store. The fingerprint only
+    # covers the project files, so the record doesn't notice the environment being deleted.
+    store = get_store()
+    if store is None or not await run_blocking((Path(prefix) / "conda-meta").is_dir):
+        return False
+    return satisfies(await store.get("install", prefix, fingerprint, InstallState))
+
+
+async def record_install(
+    *,
+    prefix: str,
+    environment: str,
+    fingerprint: ProjectFingerprint,
+    options: tuple[str, ...] = (),
+) -> None:
+    state = InstallState(environment=environment, fingerprint=fingerprint, options=options)
+    store = get_store()
+    if store is not None:
+        await store.put("install", prefix, fingerprint, state)
+    await run_blocking(_write_install_state, prefix, state)
+
+
+async def install_environment(
+    *,
+    environment_name: str,
+    prefix: str,
+    project_root: Path,
+    cwd: Path,
+    env: dict[str, str],
+    logger: logging.Logger,
+    policy: LaunchPolicy = "strict",
+) -> Result[None, str]:
+    """Run `pixi install` unless it already succeeded for the current manifest and lockfile."""
+    fingerprint = await run_blocking(project_fingerprint, project_root)
+    options = LOCKFILE_OPTIONS[policy]
+    install_current = await is_install_current(
+        prefix=prefix, environment=environment_name, fingerprint=fingerprint, options=options
+    )
+    record_cache_lookup("install", hit=install_current)
+    if install_current:
+        logger.info(f"Pixi environment {environment_name} is up-to-date, skipping 'pixi install'")
+        return Success(None)
+
+    key = (project_root, environment_name, fingerprint, options)
+    if key in _install_flights:
+        logger.info(
+            f"Waiting for the running 'pixi install' of {environment_name} in {project_root}"
+        )
+    return await _install_flights.run(
+        key,
+        lambda: _install(
+            environment_name=environment_name,
+            prefix=prefix,
+            project_root=project_root,
+            cwd=cwd,
+            env=env,
+            logger=logger,
+            options=options,
+        ),
+    )
+
+
+async def _install(
+    *,
+    environment_name: str,
+    prefix: str,
+    project_root: Path,
+    cwd: Path,
+    env: dict[str, str],
+    logger: logging.Logger,
+    options: tuple[str, ...],
+) -> Result[None, str]:
+    # Installs can take minutes, so their output is logged and published as it arrives
+    progress = start_install_progress(project_root, environment_name)
+
+    def on_output(line: str) -> None:
+        logger.info(f"pixi install [{environment_name}]: {line}")
+        progress.lines.append(line)
+
+    # Make sure the environment can be solved and is up-to-date
+    args = ("install", *options, "--environment", environment_name)
+    try:
+        returncode, _, stderr = await run_pixi_stream(*args, cwd=cwd, env=env, on_output=on_output)
+    finally:
+        finish_install_progress(project_root, environment_name)
+    if returncode != 0:
+        return Failure(f"Failed to run 'pixi {' '.join(args)}': {stderr}")
+
+    # `pixi install` may have updated the lockfile, so fingerprint the project again
+    fingerprint = await run_blocking(project_fingerprint, project_root)
+    await record_install(
+        prefix=prefix, environment=environment_name, fingerprint=fingerprint, options=options
+    )
+    return Success(None)
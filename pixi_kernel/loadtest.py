@@ -0,0 +1,432 @@
+import argparse
+import asyncio
+import logging
+import os
+import random
+import shutil
+import stat
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, cast
+
+import msgspec
+from jupyter_client.asynchronous.client import AsyncKernelClient
+from jupyter_client.kernelspec import KernelSpecManager
+from jupyter_client.multikernelmanager import AsyncMultiKernelManager
+
+from .metrics import REGISTRY
+
+try:
+    import psutil
+
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+DEFAULT_KERNEL = "pixi-kernel-python3"
+
+logger = logging.getLogger("pixi_kernel.loadtest")
+
+
+class Workload(msgspec.Struct, frozen=True, kw_only=True):
+    project: str
+    environment: str
+    kernel: str
+
+
+class KernelResult(msgspec.Struct, frozen=True, kw_only=True):
+    workload: Workload
+    # Seconds since the start of the load test
+    arrival: float
+    # Seconds from the arrival until `start_kernel` returned and until the kernel answered
+    launch: float | None
+    ready: float | None
+    fallback: bool
+    error: str | None
+
+
+class LatencySummary(msgspec.Struct, frozen=True, kw_only=True):
+    count: int
+    mean: float
+    p50: float
+    p90: float
+    p99: float
+    max: float
+
+
+class ProcessStats(msgspec.Struct, kw_only=True):
+    # None without psutil, except for the peak RSS which is then read from getrusage
+    peak_processes: int | None = None
+    peak_pixi_processes: int | None = None
+    peak_rss: int | None = None
+
+
+class LoadTestReport(msgspec.Struct, frozen=True, kw_only=True):
+    parameters: dict[str, Any]
+    kernels: int
+    failed: int
+    fallbacks: int
+    fallback_rate: float
+    fallback_reasons: dict[str, int]
+    duration: float
+    launch_latency: LatencySummary | None
+    ready_latency: LatencySummary | None
+    processes: ProcessStats
+    results: list[KernelResult]
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m pixi_kernel.loadtest",
+        description=(
+            "Start many Pixi kernels in this process the way a Jupyter server does, and report "
+            "how long they take to start and what it costs."
+        ),
+    )
+    parser.add_argument("-n", "--kernels", type=int, default=20, help="Kernels to start")
+    parser.add_argument("--rate", type=float, default=5, help="Kernel starts per second")
+    parser.add_argument(
+        "--arrival",
+        choices=("poisson", "uniform"),
+        default="poisson",
+        help="Random (poisson) or evenly spaced (uniform) starts",
+    )
+    parser.add_argument(
+        "--project",
+        action="append",
+        metavar="DIR[:ENV,...]",
+        help=(
+            "Pixi project to start kernels in, with the environments to use. Can be repeated, "
+            "kernels are spread randomly over all projects and environments. Defaults to the "
+            "default environment of the current directory."
+        ),
+    )
+    parser.add_argument(
+        "--kernel",
+        action="append",
+        help=f"Kernel spec name, can be repeated. Defaults to {DEFAULT_KERNEL}.",
+    )
+    parser.add_argument(
+        "--kernel-dir",
+        type=Path,
+        help="Directory of kernel specs, like `kernels` in the pixi-kernel repository",
+    )
+    parser.add_argument(
+        "--pixi",
+        type=Path,
+        help="Pixi binary to use, or a Python script standing in for it like a fake Pixi",
+    )
+    parser.add_argument(
+        "--ready-timeout", type=float, default=120, help="Seconds to wait for each kernel"
+    )
+    parser.add_argument(
+        "--hold",
+        type=float,
+        default=0,
+        help="Seconds to keep kernels running after the last start",
+    )
+    parser.add_argument(
+        "--sample-interval", type=float, default=0.25, help="Seconds between process samples"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed for arrivals and the mix")
+    parser.add_argument("--output", type=Path, help="Write the JSON report here, not stdout")
+    return parser.parse_args(argv)
+
+
+def parse_workloads(projects: list[str] | None, kernels: list[str] | None) -> list[Workload]:
+    workloads = []
+    for project in projects or [str(Path.cwd())]:
+        path, _, environments = project.rpartition(":")
+        # `C:\\project` is a Windows path, not a project and its environments
+        if len(path) <= 1 or any(separator in environments for separator in "/\\"):
+            path, environments = project, ""
+        for environment in (environments or "default").split(","):
+            for kernel in kernels or [DEFAULT_KERNEL]:
+                workloads.append(
+                    Workload(
+                        project=str(Path(path).resolve()),
+                        environment=environment,
+                        kernel=kernel,
+                    )
+                )
+    return workloads
+
+
+def arrival_times(count: int, rate: float, arrival: str, rng: random.Random) -> list[float]:
+    times = []
+    now = 0.0
+    for _ in range(count):
+        times.append(now)
+        now += rng.expovariate(rate) if arrival == "poisson" else 1 / rate
+    return times
+
+
+def find_pixi(pixi: Path | None, bin_dir: Path) -> str | None:
+    """Return the Pixi binary kernels will use, first putting `pixi` on the PATH if given."""
+    if pixi is not None:
+        return str(install_pixi(pixi, bin_dir))
+    pixi_path = shutil.which("pixi")
+    return None if pixi_path is None else str(Path(pixi_path).resolve())
+
+
+def install_pixi(pixi: Path, bin_dir: Path) -> Path:
+    """Put a `pixi` executable running `pixi` first on the PATH and return what it runs."""
+    target = pixi.resolve()
+    command = f'"{sys.executable}" "{target}"' if target.suffix == ".py" else f'"{target}"'
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    wrapper = bin_dir / "pixi"
+    wrapper.write_text(f'#!/bin/sh\nexec {command} "$@"\n')
+    wrapper.chmod(wrapper.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    os.environ["PATH"] = os.pathsep.join([str(bin_dir), os.environ.get("PATH", "")])
+    return target
+
+
+def write_notebook(directory: Path, index: int, environment: str) -> Path:
+    # Kernels find their environment in the metadata of the notebook they are started for
+    notebook = directory / f"notebook-{index}.ipynb"
+    content = {
+        "cells": [],
+        "metadata": {"pixi-kernel": {"environment": environment}},
+        "nbformat": 4,
+        "nbformat_minor": 5,
+    }
+    notebook.write_bytes(msgspec.json.encode(content))
+    return notebook
+
+
+def summarize(latencies: list[float]) -> LatencySummary | None:
+    if not latencies:
+        return None
+    ordered = sorted(latencies)
+    percentiles = (
+        statistics.quantiles(ordered, n=100, method="inclusive")
+        if len(ordered) > 1
+        else ordered * 99
+    )
+    return LatencySummary(
+        count=len(ordered),
+        mean=statistics.fmean(ordered),
+        p50=percentiles[49],
+        p90=percentiles[89],
+        p99=percentiles[98],
+        max=ordered[-1],
+    )
+
+
+def fallback_counts() -> dict[str, float]:
+    counts = {}
+    for metric in REGISTRY.collect():
+        if metric.name == "pixi_kernel_fallback_launches":
+            for sample in metric.samples:
+                if sample.name.endswith("_total"):
+                    counts[sample.labels["reason"]] = sample.value
+    return counts
+
+
+def _is_pixi_command(cmdline: list[str], pixi: str | None) -> bool:
+    # Kernels started with `pixi run` are counted as kernels, not as Pixi commands
+    for i, arg in enumerate(cmdline[:4]):
+        if arg == pixi or Path(arg).name in ("pixi", "pixi.exe"):
+            return cmdline[i + 1 : i + 2] != ["run"]
+    return False
+
+
+async def sample_processes(stats: ProcessStats, pixi: str | None, interval: float) -> None:
+    process = psutil.Process()
+    while True:
+        children = process.children(recursive=True)
+        pixi_processes = 0
+        for child in children:
+            try:
+                pixi_processes += _is_pixi_command(child.cmdline(), pixi)
+            except psutil.Error:
+                pass
+        stats.peak_processes = max(stats.peak_processes or 0, len(children))
+        stats.peak_pixi_processes = max(stats.peak_pixi_processes or 0, pixi_processes)
+        stats.peak_rss = max(stats.peak_rss or 0, process.memory_info().rss)
+        await asyncio.sleep(interval)
+
+
+async def start_kernel(
+    manager: AsyncMultiKernelManager,
+    workload: Workload,
+    *,
+    index: int,
+    notebook: Path,
+    arrival: float,
+    started_at: float,
+    ready_timeout: float,
+) -> KernelResult:
+    await asyncio.sleep(max(0, started_at + arrival - time.perf_counter()))
+    start = time.perf_counter()
+    launch = ready = None
+    fallback = False
+    error = None
+    try:
+        env = {**os.environ, "JPY_SESSION_NAME": str(notebook)}
+        kernel_id = await manager.start_kernel(
+            kernel_name=workload.kernel, cwd=workload.project, env=env
+        )
+        launch = time.perf_counter() - start
+
+        kernel_manager = manager.get_kernel(kernel_id)
+        kernel_spec = kernel_manager.kernel_spec
+        assert kernel_spec is not None
+        # Fallback kernels run `python -m pixi_kernel` instead of the kernel spec command
+        fallback = kernel_spec.argv[1:3] == ["-m", "pixi_kernel"]
+
+        client = cast(AsyncKernelClient, kernel_manager.client())
+        client.start_channels()
+        try:
+            await client.wait_for_ready(timeout=ready_timeout)
+        finally:
+            client.stop_channels()
+        ready = time.perf_counter() - start
+    except Exception as exception:
+        logger.exception(f"Kernel {index} failed to start in {workload.project}")
+        error = f"{type(exception).__name__}: {exception}"
+
+    return KernelResult(
+        workload=workload,
+        arrival=arrival,
+        launch=launch,
+        ready=ready,
+        fallback=fallback,
+        error=error,
+    )
+
+
+async def run_load_test(args: argparse.Namespace, work_dir: Path) -> LoadTestReport:
+    pixi = find_pixi(args.pixi, work_dir / "bin")
+
+    kernel_spec_manager = KernelSpecManager()
+    if args.kernel_dir is not None:
+        kernel_spec_manager.kernel_dirs = [str(args.kernel_dir)]
+    manager = AsyncMultiKernelManager(kernel_spec_manager=kernel_spec_manager)
+
+    rng = random.Random(args.seed)
+    workloads = parse_workloads(args.project, args.kernel)
+    arrivals = arrival_times(args.kernels, args.rate, args.arrival, rng)
+    fallbacks_before = fallback_counts()
+
+    stats = ProcessStats()
+    sampler = None
+    if HAS_PSUTIL:
+        sampler = asyncio.create_task(sample_processes(stats, pixi, args.sample_interval))
+
+    started_at = time.perf_counter()
+    try:
+        tasks = []
+        for index, arrival in enumerate(arrivals):
+            workload = rng.choice(workloads)
+            notebook = write_notebook(work_dir, index, workload.environment)
+            tasks.append(
+                start_kernel(
+                    manager,
+                    workload,
+                    index=index,
+                    notebook=notebook,
+                    arrival=arrival,
+                    started_at=started_at,
+                    ready_timeout=args.ready_timeout,
+                )
+            )
+        results = await asyncio.gather(*tasks)
+        duration = time.perf_counter() - started_at
+        await asyncio.sleep(args.hold)
+    finally:
+        if sampler is not None:
+            sampler.cancel()
+        # Unlike `shutdown_all`, one kernel failing to shut down doesn't stop the others
+        await asyncio.gather(
+            *(
+                manager.shutdown_kernel(kernel_id, now=True)
+                for kernel_id in manager.list_kernel_ids()
+            ),
+            return_exceptions=True,
+        )
+
+    if not HAS_PSUTIL and sys.platform != "win32":
+        import resource
+
+        # Kilobytes on Linux, bytes on macOS
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        stats.peak_rss = max_rss if sys.platform == "darwin" else max_rss * 1024
+
+    fallbacks_after = fallback_counts()
+    fallback_reasons = {
+        reason: int(count - fallbacks_before.get(reason, 0))
+        for reason, count in fallbacks_after.items()
+        if count > fallbacks_before.get(reason, 0)
+    }
+    fallbacks = sum(result.fallback for result in results)
+    return LoadTestReport(
+        parameters={
+            key: str(value) if isinstance(value, Path) else value
+            for key, value in vars(args).items()
+        },
+        kernels=len(results),
+        failed=sum(result.error is not None for result in results),
+        fallbacks=fallbacks,
+        fallback_rate=fallbacks / len(results) if results else 0.0,
+        fallback_reasons=fallback_reasons,
+        duration=duration,
+        launch_latency=summarize([r.launch for r in results if r.launch is not None]),
+        ready_latency=summarize([r.ready for r in results if r.ready is not None]),
+        processes=stats,
+        results=results,
+    )
+
+
+def print_summary(report: LoadTestReport) -> None:
+    lines = [
+        (
+            f"Kernels: {report.kernels} in {report.duration:.1f}s, {report.failed} failed, "
+            f"{report.fallbacks} fallback ({report.fallback_rate:.0%})"
+        ),
+    ]
+    for name, summary in (("Launch", report.launch_latency), ("Ready", report.ready_latency)):
+        if summary is not None:
+            lines.append(
+                f"{name} latency: p50 {summary.p50:.3f}s, p90 {summary.p90:.3f}s, "
+                f"p99 {summary.p99:.3f}s, max {summary.max:.3f}s"
+            )
+    for reason, count in sorted(report.fallback_reasons.items()):
+        lines.append(f"Fallback reason {reason}: {count}")
+    processes = report.processes
+    if processes.peak_processes is not None:
+        lines.append(
+            f"Peak subprocesses: {processes.peak_processes}, "
+            f"of which Pixi commands: {processes.peak_pixi_processes}"
+        )
+    if processes.peak_rss is not None:
+        lines.append(f"Peak RSS: {processes.peak_rss / 2**20:.1f} MiB")
+    print("\n".join(lines), file=sys.stderr)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(format="%(levelname)s %(name)s: %(message)s")
+    if args.kernels < 1 or args.rate <= 0:
+        print("--kernels and --rate must be positive", file=sys.stderr)
+        return 2
+    if args.kernel_dir is not None:
+        args.kernel_dir = args.kernel_dir.resolve()
+
+    with tempfile.TemporaryDirectory(prefix="pixi-kernel-loadtest-") as work_dir:
+        report = asyncio.run(run_load_test(args, Path(work_dir)))
+
+    print_summary(report)
+    output = msgspec.json.format(msgspec.json.encode(report))
+    if args.output is None:
+        sys.stdout.buffer.write(output + b"\n")
+    else:
+        args.output.write_bytes(output + b"\n")
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
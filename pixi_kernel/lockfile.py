@@ -0,0 +1,219 @@
+import platform
+from pathlib import Path
+
+from .blocking import run_blocking
+from .cache import LRUCache
+from .fingerprint import FileFingerprint, file_fingerprint
+from .metrics import record_cache_lookup
+from .store import get_store
+
+LOCK_INDEX_CACHE_SIZE = 64
+
+# Lockfile versions whose layout `_parse_lockfile` understands
+SUPPORTED_LOCK_VERSIONS = ("4", "5", "6")
+
+# Package names per environment and platform, e.g. `index["default"]["linux-64"]`
+LockIndex = dict[str, dict[str, frozenset[str]]]
+
+# Parsed lockfiles keyed by path. Unparseable lockfiles are cached as None so they are only read
+# once per change.
+_lock_index_cache: LRUCache[Path, tuple[FileFingerprint, LockIndex | None]] = LRUCache(
+    maxsize=LOCK_INDEX_CACHE_SIZE
+)
+
+_CONDA_ARCHIVE_SUFFIXES = (".conda", ".tar.bz2")
+
+
+class LockfileError(Exception):
+    pass
+
+
+def current_platform() -> str | None:
+    """Return the conda platform of this machine, e.g. `linux-64`, or None if it is unknown."""
+    system = platform.system()
+    machine = platform.machine().lower()
+    if system == "Linux":
+        if machine in ("aarch64", "arm64"):
+            return "linux-aarch64"
+        if machine in ("x86_64", "amd64"):
+            return "linux-64"
+        if machine == "ppc64le":
+            return "linux-ppc64le"
+    elif system == "Darwin":
+        if machine == "arm64":
+            return "osx-arm64"
+        if machine == "x86_64":
+            return "osx-64"
+    elif system == "Windows":
+        if machine == "arm64":
+            return "win-arm64"
+        if machine in ("amd64", "x86_64"):
+            return "win-64"
+    return None
+
+
+async def get_lock_index(lockfile: Path) -> LockIndex | None:
+    """Return the package name index of `lockfile`, or None if it is missing or unparseable."""
+    fingerprint = await run_blocking(file_fingerprint, lockfile)
+    if fingerprint is None:
+        return None
+
+    cached = _lock_index_cache.get(lockfile)
+    hit = cached is not None and cached[0] == fingerprint
+    record_cache_lookup("lock-index", hit=hit)
+    if cached is not None and hit:
+        return cached[1]
+
+    # Unparseable lockfiles are stored as well, as an empty index
+    store = get_store()
+    if store is not None:
+        stored = await store.get("lock-index", str(lockfile), fingerprint, LockIndex)
+        record_cache_lookup("lock-index-store", hit=stored is not None)
+        if stored is not None:
+            index: LockIndex | None = stored or None
+            _lock_index_cache.put(lockfile, (fingerprint, index))
+            return index
+
+    try:
+        index = await run_blocking(_parse_lockfile, lockfile)
+    except (OSError, UnicodeDecodeError, LockfileError):
+        index = None
+
+    _lock_index_cache.put(lockfile, (fingerprint, index))
+    if store is not None:
+        await store.put("lock-index", str(lockfile), fingerprint, index or {})
+    return index
+
+
+async def get_locked_packages(
+    lockfile: Path, environment: str, platform: str | None = None
+) -> frozenset[str] | None:
+    """Return the names of the packages locked for `environment` on `platform`.
+
+    `platform` defaults to the current one. Returns None when the lockfile can't answer, either
+    because it is missing or unparseable or because it doesn't have the environment or platform.
+    """
+    if platform is None:
+        platform = current_platform()
+        if platform is None:
+            return None
+
+    index = await get_lock_index(lockfile)
+    if index is None:
+        return None
+    return index.get(environment, {}).get(platform)
+
+
+def _parse_lockfile(lockfile: Path) -> LockIndex:
+    # `pixi.lock` is YAML written by Pixi with a fixed layout. Under `environments`, each
+    # environment has a `packages` mapping from platform to a list of `conda: <url>` and
+    # `pypi: <url>` entries. The top-level `packages` list has one entry per package, starting with
+    # the same `conda: <url>` or `pypi: <url>` key and followed by its fields, like `name`.
+    #
+    # Lockfiles of large environments are several megabytes, so instead of decoding all of it
+    # with a YAML parser the file is scanned line by line, keeping only package names. Conda
+    # package names come from the archive file name, other packages are looked up by their
+    # location in the top-level `packages` list.
+    names: dict[str, dict[str, set[str]]] = {}
+    # Locations of packages whose name isn't part of the location, per environment and platform
+    unresolved: dict[str, dict[str, list[str]]] = {}
+    wanted: set[str] = set()
+    resolved: dict[str, str] = {}
+
+    section = ""
+    environment = ""
+    platform = ""
+    in_packages = False
+    location = ""
+    name = ""
+
+    with lockfile.open(encoding="utf-8") as file:
+        first_line = file.readline()
+        version = first_line.removeprefix("version:").strip()
+        if not first_line.startswith("version:") or version not in SUPPORTED_LOCK_VERSIONS:
+            raise LockfileError(f"Unsupported lockfile version: {first_line.strip()}")
+
+        for line in file:
+            line = line.rstrip("\r\n")
+            stripped = line.lstrip(" ")
+            if not stripped or stripped.startswith("#"):
+                continue
+            indent = len(line) - len(stripped)
+
+            if indent == 0 and not stripped.startswith("- "):
+                if section == "packages" and location in wanted:
+                    resolved[location] = name
+                section = stripped.removesuffix(":")
+                location = name = ""
+                continue
+
+            if section == "environments":
+                is_item = stripped.startswith("- ")
+                if indent == 2 and not is_item:
+                    environment = _unquote(stripped.removesuffix(":"))
+                    names[environment] = {}
+                    unresolved[environment] = {}
+                    in_packages = False
+                elif indent == 4 and not is_item:
+                    in_packages = stripped == "packages:"
+                    platform = ""
+                elif in_packages and not is_item:
+                    platform = _unquote(stripped.removesuffix(":"))
+                    names[environment][platform] = set()
+                    unresolved[environment][platform] = []
+                elif in_packages and platform:
+                    key, _, value = stripped.removeprefix("- ").partition(":")
+                    value = _unquote(value.strip())
+                    if key == "conda" and value.endswith(_CONDA_ARCHIVE_SUFFIXES):
+                        names[environment][platform].add(_conda_name(value))
+                    else:
+                        unresolved[environment][platform].append(value)
+                        wanted.add(value)
+
+            elif section == "packages":
+                if stripped.startswith("- ") and indent == 0:
+                    if location in wanted:
+                        resolved[location] = name
+                    location = name = ""
+                    stripped = stripped.removeprefix("- ")
+                elif indent != 2 or stripped.startswith("- "):
+                    # Nested lists and mappings of a package, like `depends`
+                    continue
+
+                key, _, value = stripped.partition(":")
+                value = _unquote(value.strip())
+                # Since version 6 packages are identified by a `conda` or `pypi` key, before
+                # that by a `url` or `path` key next to `kind`
+                if key in ("conda", "pypi", "url", "path"):
+                    location = value
+                elif key == "name":
+                    name = value
+
+        if section == "packages" and location in wanted:
+            resolved[location] = name
+
+    index: LockIndex = {}
+    for environment, platforms in names.items():
+        index[environment] = {}
+        for platform, platform_names in platforms.items():
+            for location in unresolved[environment][platform]:
+                if not resolved.get(location):
+                    raise LockfileError(f"Package {location} not found in lockfile")
+                platform_names.add(resolved[location])
+            index[environment][platform] = frozenset(platform_names)
+
+    return index
+
+
+def _conda_name(url: str) -> str:
+    # Conda archives are named `<name>-<version>-<build>.conda`, names can contain dashes
+    filename = url.rsplit("/", 1)[-1]
+    for suffix in _CONDA_ARCHIVE_SUFFIXES:
+        filename = filename.removesuffix(suffix)
+    return filename.rsplit("-", 2)[0]
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in ("'", '"'):
+        return value[1:-1]
+    return value
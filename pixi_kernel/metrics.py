@@ -0,0 +1,130 @@
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+
+from .blocking import add_blocking_observer
+from .tracing import Span, add_span_observer
+
+# Kept apart from the Jupyter server metrics, served at /pixi-kernel/metrics
+REGISTRY = CollectorRegistry(auto_describe=True)
+
+# From a few milliseconds for cached launches to several minutes for first installs
+DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+LAUNCH_DURATION = Histogram(
+    "pixi_kernel_launch_duration_seconds",
+    "Time from the start of a kernel launch until the kernel process is started.",
+    ["fallback"],
+    buckets=DURATION_BUCKETS,
+    registry=REGISTRY,
+)
+LAUNCHES_IN_PROGRESS = Gauge(
+    "pixi_kernel_launches_in_progress",
+    "Kernel launches that didn't start the kernel process yet.",
+    registry=REGISTRY,
+)
+FALLBACK_LAUNCHES = Counter(
+    "pixi_kernel_fallback_launches",
+    "Fallback kernels launched instead of Pixi kernels, by reason or failed readiness step.",
+    ["reason"],
+    registry=REGISTRY,
+)
+PIXI_COMMAND_DURATION = Histogram(
+    "pixi_kernel_pixi_command_duration_seconds",
+    "Duration of Pixi commands.",
+    ["command"],
+    buckets=DURATION_BUCKETS,
+    registry=REGISTRY,
+)
+PIXI_COMMAND_FAILURES = Counter(
+    "pixi_kernel_pixi_command_failures",
+    "Pixi commands that exited with a non-zero exit code.",
+    ["command"],
+    registry=REGISTRY,
+)
+INSTALL_SECONDS = Counter(
+    "pixi_kernel_install_seconds",
+    "Time spent running `pixi install`.",
+    registry=REGISTRY,
+)
+INSTALL_OUTPUT_BYTES = Counter(
+    "pixi_kernel_install_output_bytes",
+    "Output written by `pixi install`.",
+    registry=REGISTRY,
+)
+PIXI_RUNNING = Gauge(
+    "pixi_kernel_pixi_running",
+    "Pixi commands running in a slot of the scheduler.",
+    registry=REGISTRY,
+)
+PIXI_QUEUED = Gauge(
+    "pixi_kernel_pixi_queued",
+    "Pixi commands waiting for a slot, by priority.",
+    ["priority"],
+    registry=REGISTRY,
+)
+PIXI_QUEUE_DURATION = Histogram(
+    "pixi_kernel_pixi_queue_duration_seconds",
+    "Time Pixi commands waited for a slot, by priority.",
+    ["priority"],
+    buckets=DURATION_BUCKETS,
+    registry=REGISTRY,
+)
+PIXI_REJECTED = Counter(
+    "pixi_kernel_pixi_rejected",
+    "Pixi commands rejected because too many were waiting, by priority.",
+    ["priority"],
+    registry=REGISTRY,
+)
+EVENT_LOOP_BLOCKING = Histogram(
+    "pixi_kernel_event_loop_blocking_seconds",
+    "Time pixi-kernel code ran without yielding to the event loop, by operation.",
+    ["operation"],
+    # Anything above a few milliseconds delays the requests of all other users
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+    registry=REGISTRY,
+)
+CACHE_REQUESTS = Counter(
+    "pixi_kernel_cache_requests",
+    "Lookups of cached Pixi state, by cache and result.",
+    ["cache", "result"],
+    registry=REGISTRY,
+)
+
+
+def record_cache_lookup(cache: str, *, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def generate_metrics() -> bytes:
+    return generate_latest(REGISTRY)
+
+
+def _observe_span(span: Span) -> None:
+    assert span.duration is not None
+
+    if span.name == "launch":
+        fallback_reason = span.attributes.get("fallback_reason")
+        LAUNCH_DURATION.labels(fallback=str(fallback_reason is not None).lower()).observe(
+            span.duration
+        )
+        if fallback_reason is not None:
+            FALLBACK_LAUNCHES.labels(reason=str(fallback_reason)).inc()
+
+    elif span.name.startswith("pixi ") and not span.attributes.get("rejected"):
+        # `pixi info`, `pixi --version`, ...
+        command = span.name.removeprefix("pixi ").lstrip("-")
+        PIXI_COMMAND_DURATION.labels(command=command).observe(span.duration)
+        if span.attributes.get("exit_code", 0) != 0:
+            PIXI_COMMAND_FAILURES.labels(command=command).inc()
+        if command == "install":
+            INSTALL_SECONDS.inc(span.duration)
+            INSTALL_OUTPUT_BYTES.inc(float(span.attributes.get("output_bytes", 0)))
+
+
+add_span_observer(_observe_span)
+
+
+def _observe_blocking(operation: str, seconds: float) -> None:
+    EVENT_LOOP_BLOCKING.labels(operation=operation).observe(seconds)
+
+
+add_blocking_observer(_observe_blocking)
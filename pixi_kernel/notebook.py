@@ -0,0 +1,183 @@
+import re
+from pathlib import Path
+from typing import BinaryIO
+
+import msgspec
+
+from .cache import LRUCache
+from .fingerprint import FileFingerprint, file_fingerprint
+from .metrics import record_cache_lookup
+
+NOTEBOOK_CACHE_SIZE = 256
+
+# Sizes of the end of the notebook searched for the top-level metadata before scanning all of it
+TAIL_SIZES = (64 * 1024, 1024 * 1024, 16 * 1024 * 1024)
+# How many `"metadata":` keys of each tail are tried, the top-level one is usually the last
+MAX_TAIL_CANDIDATES = 8
+CHUNK_SIZE = 1024 * 1024
+
+# Environment names from notebook metadata keyed by notebook path. None means the notebook has no
+# `pixi-kernel.environment` metadata.
+_notebook_cache: LRUCache[Path, tuple[FileFingerprint, str | None]] = LRUCache(
+    maxsize=NOTEBOOK_CACHE_SIZE
+)
+
+_METADATA_KEY = re.compile(rb'"metadata"\s*:')
+# Bytes that change the nesting of the JSON document. At the top level, commas and colons are
+# needed as well to tell keys from values.
+_STRUCTURE = re.compile(rb'["{}\[\]]')
+_TOP_LEVEL_STRUCTURE = re.compile(rb'["{}\[\],:]')
+_STRING_END = re.compile(rb'["\\]')
+
+
+class NotebookMetadataError(Exception):
+    pass
+
+
+class PixiKernelMetadata(msgspec.Struct, frozen=True, kw_only=True):
+    environment: str | None = None
+
+
+class NotebookMetadata(msgspec.Struct, frozen=True, kw_only=True):
+    pixi_kernel: PixiKernelMetadata | None = msgspec.field(name="pixi-kernel", default=None)
+
+
+class NotebookTail(msgspec.Struct, frozen=True, kw_only=True):
+    metadata: NotebookMetadata
+
+
+def read_notebook_environment(path: Path) -> str:
+    """Return `metadata.pixi-kernel.environment` of the notebook at `path`.
+
+    Notebooks with outputs can be hundreds of megabytes, so only the top-level metadata is decoded
+    and results are cached until the notebook changes. Raises NotebookMetadataError if the notebook
+    doesn't have the metadata and OSError if it can't be read.
+    """
+    fingerprint = file_fingerprint(path)
+    if fingerprint is None:
+        raise FileNotFoundError(f"Notebook {path} not found")
+
+    cached = _notebook_cache.get(path)
+    hit = cached is not None and cached[0] == fingerprint
+    record_cache_lookup("notebook", hit=hit)
+    if cached is not None and hit:
+        environment = cached[1]
+    else:
+        metadata = _read_metadata(path, fingerprint.size)
+        pixi_kernel = metadata.pixi_kernel
+        environment = None if pixi_kernel is None else pixi_kernel.environment
+        _notebook_cache.put(path, (fingerprint, environment))
+
+    if environment is None:
+        raise NotebookMetadataError(f"Notebook {path} has no pixi-kernel environment metadata")
+    return environment
+
+
+def _read_metadata(path: Path, size: int) -> NotebookMetadata:
+    with path.open("rb") as file:
+        # Jupyter writes notebooks with sorted keys, so the top-level metadata comes after all the
+        # cells, followed only by `nbformat` and `nbformat_minor`
+        for tail_size in TAIL_SIZES:
+            file.seek(max(size - tail_size, 0))
+            metadata = _metadata_from_tail(file.read())
+            if metadata is not None:
+                return metadata
+            if tail_size >= size:
+                break
+
+        file.seek(0)
+        return _scan_metadata(file)
+
+
+def _metadata_from_tail(tail: bytes) -> NotebookMetadata | None:
+    # A `"metadata":` key followed by the rest of the document is a valid JSON object once an
+    # opening brace is added only if the key belongs to the top-level object. Any other match
+    # leaves unbalanced brackets behind and fails to decode.
+    candidates = list(_METADATA_KEY.finditer(tail))[-MAX_TAIL_CANDIDATES:]
+    for match in reversed(candidates):
+        try:
+            return msgspec.json.decode(b"{" + tail[match.start() :], type=NotebookTail).metadata
+        except msgspec.DecodeError:
+            continue
+    return None
+
+
+def _scan_metadata(file: BinaryIO) -> NotebookMetadata:
+    # Walk the document chunk by chunk, skipping over strings and nested values with regular
+    # expressions, until the value of the top-level `metadata` key has been read.
+    depth = 0
+    in_string = False
+    escaped = False
+    expect_key = False
+    key = bytearray()
+    is_key = False
+    metadata_key = False
+    captured: bytearray | None = None
+
+    while chunk := file.read(CHUNK_SIZE):
+        position = 0
+        capture_start = 0
+        if escaped:
+            position = 1
+            escaped = False
+
+        while position < len(chunk):
+            if in_string:
+                match = _STRING_END.search(chunk, position)
+                end = len(chunk) if match is None else match.start()
+                if is_key:
+                    key += chunk[position:end]
+                if match is None:
+                    position = end
+                elif chunk[end] == ord("\\"):
+                    if is_key:
+                        key += chunk[end : end + 2]
+                    if end + 1 == len(chunk):
+                        escaped = True
+                    position = end + 2
+                else:
+                    in_string = False
+                    if is_key:
+                        metadata_key = key == b"metadata"
+                    position = end + 1
+                continue
+
+            pattern = _TOP_LEVEL_STRUCTURE if depth == 1 else _STRUCTURE
+            match = pattern.search(chunk, position)
+            if match is None:
+                break
+            char = chunk[match.start()]
+            position = match.end()
+
+            if char == ord('"'):
+                in_string = True
+                is_key = depth == 1 and expect_key
+                key.clear()
+            elif char == ord(":"):
+                expect_key = False
+            elif char == ord(","):
+                expect_key = True
+                if metadata_key:
+                    raise NotebookMetadataError("Notebook metadata is not an object")
+            elif char in b"{[":
+                depth += 1
+                if depth == 1:
+                    expect_key = True
+                elif depth == 2 and metadata_key:
+                    captured = bytearray()
+                    capture_start = match.start()
+            else:
+                depth -= 1
+                if depth == 1 and captured is not None:
+                    captured += chunk[capture_start : match.end()]
+                    try:
+                        return msgspec.json.decode(captured, type=NotebookMetadata)
+                    except msgspec.MsgspecError as exception:
+                        raise NotebookMetadataError(str(exception)) from exception
+                if depth == 0:
+                    raise NotebookMetadataError("Notebook has no metadata")
+
+        if captured is not None:
+            captured += chunk[capture_start:]
+
+    raise NotebookMetadataError("Notebook ended before its metadata")
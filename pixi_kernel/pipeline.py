@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any, NamedTuple
+
+from returns.result import Failure, Result, Success
+
+from .tracing import current_span, span
+
+
+class Step(NamedTuple):
+    name: str
+    # Called with the values of the steps in `depends_on` as keyword arguments
+    run: Callable[..., Awaitable[Result[Any, str]]]
+    depends_on: tuple[str, ...] = ()
+
+
+async def run_steps(steps: list[Step], *, logger: logging.Logger) -> Result[dict[str, Any], str]:
+    """Run `steps` concurrently, each one as soon as the steps it depends on succeeded.
+
+    Steps must be listed after the steps they depend on. When a step fails, the steps listed after
+    it are cancelled, while the ones listed before it run to completion. The failure of the first
+    failed step in the list is returned, so the error is the same as if the steps ran one by one.
+    """
+    timings: dict[str, float] = {}
+    tasks: dict[str, asyncio.Task[Result[Any, str]]] = {}
+
+    async def run_step(step: Step) -> Result[Any, str]:
+        dependencies = {}
+        for name in step.depends_on:
+            # Cancelling this step must not cancel the steps it depends on
+            result = await asyncio.shield(tasks[name])
+            if isinstance(result, Failure):
+                return result
+            dependencies[name] = result.unwrap()
+
+        start = time.perf_counter()
+        try:
+            with span(step.name) as step_span:
+                result = await step.run(**dependencies)
+                step_span.set(failed=isinstance(result, Failure))
+                return result
+        finally:
+            timings[step.name] = time.perf_counter() - start
+
+    for step in steps:
+        tasks[step.name] = asyncio.create_task(run_step(step))
+
+    start = time.perf_counter()
+    try:
+        pending = set(tasks.values())
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.cancelled():
+                    continue
+                exception = task.exception()
+                if exception is not None:
+                    raise exception
+                if isinstance(task.result(), Failure):
+                    failed = list(tasks.values()).index(task)
+                    for later_task in list(tasks.values())[failed + 1 :]:
+                        later_task.cancel()
+    finally:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+        step_timings = ", ".join(
+            f"{name} {timings[name]:.3f}s" for name in tasks if name in timings
+        )
+        logger.info(f"Steps took {time.perf_counter() - start:.3f}s: {step_timings}")
+
+    results = {}
+    for name, task in tasks.items():
+        result = task.result()
+        if isinstance(result, Failure):
+            parent_span = current_span()
+            if parent_span is not None:
+                parent_span.set(failed_step=name)
+            return result
+        results[name] = result.unwrap()
+
+    return Success(results)
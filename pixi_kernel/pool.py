@@ -0,0 +1,209 @@
+import asyncio
+import atexit
+import logging
+import os
+import signal
+import time
+import uuid
+from pathlib import Path
+from subprocess import Popen
+from typing import Any
+
+import msgspec
+from jupyter_client.connect import KernelConnectionInfo, write_connection_file
+from jupyter_client.launcher import launch_kernel
+from jupyter_client.session import new_id_bytes
+
+from .fingerprint import ProjectFingerprint
+
+# (working directory, Pixi environment name, kernel spec resource directory)
+PoolKey = tuple[str, str, str]
+
+
+class PooledKernel(msgspec.Struct, frozen=True, kw_only=True):
+    process: Popen[bytes]
+    connection_info: KernelConnectionInfo
+    connection_file: Path
+    fingerprint: ProjectFingerprint
+    started_at: float
+
+    def discard(self) -> None:
+        # Like `LocalProvisioner.kill`, kill the process group: `launch_kernel` starts a new
+        # session and, with `pixi run`, the kernel itself is a child of the launched process
+        if hasattr(os, "killpg"):
+            try:
+                pgid = os.getpgid(self.process.pid)
+                if pgid != os.getpgrp():
+                    os.killpg(pgid, signal.SIGKILL)
+            except OSError:
+                pass
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        self.connection_file.unlink(missing_ok=True)
+
+
+class LaunchTemplate(msgspec.Struct, frozen=True, kw_only=True):
+    """How a kernel was launched, so that identical kernels can be started ahead of time."""
+
+    cmd: list[str]
+    connection_file: str
+    launch_kwargs: dict[str, Any]
+    ip: str
+    transport: str
+    signature_scheme: str
+    kernel_name: str
+
+
+class KernelPool:
+    """Idle, already started kernels for recently launched (cwd, environment, kernel) keys.
+
+    Keys become hot the first time a kernel is launched for them. From then on, the pool is
+    refilled in the background after every launch for that key. Pooled kernels are discarded when
+    they are older than `idle_ttl` seconds or when the project fingerprint no longer matches.
+    """
+
+    def __init__(self) -> None:
+        self._kernels: dict[PoolKey, list[PooledKernel]] = {}
+        self._refills: dict[PoolKey, asyncio.Task[None]] = {}
+        # A single timer evicts expired kernels, rescheduled for the oldest kernel left
+        self._expiry: asyncio.TimerHandle | None = None
+
+    def __len__(self) -> int:
+        return sum(len(kernels) for kernels in self._kernels.values())
+
+    def take(self, key: PoolKey, fingerprint: ProjectFingerprint) -> PooledKernel | None:
+        kernels = self._kernels.get(key, [])
+        if any(kernel.fingerprint != fingerprint for kernel in kernels):
+            self.evict(key)
+            return None
+
+        while kernels:
+            kernel = kernels.pop(0)
+            if kernel.process.poll() is None:
+                return kernel
+            kernel.discard()
+
+        return None
+
+    def evict(self, key: PoolKey) -> None:
+        for kernel in self._kernels.pop(key, []):
+            kernel.discard()
+
+    def evict_project(self, project_root: Path) -> None:
+        for key in [key for key in self._kernels if Path(key[0]).is_relative_to(project_root)]:
+            self.evict(key)
+
+    def evict_expired(self, idle_ttl: float) -> None:
+        now = time.monotonic()
+        for key in list(self._kernels):
+            kernels = self._kernels[key]
+            for kernel in [k for k in kernels if now - k.started_at >= idle_ttl]:
+                kernels.remove(kernel)
+                kernel.discard()
+            if not kernels:
+                del self._kernels[key]
+
+    def clear(self) -> None:
+        if self._expiry is not None:
+            self._expiry.cancel()
+            self._expiry = None
+        for key in list(self._kernels):
+            self.evict(key)
+
+    def refill(
+        self,
+        key: PoolKey,
+        fingerprint: ProjectFingerprint,
+        template: LaunchTemplate,
+        *,
+        size: int,
+        max_kernels: int,
+        idle_ttl: float,
+        logger: logging.Logger,
+    ) -> asyncio.Task[None]:
+        """Start kernels for `key` in the background until it has `size` idle kernels."""
+        task = self._refills.get(key)
+        # A running refill checks the pool again before starting each kernel
+        if task is None or task.done():
+            task = asyncio.create_task(
+                self._refill(key, fingerprint, template, size, max_kernels, idle_ttl, logger)
+            )
+            self._refills[key] = task
+        return task
+
+    async def _refill(
+        self,
+        key: PoolKey,
+        fingerprint: ProjectFingerprint,
+        template: LaunchTemplate,
+        size: int,
+        max_kernels: int,
+        idle_ttl: float,
+        logger: logging.Logger,
+    ) -> None:
+        while len(self._kernels.get(key, [])) < size and len(self) < max_kernels:
+            # Not run_blocking: a kernel started after a timeout would never reach the pool, and
+            # could never be discarded
+            try:
+                kernel = await asyncio.to_thread(self._start_kernel, fingerprint, template)
+            except Exception:
+                logger.exception(f"Failed to start a pooled kernel for {key}")
+                break
+            # The key may have been evicted while the kernel started
+            self._kernels.setdefault(key, []).append(kernel)
+            self._schedule_expiry(idle_ttl)
+        logger.info(f"Kernel pool for {key} has {len(self._kernels.get(key, []))} idle kernels")
+
+    def _schedule_expiry(self, idle_ttl: float) -> None:
+        if self._expiry is not None or not self._kernels:
+            return
+        oldest = min(kernel.started_at for kernels in self._kernels.values() for kernel in kernels)
+        delay = max(oldest + idle_ttl - time.monotonic(), 0)
+        self._expiry = asyncio.get_running_loop().call_later(delay, self._expire, idle_ttl)
+
+    def _expire(self, idle_ttl: float) -> None:
+        self._expiry = None
+        self.evict_expired(idle_ttl)
+        self._schedule_expiry(idle_ttl)
+
+    @staticmethod
+    def _start_kernel(fingerprint: ProjectFingerprint, template: LaunchTemplate) -> PooledKernel:
+        connection_file = Path(template.connection_file).with_name(
+            f"kernel-pixi-pool-{uuid.uuid4()}.json"
+        )
+        _, connection_info = write_connection_file(
+            fname=str(connection_file),
+            ip=template.ip,
+            key=new_id_bytes(),
+            transport=template.transport,
+            signature_scheme=template.signature_scheme,
+            kernel_name=template.kernel_name,
+        )
+        # Kernel managers hold the key as bytes and compare it with what the provisioner returns
+        connection_info["key"] = connection_info["key"].encode()  # type: ignore[typeddict-item]
+
+        cmd = [arg.replace(template.connection_file, str(connection_file)) for arg in template.cmd]
+        launch_kwargs = template.launch_kwargs.copy()
+        # The notebook that will adopt this kernel is not known yet
+        launch_kwargs["env"] = {
+            k: v for k, v in launch_kwargs.get("env", {}).items() if k != "JPY_SESSION_NAME"
+        }
+        process = launch_kernel(cmd, **launch_kwargs)
+
+        return PooledKernel(
+            process=process,
+            connection_info=connection_info,
+            connection_file=connection_file,
+            fingerprint=fingerprint,
+            started_at=time.monotonic(),
+        )
+
+
+_kernel_pool = KernelPool()
+atexit.register(_kernel_pool.clear)
+
+
+def evict_project(project_root: Path) -> None:
+    """Discard the pooled kernels of the project in `project_root`."""
+    _kernel_pool.evict_project(project_root)
@@ -0,0 +1,35 @@
+import time
+from collections import deque
+from pathlib import Path
+
+import msgspec
+
+# Number of output lines kept per running install for the frontend
+PROGRESS_LINES = 20
+
+
+class InstallProgress(msgspec.Struct, kw_only=True):
+    environment: str
+    started_at: float = msgspec.field(default_factory=time.time)
+    lines: deque[str] = msgspec.field(default_factory=lambda: deque(maxlen=PROGRESS_LINES))
+
+
+# Running `pixi install` commands by project root and environment name
+_install_progress: dict[Path, dict[str, InstallProgress]] = {}
+
+
+def start_install_progress(project_root: Path, environment_name: str) -> InstallProgress:
+    progress = InstallProgress(environment=environment_name)
+    _install_progress.setdefault(project_root, {})[environment_name] = progress
+    return progress
+
+
+def finish_install_progress(project_root: Path, environment_name: str) -> None:
+    installs = _install_progress.get(project_root, {})
+    installs.pop(environment_name, None)
+    if not installs:
+        _install_progress.pop(project_root, None)
+
+
+def get_install_progress(project_root: Path) -> list[InstallProgress]:
+    return list(_install_progress.get(project_root, {}).values())
@@ -1,49 +1,180 @@
-import json
 import os
+import shutil
 import sys
 from pathlib import Path
-from typing import Any, cast
+from typing import TYPE_CHECKING, Any, NamedTuple, cast
 
+import msgspec
+from jupyter_client.connect import KernelConnectionInfo, LocalPortCache
 from jupyter_client.kernelspec import KernelSpec
 from jupyter_client.provisioning.local_provisioner import LocalProvisioner
-from returns.result import Failure
 
-from .compatibility import find_pixi_binary
-from .readiness import verify_env_readiness
+from .blocking import FileSystemTimeoutError, configure_blocking, measure_blocking, run_blocking
+from .config import (
+    LAUNCH_MODES,
+    LAUNCH_POLICIES,
+    LOCKFILE_OPTIONS,
+    Config,
+    LaunchPolicy,
+    load_config,
+)
+from .tracing import Span, configure_tracing, current_span, span, start_span, use_span
+
+# Jupyter loads this module to list kernel specs, e.g. `jupyter kernelspec list`, so the modules
+# for launching Pixi kernels, with their dependencies, are only imported by the methods using them
+if TYPE_CHECKING:
+    from .fingerprint import FileFingerprint, ProjectFingerprint
+    from .pool import PooledKernel, PoolKey
+    from .types import Environment
+
+
+class LaunchFingerprints(NamedTuple):
+    """The files a launch state depends on, `None` for files that don't exist."""
+
+    project_root: str | None
+    project: "ProjectFingerprint"
+    kernel_spec: "FileFingerprint | None"
+    # The kernel binary or Pixi, `argv[0]` of the launch command
+    program: "FileFingerprint | None"
+    # Changes whenever packages are installed into or removed from the environment
+    prefix: "FileFingerprint | None"
+    notebook: "FileFingerprint | None"
+
+
+class LaunchState(msgspec.Struct, frozen=True, kw_only=True):
+    """The outcome of a successful launch, reused by restarts while its fingerprints hold."""
+
+    config: Config
+    # As provided by the kernel manager
+    cwd: str | None
+    notebook_path: str | None
+    environment_name: str
+    prefix: str
+    launch_mode: str
+    argv: list[str]
+    env: dict[str, str]
+    fingerprints: LaunchFingerprints
+
+
+def _project_fingerprints(cwd: Path) -> "tuple[str | None, ProjectFingerprint]":
+    from .fingerprint import find_project_root, project_fingerprint
+
+    project_root = find_project_root(cwd.resolve())
+    if project_root is None:
+        return None, ()
+    return str(project_root), project_fingerprint(project_root)
+
+
+def _launch_fingerprints(
+    *,
+    cwd: Path,
+    resource_dir: str,
+    program: str,
+    prefix: str,
+    notebook_path: str | None,
+    project: "tuple[str | None, ProjectFingerprint] | None" = None,
+) -> LaunchFingerprints:
+    from .fingerprint import file_fingerprint
+
+    project_root, fingerprint = project or _project_fingerprints(cwd)
+    return LaunchFingerprints(
+        project_root=project_root,
+        project=fingerprint,
+        kernel_spec=file_fingerprint(Path(resource_dir) / "kernel.json"),
+        program=file_fingerprint(Path(program)),
+        prefix=file_fingerprint(Path(prefix) / "conda-meta"),
+        notebook=None if notebook_path is None else file_fingerprint(Path(notebook_path)),
+    )
 
 
 class PixiKernelProvisioner(LocalProvisioner):
-    async def _launch_fallback_kernel(self, *, message: str, **kwargs: Any) -> dict[str, Any]:
+    _config: Config = Config()
+    # Set by `pre_launch` when the launch may be served from, and refill, the kernel pool
+    _pool_key: "PoolKey | None" = None
+    _pool_fingerprint: "ProjectFingerprint" = ()
+    # Restarts must keep the connection info clients are already using, so they never use the pool
+    _launched: bool = False
+    # From the start of `pre_launch` until the kernel process is started in `launch_kernel`
+    _launch_span: Span | None = None
+    # Set by a successful Pixi kernel launch, so that restarts can skip the readiness checks
+    _launch_state: LaunchState | None = None
+
+    async def _launch_fallback_kernel(
+        self, *, reason: str, message: str, **kwargs: Any
+    ) -> dict[str, Any]:
+        if self._launch_span is not None:
+            self._launch_span.set(fallback=True, fallback_reason=reason)
+        # Restarting after fixing the project must run the readiness checks again
+        self._launch_state = None
+
         kernel_spec = cast(KernelSpec, self.kernel_spec)
         kernel_spec.argv = [sys.executable, "-m", "pixi_kernel", "{connection_file}", message]
         self.log.info(f"Launching fallback kernel: {kernel_spec.to_dict()}")
         return await super().pre_launch(**kwargs)
 
-    async def pre_launch(self, **kwargs: Any) -> dict[str, Any]:
+    async def _direct_launch(
+        self,
+        *,
+        pixi_environment: "Environment",
+        environment_name: str,
+        launch_policy: LaunchPolicy,
+        cwd: Path,
+        env: dict[str, str],
+    ) -> bool:
+        """Run the kernel binary from the environment prefix instead of through `pixi run`.
+
+        Returns False, leaving the kernel spec untouched, if the activation environment or the
+        kernel binary cannot be determined.
+        """
+        from returns.result import Failure
+
+        from .activation import get_activation_env
+        from .fingerprint import find_project_root, project_fingerprint
+
         kernel_spec = cast(KernelSpec, self.kernel_spec)
 
-        # Reload argv from the original kernel spec to avoid side effects from previous launches
-        kernel_spec.argv = KernelSpec.from_resource_dir(kernel_spec.resource_dir).argv
+        project_root = await run_blocking(find_project_root, cwd)
+        if project_root is None:
+            self.log.warning(f"Failed to find the Pixi project for {cwd}, using 'pixi run'.")
+            return False
 
-        kernel_metadata: dict[str, str] | None = kernel_spec.metadata.get("pixi-kernel")
-        if kernel_metadata is None:
-            message = (
-                f"Kernel {kernel_spec.display_name} uses the PixiKernelProvisioner but it"
-                "does not have any Pixi kernel metadata."
-            )
-            return await self._launch_fallback_kernel(message=message, **kwargs)
+        result = await get_activation_env(
+            environment_name=environment_name,
+            prefix=pixi_environment.prefix,
+            fingerprint=await run_blocking(project_fingerprint, project_root),
+            cwd=cwd,
+            env=env,
+            logger=self.log,
+            policy=launch_policy,
+        )
+        if isinstance(result, Failure):
+            self.log.warning(f"{result.failure()}\nUsing 'pixi run'.")
+            return False
 
-        required_package = kernel_metadata.get("required-package")
-        if required_package is None:
-            message = (
-                f"Kernel {kernel_spec.display_name} is missing the 'required-package' metadata."
+        activation_env = result.unwrap()
+
+        # `argv[:2] = ["pixi", "run"]`, followed by the kernel command
+        program = kernel_spec.argv[2]
+        program_path = await run_blocking(
+            shutil.which, program, path=activation_env.get("PATH", env.get("PATH"))
+        )
+        if program_path is None:
+            self.log.warning(
+                f"Failed to find {program} in {pixi_environment.prefix}, using 'pixi run'."
             )
-            return await self._launch_fallback_kernel(message=message, **kwargs)
+            return False
 
-        cwd = Path(kwargs.get("cwd", Path.cwd()))
-        self.log.info(f"Working directory: {cwd} (provided by JupyterLab: {kwargs.get('cwd')})")
+        kernel_spec.argv = [program_path, *kernel_spec.argv[3:]]
+        # Kernel spec env values are templates, so escape `$` to keep the values as they are
+        kernel_spec.env.update({k: v.replace("$", "$$") for k, v in activation_env.items()})
+        return True
 
-        env: dict[str, str] = kwargs.get("env", os.environ.copy())
+    def _read_environment_name(self, env: dict[str, str]) -> str:
+        with span("metadata"):
+            return self._read_notebook_environment_name(env)
+
+    def _read_notebook_environment_name(self, env: dict[str, str]) -> str:
+        from .notebook import read_notebook_environment
 
         # If a new notebook is saved with the Pixi-kernel environment selection panel opened, the
         # environment field in the Notebook metadata could become an empty string.
@@ -56,10 +187,7 @@ class PixiKernelProvisioner(LocalProvisioner):
             self.log.error("Failed to get notebook path from JPY_SESSION_NAME variable.")
         else:
             try:
-                # Set encoding to utf-8 to avoid issues on Windows
-                # https://github.com/renan-r-santos/pixi-kernel/issues/55
-                notebook = json.loads(Path(notebook_path).read_text(encoding="utf-8"))
-                environment_name = notebook["metadata"]["pixi-kernel"]["environment"]
+                environment_name = read_notebook_environment(Path(notebook_path))
             except Exception:
                 self.log.exception("Failed to get Pixi environment name from notebook metadata.")
 
@@ -67,23 +195,277 @@ class PixiKernelProvisioner(LocalProvisioner):
             environment_name = os.environ.get("PIXI_KERNEL_DEFAULT_ENVIRONMENT", "default")
             self.log.info(f"Falling back to the '{environment_name}' Pixi environment.")
 
+        return environment_name
+
+    async def pre_launch(self, **kwargs: Any) -> dict[str, Any]:
+        from .metrics import LAUNCHES_IN_PROGRESS
+        from .scheduler import Priority, configure_scheduler, pixi_priority
+        from .store import configure_store
+
+        kernel_spec = cast(KernelSpec, self.kernel_spec)
+        self._config = await run_blocking(load_config, self.log)
+        configure_blocking(threads=self._config.fs_threads, timeout=self._config.fs_timeout)
+        configure_store(self._config.store_dir)
+        configure_scheduler(
+            concurrency=self._config.pixi_concurrency,
+            project_concurrency=self._config.pixi_project_concurrency,
+            queue_limit=self._config.pixi_queue_limit,
+        )
+        configure_tracing(
+            trace_file=self._config.trace_file, opentelemetry=self._config.trace_opentelemetry
+        )
+
+        self._launch_span = start_span(
+            "launch",
+            kernel=kernel_spec.display_name,
+            cwd=str(kwargs.get("cwd", "")),
+            restart=self._launched,
+        )
+        LAUNCHES_IN_PROGRESS.inc()
+        try:
+            with use_span(self._launch_span), pixi_priority(Priority.LAUNCH):
+                try:
+                    return await measure_blocking("launch", self._prepare_launch(**kwargs))
+                except FileSystemTimeoutError as exception:
+                    return await self._launch_fallback_kernel(
+                        reason="fs-timeout", message=str(exception), **kwargs
+                    )
+        except BaseException as exception:
+            self._launch_span.set(error=type(exception).__name__)
+            self._end_launch_span(self._launch_span)
+            raise
+
+    async def _prepare_launch(self, **kwargs: Any) -> dict[str, Any]:
+        from returns.result import Failure
+
+        from .compatibility import PIXI_NOT_FOUND
+        from .readiness import verify_env_readiness
+
+        kernel_spec = cast(KernelSpec, self.kernel_spec)
+        launch_span = self._launch_span
+        assert launch_span is not None
+
+        if (
+            self._launched
+            and self._launch_state is not None
+            and await self._reuse_launch_state(self._launch_state, **kwargs)
+        ):
+            self.log.info(f"Restarting {kernel_spec.display_name}: {kernel_spec.to_dict()}")
+            return await super().pre_launch(**kwargs)
+
+        self._launch_state = None
+        self._pool_key = None
+
+        # Reload argv and env from the original kernel spec to avoid side effects from previous
+        # launches
+        original_kernel_spec = await run_blocking(
+            KernelSpec.from_resource_dir, kernel_spec.resource_dir
+        )
+        kernel_spec.argv = original_kernel_spec.argv
+        kernel_spec.env = original_kernel_spec.env
+
+        kernel_metadata: dict[str, str] | None = kernel_spec.metadata.get("pixi-kernel")
+        if kernel_metadata is None:
+            message = (
+                f"Kernel {kernel_spec.display_name} uses the PixiKernelProvisioner but it"
+                "does not have any Pixi kernel metadata."
+            )
+            return await self._launch_fallback_kernel(
+                reason="missing-metadata", message=message, **kwargs
+            )
+
+        required_package = kernel_metadata.get("required-package")
+        if required_package is None:
+            message = (
+                f"Kernel {kernel_spec.display_name} is missing the 'required-package' metadata."
+            )
+            return await self._launch_fallback_kernel(
+                reason="missing-required-package", message=message, **kwargs
+            )
+
+        launch_mode = kernel_metadata.get("launch-mode", self._config.launch_mode)
+        if launch_mode not in LAUNCH_MODES:
+            message = (
+                f"Kernel {kernel_spec.display_name} has an invalid 'launch-mode' metadata: "
+                f"{launch_mode}. Valid values are {', '.join(LAUNCH_MODES)}."
+            )
+            return await self._launch_fallback_kernel(
+                reason="invalid-launch-mode", message=message, **kwargs
+            )
+
+        launch_policy = kernel_metadata.get("launch-policy", self._config.launch_policy)
+        if launch_policy not in LAUNCH_POLICIES:
+            message = (
+                f"Kernel {kernel_spec.display_name} has an invalid 'launch-policy' metadata: "
+                f"{launch_policy}. Valid values are {', '.join(LAUNCH_POLICIES)}."
+            )
+            return await self._launch_fallback_kernel(
+                reason="invalid-launch-policy", message=message, **kwargs
+            )
+        launch_span.set(launch_policy=launch_policy)
+
+        cwd = Path(kwargs.get("cwd", Path.cwd()))
+        self.log.info(f"Working directory: {cwd} (provided by JupyterLab: {kwargs.get('cwd')})")
+        cwd = await run_blocking(cwd.resolve)
+
+        env: dict[str, str] = kwargs.get("env", os.environ.copy())
+        # Taken before the readiness checks, so that project changes made while they run are seen
+        # by the next restart
+        project = await run_blocking(_project_fingerprints, cwd)
+
+        # Reading the notebook overlaps with the readiness checks that don't need the environment
         result = await verify_env_readiness(
-            environment_name=environment_name,
-            cwd=cwd.resolve(),
+            environment_name=run_blocking(self._read_environment_name, env),
+            cwd=cwd,
             env=env,
             required_package=required_package,
             kernel_name=kernel_spec.display_name,
             logger=self.log,
+            policy=launch_policy,
         )
         if isinstance(result, Failure):
-            return await self._launch_fallback_kernel(message=result.failure(), **kwargs)
+            # Set by the readiness pipeline to the name of the step that failed
+            reason = str(launch_span.attributes.get("failed_step", "readiness"))
+            return await self._launch_fallback_kernel(
+                reason=reason, message=result.failure(), **kwargs
+            )
 
         pixi_environment = result.unwrap()
+        environment_name = pixi_environment.name
+        launch_span.set(
+            environment=environment_name, prefix=pixi_environment.prefix, launch_mode=launch_mode
+        )
 
-        # Update kernel spec command line arguments: `argv[:2] = ["pixi", "run"]`
-        pixi_path = find_pixi_binary().unwrap()
-        argv = kernel_spec.argv
-        kernel_spec.argv = [pixi_path, argv[1], "--environment", environment_name, *argv[2:]]
+        with span("kernelspec"):
+            rewritten = await self._rewrite_kernel_spec(
+                pixi_environment=pixi_environment,
+                launch_mode=launch_mode,
+                launch_policy=launch_policy,
+                required_package=required_package,
+                cwd=cwd,
+                env=env,
+            )
+        if not rewritten:
+            return await self._launch_fallback_kernel(
+                reason="pixi-not-found", message=PIXI_NOT_FOUND, **kwargs
+            )
+
+        notebook_path = env.get("JPY_SESSION_NAME")
+        self._launch_state = LaunchState(
+            config=self._config,
+            cwd=kwargs.get("cwd"),
+            notebook_path=notebook_path,
+            environment_name=environment_name,
+            prefix=pixi_environment.prefix,
+            launch_mode=launch_mode,
+            argv=list(kernel_spec.argv),
+            env=dict(kernel_spec.env),
+            fingerprints=await run_blocking(
+                _launch_fingerprints,
+                cwd=cwd,
+                resource_dir=kernel_spec.resource_dir,
+                program=kernel_spec.argv[0],
+                prefix=pixi_environment.prefix,
+                notebook_path=notebook_path,
+                project=project,
+            ),
+        )
+
+        self.log.info(f"Launching {kernel_spec.display_name}: {kernel_spec.to_dict()}")
+        return await super().pre_launch(**kwargs)
+
+    async def _reuse_launch_state(self, state: LaunchState, **kwargs: Any) -> bool:
+        """Apply the kernel spec of the previous launch if nothing it was resolved from changed.
+
+        Only stats files, so that restarts skip Pixi and the readiness checks entirely.
+        """
+        kernel_spec = cast(KernelSpec, self.kernel_spec)
+        env: dict[str, str] = kwargs.get("env", os.environ.copy())
+        notebook_path = env.get("JPY_SESSION_NAME")
+        if (
+            state.config != self._config
+            or state.cwd != kwargs.get("cwd")
+            or state.notebook_path != notebook_path
+        ):
+            return False
+
+        fingerprints = await run_blocking(
+            _launch_fingerprints,
+            cwd=Path(kwargs.get("cwd", Path.cwd())),
+            resource_dir=kernel_spec.resource_dir,
+            program=state.argv[0],
+            prefix=state.prefix,
+            notebook_path=notebook_path,
+        )
+        if fingerprints._replace(notebook=None) != state.fingerprints._replace(notebook=None):
+            return False
+
+        if fingerprints.notebook != state.fingerprints.notebook:
+            # Saving the notebook changes its fingerprint, only another environment matters
+            if await run_blocking(self._read_environment_name, env) != state.environment_name:
+                return False
+            state = msgspec.structs.replace(state, fingerprints=fingerprints)
+            self._launch_state = state
+
+        kernel_spec.argv = list(state.argv)
+        kernel_spec.env = dict(state.env)
+        assert self._launch_span is not None
+        self._launch_span.set(
+            environment=state.environment_name,
+            prefix=state.prefix,
+            launch_mode=state.launch_mode,
+            restart_fast_path=True,
+        )
+        return True
+
+    async def _rewrite_kernel_spec(
+        self,
+        *,
+        pixi_environment: "Environment",
+        launch_mode: str,
+        launch_policy: LaunchPolicy,
+        required_package: str,
+        cwd: Path,
+        env: dict[str, str],
+    ) -> bool:
+        """Rewrite the kernel spec to run the kernel in the Pixi environment.
+
+        Returns False if the kernel is to be started with `pixi run` but Pixi can't be found.
+        """
+        from returns.result import Failure
+
+        from .compatibility import get_pixi_binary
+        from .fingerprint import find_project_root, project_fingerprint
+
+        kernel_spec = cast(KernelSpec, self.kernel_spec)
+        environment_name = pixi_environment.name
+
+        direct_launch = launch_mode == "direct" and await self._direct_launch(
+            pixi_environment=pixi_environment,
+            environment_name=environment_name,
+            launch_policy=launch_policy,
+            cwd=cwd,
+            env=env,
+        )
+        if not direct_launch:
+            # Update kernel spec command line arguments: `argv[:2] = ["pixi", "run"]`
+            pixi_result = await get_pixi_binary()
+            if isinstance(pixi_result, Failure):
+                return False
+            pixi_path = pixi_result.unwrap()
+            argv = kernel_spec.argv
+            options = list(LOCKFILE_OPTIONS[launch_policy])
+            if launch_policy == "trusted":
+                # The readiness checks made sure the environment is installed
+                options.append("--no-install")
+            kernel_spec.argv = [
+                pixi_path,
+                argv[1],
+                *options,
+                "--environment",
+                environment_name,
+                *argv[2:],
+            ]
 
         # R kernel needs special treatment
         # https://github.com/renan-r-santos/pixi-kernel/issues/15
@@ -93,5 +475,98 @@ class PixiKernelProvisioner(LocalProvisioner):
             kernel_spec.env["R_LIBS_SITE"] = r_libs_path
             kernel_spec.env["R_LIBS_USER"] = r_libs_path
 
-        self.log.info(f"Launching {kernel_spec.display_name}: {kernel_spec.to_dict()}")
-        return await super().pre_launch(**kwargs)
+        if self._config.pool_size > 0:
+            project_root = await run_blocking(find_project_root, cwd)
+            if project_root is not None:
+                self._pool_key = (str(cwd), environment_name, kernel_spec.resource_dir)
+                self._pool_fingerprint = await run_blocking(project_fingerprint, project_root)
+        return True
+
+    def _end_launch_span(self, launch_span: Span) -> None:
+        from .metrics import LAUNCHES_IN_PROGRESS
+
+        launch_span.end()
+        if launch_span is self._launch_span:
+            LAUNCHES_IN_PROGRESS.dec()
+            self._launch_span = None
+
+    async def launch_kernel(self, cmd: list[str], **kwargs: Any) -> KernelConnectionInfo:
+        launch_span = self._launch_span or start_span("launch", kernel=str(self.kernel_id))
+        try:
+            with use_span(launch_span), span("start-kernel") as start_kernel_span:
+                connection_info = await measure_blocking(
+                    "start-kernel", self._start_kernel(cmd, **kwargs)
+                )
+                start_kernel_span.set(pid=self.pid or 0)
+        finally:
+            self._end_launch_span(launch_span)
+        return connection_info
+
+    async def _start_kernel(self, cmd: list[str], **kwargs: Any) -> KernelConnectionInfo:
+        from .pool import LaunchTemplate, _kernel_pool
+
+        km = self.parent
+        # Pooled kernels don't share the CurveZMQ keys of the kernel manager
+        if self._pool_key is None or km is None or getattr(km, "curve_publickey", None):
+            self._launched = True
+            return await super().launch_kernel(cmd, **kwargs)
+
+        pooled_kernel = None
+        if not self._launched:
+            pooled_kernel = _kernel_pool.take(self._pool_key, self._pool_fingerprint)
+        self._launched = True
+
+        if pooled_kernel is None:
+            connection_info = await super().launch_kernel(cmd, **kwargs)
+        else:
+            self.log.info(f"Using pooled kernel {pooled_kernel.process.pid} for {self._pool_key}")
+            start_kernel_span = current_span()
+            if start_kernel_span is not None:
+                start_kernel_span.set(pooled=True)
+            connection_info = await self._adopt_pooled_kernel(pooled_kernel, **kwargs)
+
+        template = LaunchTemplate(
+            cmd=cmd,
+            connection_file=km.connection_file,
+            launch_kwargs=self._scrub_kwargs(kwargs),
+            ip=km.ip,
+            transport=km.transport,
+            signature_scheme=km.session.signature_scheme,
+            kernel_name=km.kernel_name,
+        )
+        _kernel_pool.refill(
+            self._pool_key,
+            self._pool_fingerprint,
+            template,
+            size=self._config.pool_size,
+            max_kernels=self._config.pool_max_kernels,
+            idle_ttl=self._config.pool_idle_ttl,
+            logger=self.log,
+        )
+        return connection_info
+
+    async def _adopt_pooled_kernel(
+        self, kernel: "PooledKernel", **kwargs: Any
+    ) -> KernelConnectionInfo:
+        # The ports reserved for the connection file written by the kernel manager are unused
+        if self.ports_cached:
+            for name in ("shell_port", "iopub_port", "stdin_port", "hb_port", "control_port"):
+                LocalPortCache.instance().return_port(self.connection_info[name])
+
+        self.process = kernel.process
+        self.pid = kernel.process.pid
+        self.pgid = None
+        if hasattr(os, "getpgid"):
+            try:
+                self.pgid = os.getpgid(kernel.process.pid)
+            except OSError:
+                pass
+        self.cwd = kwargs.get("cwd", Path.cwd())
+        self.connection_info = kernel.connection_info
+
+        # The kernel already read its connection file, the kernel manager keeps its own copy
+        try:
+            await run_blocking(kernel.connection_file.unlink, missing_ok=True)
+        except FileSystemTimeoutError:
+            self.log.warning(f"Failed to remove the connection file {kernel.connection_file}")
+        return kernel.connection_info
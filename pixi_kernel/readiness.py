@@ -1,12 +1,23 @@
+import asyncio
 import json
 import logging
+from collections.abc import Awaitable
 from pathlib import Path
 
-import msgspec
 from returns.result import Failure, Result, Success
 
-from .compatibility import has_compatible_pixi, run_pixi
+from .blocking import run_blocking
+from .compatibility import PIXI_NOT_FOUND, get_pixi_binary, has_compatible_pixi, run_pixi
+from .config import LOCKFILE_OPTIONS, LaunchPolicy
+from .fingerprint import ProjectFingerprint, find_project_root, project_fingerprint
+from .info import get_pixi_info
+from .install import install_environment
+from .lockfile import get_locked_packages
+from .pipeline import Step, run_steps
+from .singleflight import SingleFlight
+from .tracing import span
 from .types import Environment, PixiInfo
+from .watcher import track_project
 
 PIXI_KERNEL_NOT_FOUND = """To run the {kernel_name} kernel, you need to add the {required_package}
 package to your project dependencies and restart your kernel. The project environment prefix is
@@ -16,66 +27,159 @@ Make sure this path points to the correct environment.
 If you continue to face issues, report them at https://github.com/renan-r-santos/pixi-kernel/issues
 """
 
+# Concurrent launches of the same environment share a single `pixi list` run
+_pixi_list_flights: SingleFlight[
+    tuple[Path, str, ProjectFingerprint, tuple[str, ...]], tuple[int, str, str]
+] = SingleFlight()
+
+
+def find_installed_environment(cwd: Path, name: str) -> tuple[Path, Environment] | None:
+    """Find an installed environment of the project in `cwd` without Pixi.
+
+    Only the default `.pixi/envs` location is looked at, so environments Pixi keeps elsewhere,
+    e.g. with `detached-environments`, are never found. Dependencies are left empty.
+    """
+    project_root = find_project_root(cwd)
+    if project_root is None:
+        return None
+
+    prefix = project_root / ".pixi" / "envs" / name
+    if not (prefix / "conda-meta").is_dir():
+        return None
+    environment = Environment(name=name, dependencies=[], pypi_dependencies=[], prefix=str(prefix))
+    return project_root, environment
+
 
 async def verify_env_readiness(
     *,
-    environment_name: str,
+    environment_name: str | Awaitable[str],
     cwd: Path,
     env: dict[str, str],
     required_package: str,
     kernel_name: str,
     logger: logging.Logger,
+    policy: LaunchPolicy = "strict",
 ) -> Result[Environment, str]:
     """Ensure the Pixi environment is ready to run the kernel.
 
     If any of the checks fail, a Failure is returned and Pixi Kernel will launch a fallback kernel
     that will display the error message to the user.
+
+    The checks run as a pipeline of steps, so that independent steps like the Pixi version check
+    and `pixi info` run concurrently. `environment_name` can be awaitable so that figuring it out
+    overlaps with the steps that don't need it.
+
+    With the trusted policy, no checks run at all if the environment is already installed.
     """
     # Remove PIXI_IN_SHELL for when JupyterLab is started from a Pixi shell
     # https://github.com/renan-r-santos/pixi-kernel/issues/35
     env.pop("PIXI_IN_SHELL", None)
 
-    result = await has_compatible_pixi()
-    if isinstance(result, Failure):
-        return result
-
-    # Ensure there is a Pixi project in the current working directory or any of its parents
-    returncode, stdout, stderr = await run_pixi("info", "--json", cwd=cwd, env=env)
-
-    logger.info(f"pixi info stderr: {stderr}")
-    logger.info(f"pixi info stdout: {stdout}")
-    if returncode != 0:
-        return Failure(f"Failed to run 'pixi info': {stderr}")
-
-    try:
-        pixi_info = msgspec.json.decode(stdout, type=PixiInfo)
-    except msgspec.MsgspecError as exception:
-        return Failure(f"Failed to parse 'pixi info' output: {stdout}\n{exception}")
-
-    if pixi_info.project is None:
-        # Attempt to get a good error message by running `pixi project version get`. Maybe there's
-        # a typo in the toml file (parsing error) or there is no project at all.
-        returncode, stdout, stderr = await run_pixi("project", "version", "get", cwd=cwd, env=env)
-        return Failure(stderr)
-
-    # Find the Pixi environment and check if the required kernel package is a dependency
-    for pixi_env in pixi_info.environments:
-        if pixi_env.name == environment_name:
-            pixi_environment = pixi_env
-            break
-    else:
-        return Failure(f"Pixi environment {environment_name} not found.")
-
-    dependencies = pixi_environment.dependencies + pixi_environment.pypi_dependencies
-    if required_package not in dependencies:
-        # Check transitive dependencies
-        returncode, stdout, stderr = await run_pixi(
-            "list",
-            "--json",
-            "--environment",
-            environment_name,
+    if policy == "trusted":
+        # Kernels are still started with `pixi run`, only its location is looked up
+        if isinstance(await get_pixi_binary(), Failure):
+            return Failure(PIXI_NOT_FOUND)
+        if not isinstance(environment_name, str):
+            environment_name = await environment_name
+        with span("trusted") as trusted_span:
+            installed = await run_blocking(find_installed_environment, cwd, environment_name)
+            trusted_span.set(installed=installed is not None)
+        if installed is not None:
+            project_root, environment = installed
+            logger.info(f"Trusting installed Pixi environment {environment.prefix}")
+            track_project(project_root, environment.name)
+            return Success(environment)
+
+    if not isinstance(environment_name, str):
+        # Start right away, even if the pipeline fails before the step awaiting it runs
+        environment_name = asyncio.ensure_future(environment_name)
+
+    async def check_pixi() -> Result[None, str]:
+        return await has_compatible_pixi()
+
+    async def get_environment_name() -> Result[str, str]:
+        if isinstance(environment_name, str):
+            return Success(environment_name)
+        return Success(await environment_name)
+
+    async def get_info() -> Result[PixiInfo, str]:
+        # Runs concurrently with `check_pixi`, which reports any other problem with Pixi
+        if isinstance(await get_pixi_binary(), Failure):
+            return Failure(PIXI_NOT_FOUND)
+
+        # Ensure there is a Pixi project in the current working directory or any of its parents
+        return await get_pixi_info(cwd=cwd, env=env, logger=logger)
+
+    async def find_environment(info: PixiInfo, name: str) -> Result[Environment, str]:
+        if info.project is None:
+            # Attempt to get a good error message by running `pixi project version get`. Maybe
+            # there's a typo in the toml file (parsing error) or there is no project at all.
+            _, _, stderr = await run_pixi("project", "version", "get", cwd=cwd, env=env)
+            return Failure(stderr)
+
+        for pixi_env in info.environments:
+            if pixi_env.name == name:
+                return Success(pixi_env)
+
+        return Failure(f"Pixi environment {name} not found.")
+
+    async def install(pixi: None, info: PixiInfo, environment: Environment) -> Result[None, str]:
+        assert info.project is not None
+        project_root = Path(info.project.manifest_path).parent
+        result = await install_environment(
+            environment_name=environment.name,
+            prefix=environment.prefix,
+            project_root=project_root,
             cwd=cwd,
             env=env,
+            logger=logger,
+            policy=policy,
+        )
+        if isinstance(result, Success):
+            track_project(project_root, environment.name)
+        return result
+
+    def missing_package(environment: Environment) -> str:
+        return PIXI_KERNEL_NOT_FOUND.format(
+            kernel_name=kernel_name, required_package=required_package, prefix=environment.prefix
+        )
+
+    async def find_package(info: PixiInfo, environment: Environment) -> Result[bool, str]:
+        dependencies = environment.dependencies + environment.pypi_dependencies
+        if required_package in dependencies:
+            return Success(True)
+
+        # Check transitive dependencies in the lockfile. Unless the policy keeps the lockfile as
+        # it is, `pixi install` may still update it, so only finding the package is trusted.
+        assert info.project is not None
+        lockfile = Path(info.project.manifest_path).parent / "pixi.lock"
+        packages = await get_locked_packages(lockfile, environment.name)
+        if packages is None:
+            return Success(False)
+        if required_package in packages:
+            logger.info(f"Found {required_package} in {lockfile}")
+            return Success(True)
+        if LOCKFILE_OPTIONS[policy]:
+            return Failure(missing_package(environment))
+        return Success(False)
+
+    async def check_package(
+        info: PixiInfo, environment: Environment, lockfile: bool, install: None
+    ) -> Result[None, str]:
+        if lockfile:
+            return Success(None)
+
+        # `pixi list` has the final word, once `pixi install` brought the lockfile up to date
+        assert info.project is not None
+        project_root = Path(info.project.manifest_path).parent
+        options = LOCKFILE_OPTIONS[policy]
+        fingerprint = await run_blocking(project_fingerprint, project_root)
+        key = (project_root, environment.name, fingerprint, options)
+        returncode, stdout, stderr = await _pixi_list_flights.run(
+            key,
+            lambda: run_pixi(
+                "list", "--json", *options, "--environment", environment.name, cwd=cwd, env=env
+            ),
         )
 
         logger.info(f"pixi list stderr: {stderr}")
@@ -85,21 +189,31 @@ async def verify_env_readiness(
 
         try:
             if required_package not in {dep["name"] for dep in json.loads(stdout)}:
-                return Failure(
-                    PIXI_KERNEL_NOT_FOUND.format(
-                        kernel_name=kernel_name,
-                        required_package=required_package,
-                        prefix=pixi_environment.prefix,
-                    )
-                )
+                return Failure(missing_package(environment))
         except (json.decoder.JSONDecodeError, KeyError) as exception:
             return Failure(f"Failed to parse 'pixi list' output: {stdout}\n{exception}")
 
-    # Make sure the environment can be solved and is up-to-date
-    returncode, stdout, stderr = await run_pixi(
-        "install", "--environment", environment_name, cwd=cwd, env=env
-    )
-    if returncode != 0:
-        return Failure(f"Failed to run 'pixi install --environment {environment_name}': {stderr}")
+        return Success(None)
+
+    # The manifest and lockfile are checked for the required package before `pixi install`, so a
+    # missing package fails the launch without waiting for the install. `pixi list` may update the
+    # lockfile and install into the prefix itself, so it only runs once `pixi install`, which
+    # concurrent launches share, is done.
+    steps = [
+        Step("pixi", check_pixi),
+        Step("name", get_environment_name),
+        Step("info", get_info),
+        Step("environment", find_environment, depends_on=("info", "name")),
+        Step("lockfile", find_package, depends_on=("info", "environment")),
+        Step("install", install, depends_on=("pixi", "info", "environment")),
+        Step(
+            "package",
+            check_package,
+            depends_on=("info", "environment", "lockfile", "install"),
+        ),
+    ]
+    result = await run_steps(steps, logger=logger)
+    if isinstance(result, Failure):
+        return result
 
-    return Success(pixi_environment)
+    return Success(result.unwrap()["environment"])
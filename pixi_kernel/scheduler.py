@@ -0,0 +1,228 @@
+import asyncio
+import itertools
+import time
+from collections import Counter
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from pathlib import Path
+
+from .metrics import PIXI_QUEUE_DURATION, PIXI_QUEUED, PIXI_REJECTED, PIXI_RUNNING
+
+PIXI_BUSY = """Pixi kernel is busy: {queued} Pixi commands are already waiting to run, so this
+kernel was not started to avoid overloading the server. Restart the kernel in a moment.
+
+If this keeps happening, raise the `pixi-queue-limit` or `pixi-concurrency` settings of Pixi
+kernel, or ask your administrator to do it.
+"""
+
+
+class Priority(IntEnum):
+    """Lower values run first."""
+
+    LAUNCH = 0
+    ENVS = 1
+    WARM_UP = 2
+
+
+class PixiBusyError(Exception):
+    pass
+
+
+class SharedPriority:
+    """The priority of Pixi commands run on behalf of several callers, like a single flight.
+
+    Callers joining later raise it to their own, so that a launch waiting for the `pixi install` of
+    a warm-up doesn't queue, or get rejected, as a warm-up. Shared work started by shared work
+    follows its raises too.
+    """
+
+    def __init__(self, priority: Priority, parent: "SharedPriority | None" = None) -> None:
+        self._priority = priority
+        self._parent = parent
+
+    @property
+    def priority(self) -> Priority:
+        if self._parent is None:
+            return self._priority
+        return min(self._priority, self._parent.priority)
+
+    def raise_to(self, priority: Priority) -> None:
+        self._priority = min(self._priority, priority)
+
+
+class _Waiter:
+    def __init__(self, priority: SharedPriority, sequence: int, project: Path | None) -> None:
+        self.shared_priority = priority
+        self.sequence = sequence
+        self.project = project
+        self.future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+
+    @property
+    def priority(self) -> Priority:
+        return self.shared_priority.priority
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class PixiScheduler:
+    """Limit how many Pixi commands run at the same time, in total and per project.
+
+    Commands waiting for a slot run by priority, then in arrival order. Commands of a project
+    already running its maximum wait without holding back those of other projects. A command is
+    rejected with PixiBusyError if `queue_limit` commands of the same or higher priority are
+    already waiting, so lower priority work never causes rejections.
+    """
+
+    def __init__(self, *, concurrency: int, project_concurrency: int, queue_limit: int) -> None:
+        self.concurrency = concurrency
+        self.project_concurrency = project_concurrency
+        self.queue_limit = queue_limit
+        self._running = 0
+        self._running_per_project: Counter[Path] = Counter()
+        # In arrival order, shared priorities can be raised while waiting
+        self._queue: list[_Waiter] = []
+        self._sequence = itertools.count()
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def configure(self, *, concurrency: int, project_concurrency: int, queue_limit: int) -> None:
+        self.concurrency = concurrency
+        self.project_concurrency = project_concurrency
+        self.queue_limit = queue_limit
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(
+        self, project: Path | None, priority: Priority | SharedPriority
+    ) -> AsyncIterator[None]:
+        """Wait for a slot to run a Pixi command in `project`, the working directory's project."""
+        if isinstance(priority, Priority):
+            priority = SharedPriority(priority)
+        start = time.perf_counter()
+        # Waiters are dispatched whenever a slot frees up, so any waiter left could not run here
+        if not self._has_capacity(project):
+            ahead = sum(1 for waiter in self._queue if waiter.priority <= priority.priority)
+            if ahead >= self.queue_limit:
+                PIXI_REJECTED.labels(priority=priority.priority.name.lower()).inc()
+                raise PixiBusyError(PIXI_BUSY.format(queued=ahead))
+            await self._wait(project, priority)
+        else:
+            self._acquire(project)
+        PIXI_QUEUE_DURATION.labels(priority=priority.priority.name.lower()).observe(
+            time.perf_counter() - start
+        )
+
+        try:
+            yield
+        finally:
+            self._release(project)
+
+    async def _wait(self, project: Path | None, priority: SharedPriority) -> None:
+        waiter = _Waiter(priority, next(self._sequence), project)
+        self._queue.append(waiter)
+        # Labelled with the priority it was queued with, even if it is raised while waiting
+        queued = PIXI_QUEUED.labels(priority=waiter.priority.name.lower())
+        queued.inc()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter in self._queue:
+                self._queue.remove(waiter)
+            elif waiter.future.done() and not waiter.future.cancelled():
+                # Got the slot just as it was cancelled
+                self._release(project)
+            raise
+        finally:
+            queued.dec()
+
+    def _has_capacity(self, project: Path | None) -> bool:
+        if self._running >= self.concurrency:
+            return False
+        return project is None or self._running_per_project[project] < self.project_concurrency
+
+    def _acquire(self, project: Path | None) -> None:
+        self._running += 1
+        PIXI_RUNNING.inc()
+        if project is not None:
+            self._running_per_project[project] += 1
+
+    def _release(self, project: Path | None) -> None:
+        self._running -= 1
+        PIXI_RUNNING.dec()
+        if project is not None:
+            self._running_per_project[project] -= 1
+            if self._running_per_project[project] <= 0:
+                del self._running_per_project[project]
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        for waiter in sorted(self._queue):
+            if self._running >= self.concurrency:
+                break
+            if not self._has_capacity(waiter.project):
+                continue
+            self._queue.remove(waiter)
+            self._acquire(waiter.project)
+            waiter.future.set_result(None)
+
+
+_priority: ContextVar[SharedPriority | None] = ContextVar("pixi_kernel_priority", default=None)
+
+_scheduler: PixiScheduler | None = None
+
+
+def configure_scheduler(*, concurrency: int, project_concurrency: int, queue_limit: int) -> None:
+    global _scheduler
+
+    if _scheduler is None:
+        _scheduler = PixiScheduler(
+            concurrency=concurrency,
+            project_concurrency=project_concurrency,
+            queue_limit=queue_limit,
+        )
+    else:
+        _scheduler.configure(
+            concurrency=concurrency,
+            project_concurrency=project_concurrency,
+            queue_limit=queue_limit,
+        )
+
+
+def get_scheduler() -> PixiScheduler | None:
+    return _scheduler
+
+
+def current_priority() -> SharedPriority:
+    priority = _priority.get()
+    return SharedPriority(Priority.LAUNCH) if priority is None else priority
+
+
+@contextmanager
+def pixi_priority(priority: Priority) -> Iterator[None]:
+    """Run the Pixi commands started in this block, including in tasks, with `priority`."""
+    token = _priority.set(SharedPriority(priority))
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+@contextmanager
+def shared_pixi_priority() -> Iterator[SharedPriority]:
+    """Run the Pixi commands started in this block with a priority that can be raised later."""
+    parent = current_priority()
+    shared = SharedPriority(parent.priority, parent)
+    token = _priority.set(shared)
+    try:
+        yield shared
+    finally:
+        _priority.reset(token)
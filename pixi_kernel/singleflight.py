@@ -0,0 +1,45 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Generic, TypeVar
+
+from .scheduler import SharedPriority, current_priority, shared_pixi_priority
+
+K = TypeVar("K", bound=Hashable)
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[K, T]):
+    """Coalesce concurrent calls with the same key into a single run shared by all callers.
+
+    Every caller gets the result, or the exception, of the shared run. Cancelling a caller only
+    stops it from waiting, the shared run goes on for the others. The Pixi commands of the shared
+    run have the highest priority of its callers.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: dict[K, asyncio.Future[T]] = {}
+        self._priorities: dict[K, SharedPriority] = {}
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._tasks
+
+    async def run(self, key: K, function: Callable[[], Awaitable[T]]) -> T:
+        task = self._tasks.get(key)
+        if task is None:
+            # The task copies the context, and with it the shared priority, when it is created
+            with shared_pixi_priority() as priority:
+                task = asyncio.ensure_future(function())
+            self._tasks[key] = task
+            self._priorities[key] = priority
+            task.add_done_callback(lambda task: self._done(key, task))
+        else:
+            self._priorities[key].raise_to(current_priority().priority)
+        return await asyncio.shield(task)
+
+    def _done(self, key: K, task: asyncio.Future[T]) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+            del self._priorities[key]
+        # Callers that were cancelled never see the exception, don't warn about it
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,142 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, TypeVar
+
+import msgspec
+
+from .blocking import FileSystemTimeoutError, run_blocking
+
+T = TypeVar("T")
+
+STORE_FILE = "pixi-kernel.sqlite3"
+# Seconds to wait for other processes writing to the store
+BUSY_TIMEOUT = 5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    fingerprint BLOB NOT NULL,
+    value BLOB NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+)
+"""
+
+
+class Store:
+    """Cached Pixi state persisted in SQLite, shared by all Jupyter servers of a user.
+
+    Entries are looked up by namespace and key and are only returned while their fingerprint
+    matches the current one. The store is a cache, so any database error, or a database that
+    doesn't answer within the file system timeout, is treated as a miss.
+
+    SQLite calls wait for other processes holding the database lock, so they run in the file
+    system thread pool rather than on the event loop.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # Autocommit, every statement is its own transaction. Statements from other threads
+            # are serialized by `_lock`.
+            connection = sqlite3.connect(
+                self.directory / STORE_FILE,
+                timeout=BUSY_TIMEOUT,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            try:
+                # Write-ahead logging needs shared memory, which network file systems don't
+                # provide, so use the rollback journal that only relies on file locks
+                connection.execute("PRAGMA journal_mode=DELETE")
+                connection.execute(_SCHEMA)
+            except sqlite3.Error:
+                connection.close()
+                raise
+            self._connection = connection
+        return self._connection
+
+    async def get(self, namespace: str, key: str, fingerprint: Any, type: type[T]) -> T | None:
+        try:
+            return await run_blocking(self._get, namespace, key, fingerprint, type)
+        except FileSystemTimeoutError:
+            return None
+
+    async def put(self, namespace: str, key: str, fingerprint: Any, value: Any) -> None:
+        try:
+            await run_blocking(self._put, namespace, key, fingerprint, value)
+        except FileSystemTimeoutError:
+            pass
+
+    def _get(self, namespace: str, key: str, fingerprint: Any, type: type[T]) -> T | None:
+        try:
+            with self._lock:
+                row = (
+                    self._connect()
+                    .execute(
+                        "SELECT fingerprint, value FROM entries WHERE namespace = ? AND key = ?",
+                        (namespace, key),
+                    )
+                    .fetchone()
+                )
+        except (OSError, sqlite3.Error):
+            return None
+
+        if row is None or row[0] != msgspec.msgpack.encode(fingerprint):
+            return None
+
+        try:
+            return msgspec.msgpack.decode(row[1], type=type)
+        except msgspec.MsgspecError:
+            # Written by an incompatible version of pixi-kernel
+            return None
+
+    def _put(self, namespace: str, key: str, fingerprint: Any, value: Any) -> None:
+        entry = (
+            namespace,
+            key,
+            msgspec.msgpack.encode(fingerprint),
+            msgspec.msgpack.encode(value),
+            time.time(),
+        )
+        try:
+            with self._lock:
+                self._connect().execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)", entry
+                )
+        except (OSError, sqlite3.Error):
+            pass
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+_store: Store | None = None
+
+
+def configure_store(directory: str | None) -> None:
+    """Use the store in `directory`, or no store if it is None."""
+    global _store
+
+    path = None if directory is None else Path(directory).expanduser()
+    if _store is not None and _store.directory == path:
+        return
+
+    if _store is not None:
+        _store.close()
+    _store = None if path is None else Store(path)
+
+
+def get_store() -> Store | None:
+    return _store
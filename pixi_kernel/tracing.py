@@ -0,0 +1,202 @@
+import atexit
+import queue
+import secrets
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any
+
+import msgspec
+
+try:
+    from opentelemetry import trace as otel_trace
+
+    HAS_OPENTELEMETRY = True
+except ImportError:
+    HAS_OPENTELEMETRY = False
+
+Attribute = str | int | float | bool
+
+
+class SpanRecord(msgspec.Struct, frozen=True, kw_only=True):
+    """A finished span as written to the trace file, one JSON object per line."""
+
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    name: str
+    # Seconds since the epoch
+    start: float
+    # Seconds
+    duration: float
+    attributes: dict[str, Attribute]
+
+
+class Span:
+    """A timed phase of a kernel launch, nested in the span that was current when it started."""
+
+    def __init__(self, name: str, parent: "Span | None", attributes: dict[str, Attribute]) -> None:
+        self.name = name
+        self.parent = parent
+        self.trace_id: str = secrets.token_hex(16) if parent is None else parent.trace_id
+        self.span_id: str = secrets.token_hex(8)
+        self.attributes = attributes
+        self.start = time.time()
+        self.duration: float | None = None
+        self._start_counter = time.perf_counter()
+
+        self._otel_span: Any = None
+        if _tracer is not None:
+            context = None
+            if parent is not None and parent._otel_span is not None:
+                context = otel_trace.set_span_in_context(parent._otel_span)
+            self._otel_span = _tracer.start_span(name, context=context)
+
+    def set(self, **attributes: Attribute) -> None:
+        self.attributes.update(attributes)
+
+    def end(self) -> None:
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._start_counter
+
+        if self._otel_span is not None:
+            self._otel_span.set_attributes(self.attributes)
+            self._otel_span.end()
+
+        if _trace_file is not None:
+            _write_span(_trace_file, self)
+
+        for observer in _span_observers:
+            observer(self)
+
+
+_current_span: ContextVar[Span | None] = ContextVar("pixi_kernel_span", default=None)
+
+_trace_file: Path | None = None
+_tracer: Any = None
+_span_observers: list[Callable[[Span], None]] = []
+
+# Spans mostly end on the event loop, so a writer thread appends them to the trace file, which may
+# be on a slow network file system. Spans are dropped when it falls this far behind.
+_MAX_PENDING_SPANS = 10_000
+_pending_spans: queue.Queue[tuple[Path, bytes]] = queue.Queue(_MAX_PENDING_SPANS)
+_writer: threading.Thread | None = None
+_writer_lock = threading.Lock()
+
+
+def configure_tracing(*, trace_file: str | None, opentelemetry: bool) -> None:
+    """Write spans to `trace_file` as JSON lines and, if enabled, to OpenTelemetry.
+
+    OpenTelemetry spans go to the globally configured tracer provider, e.g. the one set up by
+    `opentelemetry-instrument`.
+    """
+    global _trace_file, _tracer
+
+    _trace_file = None if trace_file is None else Path(trace_file).expanduser()
+    _tracer = None
+    if opentelemetry and HAS_OPENTELEMETRY:
+        _tracer = otel_trace.get_tracer("pixi_kernel")
+
+
+def add_span_observer(observer: Callable[[Span], None]) -> None:
+    """Call `observer` with every span when it ends, whether or not tracing is configured."""
+    _span_observers.append(observer)
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+def start_span(name: str, **attributes: Attribute) -> Span:
+    """Start a span that must be ended explicitly, for phases that span several calls."""
+    return Span(name, _current_span.get(), attributes)
+
+
+@contextmanager
+def use_span(span: Span) -> Iterator[Span]:
+    """Make `span` the parent of the spans started in this block."""
+    token = _current_span.set(span)
+    try:
+        yield span
+    finally:
+        _current_span.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes: Attribute) -> Iterator[Span]:
+    """Time the block as a span nested in the current one."""
+    new_span = start_span(name, **attributes)
+    try:
+        with use_span(new_span):
+            yield new_span
+    except BaseException as exception:
+        new_span.set(error=type(exception).__name__)
+        raise
+    finally:
+        new_span.end()
+
+
+def _write_span(trace_file: Path, span: Span) -> None:
+    assert span.duration is not None
+    record = SpanRecord(
+        trace_id=span.trace_id,
+        span_id=span.span_id,
+        parent_id=None if span.parent is None else span.parent.span_id,
+        name=span.name,
+        start=span.start,
+        duration=span.duration,
+        attributes=span.attributes,
+    )
+    line = msgspec.json.encode(record) + b"\n"
+
+    global _writer
+    # Spans end in worker threads as well
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_write_spans, name="pixi-kernel-trace", daemon=True)
+            _writer.start()
+    try:
+        _pending_spans.put_nowait((trace_file, line))
+    except queue.Full:
+        pass
+
+
+def _write_spans() -> None:
+    while True:
+        # Write everything that is pending at once, a file may be reconfigured in between
+        pending = [_pending_spans.get()]
+        while True:
+            try:
+                pending.append(_pending_spans.get_nowait())
+            except queue.Empty:
+                break
+
+        lines: dict[Path, list[bytes]] = {}
+        for trace_file, line in pending:
+            lines.setdefault(trace_file, []).append(line)
+        for trace_file, file_lines in lines.items():
+            try:
+                trace_file.parent.mkdir(parents=True, exist_ok=True)
+                with trace_file.open("ab") as file:
+                    file.write(b"".join(file_lines))
+            except OSError:
+                pass
+
+        for _ in pending:
+            _pending_spans.task_done()
+
+
+def flush_tracing(timeout: float | None = None) -> bool:
+    """Wait until the spans that ended so far are written, returning False on timeout."""
+    with _pending_spans.all_tasks_done:
+        return _pending_spans.all_tasks_done.wait_for(
+            lambda: _pending_spans.unfinished_tasks == 0, timeout
+        )
+
+
+# Don't lose the last spans on exit, unless the file system hangs
+atexit.register(flush_tracing, 5)
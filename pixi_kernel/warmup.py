@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import os
+import time
+from fnmatch import fnmatch
+from pathlib import Path
+
+from returns.result import Failure
+
+from .blocking import FileSystemTimeoutError
+from .compatibility import has_compatible_pixi
+from .config import LaunchPolicy
+from .fingerprint import is_project_root
+from .info import get_pixi_info
+from .install import install_environment
+from .scheduler import Priority, pixi_priority
+
+
+def find_pixi_projects(root: Path, *, max_depth: int, ignore: list[str]) -> list[Path]:
+    """Find the Pixi projects in `root` and up to `max_depth` directory levels below it."""
+    projects = []
+    for directory, dirnames, _ in os.walk(root):
+        path = Path(directory)
+        depth = len(path.relative_to(root).parts)
+        if depth >= max_depth:
+            dirnames.clear()
+        else:
+            dirnames[:] = [d for d in dirnames if not any(fnmatch(d, p) for p in ignore)]
+
+        if is_project_root(path):
+            projects.append(path)
+
+    return projects
+
+
+async def warm_up_projects(
+    root: Path,
+    *,
+    max_depth: int,
+    ignore: list[str],
+    concurrency: int,
+    logger: logging.Logger,
+    policy: LaunchPolicy = "strict",
+) -> None:
+    """Install the environments of all Pixi projects under `root` so kernels start right away."""
+    start = time.perf_counter()
+
+    result = await has_compatible_pixi()
+    if isinstance(result, Failure):
+        logger.warning(f"Skipping Pixi kernel warm-up: {result.failure()}")
+        return
+
+    projects = await asyncio.to_thread(
+        find_pixi_projects, root, max_depth=max_depth, ignore=ignore
+    )
+    logger.info(f"Warming up {len(projects)} Pixi projects under {root}")
+
+    # Remove PIXI_IN_SHELL for when JupyterLab is started from a Pixi shell
+    # https://github.com/renan-r-santos/pixi-kernel/issues/35
+    env = os.environ.copy()
+    env.pop("PIXI_IN_SHELL", None)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def warm_up_environment(project: Path, environment_name: str, prefix: str) -> None:
+        async with semaphore:
+            env_start = time.perf_counter()
+            try:
+                result = await install_environment(
+                    environment_name=environment_name,
+                    prefix=prefix,
+                    project_root=project,
+                    cwd=project,
+                    env=env,
+                    logger=logger,
+                    policy=policy,
+                )
+            except FileSystemTimeoutError as exception:
+                result = Failure(str(exception))
+            elapsed = time.perf_counter() - env_start
+            if isinstance(result, Failure):
+                logger.warning(
+                    f"Failed to warm up {project} [{environment_name}]: {result.failure()}"
+                )
+            else:
+                logger.info(f"Warmed up {project} [{environment_name}] in {elapsed:.1f}s")
+
+    async def warm_up_project(project: Path) -> None:
+        async with semaphore:
+            info_result = await get_pixi_info(cwd=project, env=env)
+        if isinstance(info_result, Failure):
+            logger.warning(f"Failed to warm up {project}: {info_result.failure()}")
+            return
+
+        await asyncio.gather(
+            *(
+                warm_up_environment(project, environment.name, environment.prefix)
+                for environment in info_result.unwrap().environments
+            )
+        )
+
+    # Kernel launches and environment lookups run their Pixi commands first
+    with pixi_priority(Priority.WARM_UP):
+        await asyncio.gather(*(warm_up_project(project) for project in projects))
+    logger.info(f"Pixi kernel warm-up finished in {time.perf_counter() - start:.1f}s")
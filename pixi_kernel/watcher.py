@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import Any
+
+from returns.result import Failure
+
+from .blocking import FileSystemTimeoutError, run_blocking
+from .config import LaunchPolicy
+from .fingerprint import PROJECT_FILES, ProjectFingerprint, project_fingerprint
+from .info import get_pixi_info, invalidate_pixi_info
+from .install import install_environment
+from .pool import evict_project
+from .scheduler import Priority, pixi_priority
+
+try:
+    # watchfiles uses inotify on Linux and the native APIs on macOS and Windows
+    from watchfiles import awatch
+
+    HAS_WATCHFILES = True
+except ImportError:
+    HAS_WATCHFILES = False
+
+
+class ProjectWatcher:
+    """Watch the manifests and lockfiles of the Pixi projects kernels were launched from.
+
+    When they change, cached Pixi state for the project is dropped and, if `reinstall` is set,
+    `pixi install` runs in the background for the environments that ran kernels, once the files
+    stop changing for `debounce` seconds.
+    """
+
+    def __init__(
+        self,
+        *,
+        poll_interval: float,
+        reinstall: bool,
+        debounce: float,
+        logger: logging.Logger,
+        policy: LaunchPolicy = "strict",
+    ) -> None:
+        self.poll_interval = poll_interval
+        self.reinstall = reinstall
+        self.debounce = debounce
+        self.logger = logger
+        self.policy = policy
+        # None until `run` fingerprints a newly tracked project
+        self._fingerprints: dict[Path, ProjectFingerprint | None] = {}
+        self._environments: dict[Path, set[str]] = {}
+        self._projects_changed = asyncio.Event()
+        self._reinstall_tasks: dict[Path, asyncio.Task[None]] = {}
+
+    def track(self, project_root: Path, environment_name: str) -> None:
+        if project_root not in self._fingerprints:
+            self._fingerprints[project_root] = None
+            self._projects_changed.set()
+        self._environments.setdefault(project_root, set()).add(environment_name)
+
+    async def run(self) -> None:
+        self.logger.info(
+            f"Watching Pixi projects {'with' if HAS_WATCHFILES else 'without'} watchfiles"
+        )
+        while True:
+            self._projects_changed.clear()
+            await self._check_projects()
+            await self._wait_for_changes()
+
+    async def _check_projects(self) -> None:
+        try:
+            fingerprints = await run_blocking(_fingerprint_projects, list(self._fingerprints))
+        except FileSystemTimeoutError as exception:
+            self.logger.warning(f"Failed to check Pixi projects for changes: {exception}")
+            return
+
+        for project_root, new_fingerprint in fingerprints.items():
+            fingerprint = self._fingerprints[project_root]
+            self._fingerprints[project_root] = new_fingerprint
+            if fingerprint is not None and new_fingerprint != fingerprint:
+                self._on_change(project_root)
+
+    async def _wait_for_changes(self) -> None:
+        if not HAS_WATCHFILES or not self._fingerprints:
+            # Wakes up early to fingerprint newly tracked projects
+            try:
+                await asyncio.wait_for(self._projects_changed.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            return
+
+        def watch_filter(_: Any, path: str) -> bool:
+            return Path(path).name in PROJECT_FILES
+
+        # Returns on the first change, or when a new project must be added to the watch list
+        try:
+            async for _ in awatch(
+                *self._fingerprints,
+                watch_filter=watch_filter,
+                stop_event=self._projects_changed,
+                recursive=False,
+                debounce=int(self.poll_interval * 1000),
+            ):
+                return
+        except Exception:
+            self.logger.exception("Failed to watch Pixi projects, polling instead")
+            await asyncio.sleep(self.poll_interval)
+
+    def _on_change(self, project_root: Path) -> None:
+        self.logger.info(f"Pixi project {project_root} changed, invalidating cached state")
+        invalidate_pixi_info(project_root)
+        evict_project(project_root)
+
+        if self.reinstall:
+            task = self._reinstall_tasks.pop(project_root, None)
+            if task is not None:
+                task.cancel()
+            task = asyncio.create_task(self._reinstall(project_root))
+            task.add_done_callback(lambda task: self._reinstall_done(project_root, task))
+            self._reinstall_tasks[project_root] = task
+
+    def _reinstall_done(self, project_root: Path, task: asyncio.Task[None]) -> None:
+        # A cancelled reinstall finishes after the one replacing it was started
+        if self._reinstall_tasks.get(project_root) is task:
+            del self._reinstall_tasks[project_root]
+
+    async def _reinstall(self, project_root: Path) -> None:
+        await asyncio.sleep(self.debounce)
+        # Kernel launches and environment lookups run their Pixi commands first
+        with pixi_priority(Priority.WARM_UP):
+            await self._install(project_root)
+
+    async def _install(self, project_root: Path) -> None:
+        # Remove PIXI_IN_SHELL for when JupyterLab is started from a Pixi shell
+        # https://github.com/renan-r-santos/pixi-kernel/issues/35
+        env = os.environ.copy()
+        env.pop("PIXI_IN_SHELL", None)
+
+        info_result = await get_pixi_info(cwd=project_root, env=env)
+        if isinstance(info_result, Failure):
+            self.logger.warning(f"Failed to reinstall {project_root}: {info_result.failure()}")
+            return
+
+        environment_names = self._environments.get(project_root, set())
+        for environment in info_result.unwrap().environments:
+            if environment.name not in environment_names:
+                continue
+
+            try:
+                result = await install_environment(
+                    environment_name=environment.name,
+                    prefix=environment.prefix,
+                    project_root=project_root,
+                    cwd=project_root,
+                    env=env,
+                    logger=self.logger,
+                    policy=self.policy,
+                )
+            except FileSystemTimeoutError as exception:
+                result = Failure(str(exception))
+            if isinstance(result, Failure):
+                self.logger.warning(
+                    f"Failed to reinstall {project_root} [{environment.name}]: {result.failure()}"
+                )
+
+
+def _fingerprint_projects(
+    project_roots: list[Path],
+) -> dict[Path, ProjectFingerprint]:
+    return {project_root: project_fingerprint(project_root) for project_root in project_roots}
+
+
+# Started by the server extension, see `start_project_watcher`
+_project_watcher: ProjectWatcher | None = None
+
+
+def start_project_watcher(
+    *,
+    poll_interval: float,
+    reinstall: bool,
+    debounce: float,
+    logger: logging.Logger,
+    policy: LaunchPolicy = "strict",
+) -> ProjectWatcher:
+    global _project_watcher
+
+    _project_watcher = ProjectWatcher(
+        poll_interval=poll_interval,
+        reinstall=reinstall,
+        debounce=debounce,
+        logger=logger,
+        policy=policy,
+    )
+    return _project_watcher
+
+
+def track_project(project_root: Path, environment_name: str) -> None:
+    if _project_watcher is not None:
+        _project_watcher.track(project_root, environment_name)
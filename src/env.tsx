@@ -1,5 +1,5 @@
 import { JupyterFrontEnd } from '@jupyterlab/application';
-import { PageConfig } from '@jupyterlab/coreutils';
+import { PageConfig, URLExt } from '@jupyterlab/coreutils';
 import { INotebookTracker } from '@jupyterlab/notebook';
 import { WidgetProps } from '@rjsf/utils';
 import React, { useEffect, useState } from 'react';
@@ -31,10 +31,10 @@ export const PixiEnvWidget = (props: IPixiEnvProps) => {
           props.app.serviceManager.contents.localPath(relativePath);
         const serverRoot = PageConfig.getOption('serverRoot') || '';
 
-        const response = await requestAPI<IEnvironmentResponse>('envs', {
-          method: 'POST',
-          body: JSON.stringify({ localPath, serverRoot })
-        });
+        const query = URLExt.objectToQueryString({ localPath, serverRoot });
+        const response = await requestAPI<IEnvironmentResponse>(
+          `envs${query}`
+        );
 
         setEnvs(response.environments);
         setDefaultEnv(response.default);
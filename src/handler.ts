@@ -1,6 +1,12 @@
 import { URLExt } from '@jupyterlab/coreutils';
 import { ServerConnection } from '@jupyterlab/services';
 
+/**
+ * Responses of GET requests that came with an ETag, keyed by URL. They are revalidated with
+ * `If-None-Match` and reused when the server answers 304 Not Modified.
+ */
+const etagCache = new Map<string, { etag: string; data: any }>();
+
 export async function requestAPI<T>(
   endPoint = '',
   init: RequestInit = {}
@@ -8,6 +14,14 @@ export async function requestAPI<T>(
   const settings = ServerConnection.makeSettings();
   const requestUrl = URLExt.join(settings.baseUrl, 'pixi-kernel', endPoint);
 
+  const isGet = (init.method ?? 'GET').toUpperCase() === 'GET';
+  const cached = isGet ? etagCache.get(requestUrl) : undefined;
+  if (cached) {
+    const headers = new Headers(init.headers);
+    headers.set('If-None-Match', cached.etag);
+    init = { ...init, headers };
+  }
+
   let response: Response;
   try {
     response = await ServerConnection.makeRequest(requestUrl, init, settings);
@@ -15,6 +29,10 @@ export async function requestAPI<T>(
     throw new ServerConnection.NetworkError(error as any);
   }
 
+  if (response.status === 304 && cached) {
+    return cached.data;
+  }
+
   let data: any = await response.text();
 
   if (data.length > 0) {
@@ -29,5 +47,12 @@ export async function requestAPI<T>(
     throw new ServerConnection.ResponseError(response, data.message || data);
   }
 
+  const etag = response.headers.get('ETag');
+  if (isGet && etag) {
+    etagCache.set(requestUrl, { etag, data });
+  } else if (isGet) {
+    etagCache.delete(requestUrl);
+  }
+
   return data;
 }
@@ -12,6 +12,7 @@ import type { WidgetProps } from '@rjsf/utils';
 import React from 'react';
 
 import { PixiEnvWidget } from './env';
+import { trackInstallProgress } from './progress';
 
 const plugin: JupyterFrontEndPlugin<void> = {
   id: 'pixi-kernel:plugin',
@@ -29,6 +30,7 @@ const plugin: JupyterFrontEndPlugin<void> = {
           PixiEnvWidget({ ...props, app, nbTracker })
       };
       formRegistry.addRenderer('pixi-kernel:plugin.pixi-envs', component);
+      trackInstallProgress(app, nbTracker);
     } catch (error) {
       showErrorMessage('Pixi Kernel Error', {
         message: (
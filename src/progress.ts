@@ -0,0 +1,111 @@
+import { JupyterFrontEnd } from '@jupyterlab/application';
+import { Notification, ISessionContext } from '@jupyterlab/apputils';
+import { PageConfig } from '@jupyterlab/coreutils';
+import { INotebookTracker, NotebookPanel } from '@jupyterlab/notebook';
+
+import { requestAPI } from './handler';
+
+interface IInstallProgress {
+  environment: string;
+  elapsed: number;
+  lines: string[];
+}
+
+interface IProgressResponse {
+  installs: IInstallProgress[];
+}
+
+const POLL_INTERVAL_MS = 1000;
+const STARTING_STATUSES = [
+  'initializing',
+  'unknown',
+  'starting',
+  'restarting',
+  'autorestarting'
+];
+
+function isStarting(sessionContext: ISessionContext): boolean {
+  return (
+    !sessionContext.isDisposed &&
+    !sessionContext.hasNoKernel &&
+    STARTING_STATUSES.includes(sessionContext.kernelDisplayStatus)
+  );
+}
+
+function formatProgress(installs: IInstallProgress[]): string {
+  return installs
+    .map(install => {
+      const elapsed = Math.round(install.elapsed);
+      const lastLine = install.lines[install.lines.length - 1] || '';
+      return `Installing Pixi environment ${install.environment} (${elapsed}s): ${lastLine}`;
+    })
+    .join('\n');
+}
+
+/** Show the output of `pixi install` while a notebook kernel is starting, so that long installs
+ * don't look like a hung kernel.
+ */
+async function pollInstallProgress(
+  app: JupyterFrontEnd,
+  panel: NotebookPanel
+): Promise<void> {
+  const localPath = app.serviceManager.contents.localPath(panel.context.path);
+  const serverRoot = PageConfig.getOption('serverRoot') || '';
+  let notificationId: string | null = null;
+
+  try {
+    while (isStarting(panel.sessionContext)) {
+      const response = await requestAPI<IProgressResponse>('progress', {
+        method: 'POST',
+        body: JSON.stringify({ localPath, serverRoot })
+      });
+
+      if (response.installs.length > 0) {
+        const message = formatProgress(response.installs);
+        if (notificationId === null) {
+          notificationId = Notification.emit(message, 'in-progress', {
+            autoClose: false
+          });
+        } else {
+          Notification.update({ id: notificationId, message });
+        }
+      } else if (notificationId !== null) {
+        Notification.dismiss(notificationId);
+        notificationId = null;
+      }
+
+      await new Promise(resolve => setTimeout(resolve, POLL_INTERVAL_MS));
+    }
+  } catch (error) {
+    console.error('Failed to fetch Pixi install progress:', error);
+  } finally {
+    if (notificationId !== null) {
+      Notification.dismiss(notificationId);
+    }
+  }
+}
+
+export function trackInstallProgress(
+  app: JupyterFrontEnd,
+  nbTracker: INotebookTracker
+): void {
+  nbTracker.widgetAdded.connect((_, panel) => {
+    let polling = false;
+
+    const startPolling = async () => {
+      if (polling || !isStarting(panel.sessionContext)) {
+        return;
+      }
+      polling = true;
+      try {
+        await pollInstallProgress(app, panel);
+      } finally {
+        polling = false;
+      }
+    };
+
+    panel.sessionContext.statusChanged.connect(startPolling);
+    panel.sessionContext.kernelChanged.connect(startPolling);
+    startPolling();
+  });
+}
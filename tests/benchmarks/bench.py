@@ -0,0 +1,482 @@
+"""Measure the overhead pixi-kernel adds to kernel launches, offline, against a fake Pixi.
+
+Benchmarks:
+
+- `readiness`: `verify_env_readiness`, the checks run before every launch.
+- `pre_launch`: `PixiKernelProvisioner.pre_launch`, everything up to starting the kernel process.
+- `restart`: `pre_launch` of kernels that were launched before, like restarts. Kernels are only
+  launched for the first time when no launched kernel of the project is idle.
+- `envs`: requests to the `/pixi-kernel/envs` endpoint of a Jupyter server.
+
+Every benchmark runs with warm caches, where nothing changed since the last launch, and with cold
+caches, where the project files changed before every round of concurrent operations. Results are
+written as JSON, and compared against a previous run with `--compare` to catch regressions:
+
+    python tests/benchmarks/bench.py --output baseline.json
+    python tests/benchmarks/bench.py --compare baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Any
+
+import pixi_kernel.compatibility
+from fake_pixi import install_fake_pixi
+from jupyter_client.kernelspec import KernelSpec
+from pixi_kernel.lockfile import current_platform
+from pixi_kernel.provisioner import PixiKernelProvisioner
+from pixi_kernel.readiness import verify_env_readiness
+from returns.result import Success
+from tornado.httpclient import AsyncHTTPClient, HTTPClientError
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+KERNEL_SPEC_DIR = REPO_ROOT / "kernels" / "pixi-kernel-python3"
+
+BENCHMARKS = ("readiness", "pre_launch", "restart", "envs")
+CACHE_MODES = ("warm", "cold")
+
+# Seconds to wait for the Jupyter server to answer
+SERVER_START_TIMEOUT = 60
+
+logger = logging.getLogger("pixi_kernel.benchmark")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--benchmarks", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument("--cache", nargs="+", choices=CACHE_MODES, default=list(CACHE_MODES))
+    parser.add_argument(
+        "--concurrency", nargs="+", type=int, default=[1, 4, 16], help="Concurrent operations"
+    )
+    parser.add_argument("--rounds", type=int, default=10, help="Rounds of concurrent operations")
+    parser.add_argument("--projects", type=int, default=1, help="Pixi projects to spread over")
+    parser.add_argument("--launch-mode", choices=("pixi-run", "direct"), default="pixi-run")
+    parser.add_argument(
+        "--launch-policy", choices=("strict", "locked", "frozen", "trusted"), default="strict"
+    )
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per Pixi command")
+    parser.add_argument("--output-size", type=int, default=0, help="Bytes per Pixi command")
+    parser.add_argument(
+        "--fail", default="", help="Failing Pixi commands, see FAKE_PIXI_FAIL in fake_pixi.py"
+    )
+    parser.add_argument("--output", type=Path, help="Write results here instead of stdout")
+    parser.add_argument("--compare", type=Path, help="Results of a previous run to compare to")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Relative median latency increase reported as a regression",
+    )
+    return parser.parse_args(argv)
+
+
+def create_projects(root: Path, count: int) -> list[Path]:
+    python_url = "https://conda.anaconda.org/conda-forge/noarch/python-3.12.0-h0_0.conda"
+    projects = []
+    for i in range(count):
+        project = root / f"project-{i}"
+        project.mkdir(parents=True)
+        (project / "pixi.toml").write_text(
+            f'# environments: default\n[workspace]\nname = "project-{i}"\n'
+        )
+        # `ipykernel` is only a transitive dependency, so launches run `pixi list` to find it
+        (project / "pixi.lock").write_text(
+            "version: 6\n"
+            "environments:\n"
+            "  default:\n"
+            "    packages:\n"
+            f"      {current_platform()}:\n"
+            f"      - conda: {python_url}\n"
+            "packages:\n"
+            f"- conda: {python_url}\n"
+            "  name: python\n"
+        )
+        notebook = {
+            "cells": [],
+            "metadata": {"pixi-kernel": {"environment": "default"}},
+            "nbformat": 4,
+            "nbformat_minor": 5,
+        }
+        (project / "notebook.ipynb").write_text(json.dumps(notebook))
+        projects.append(project)
+    return projects
+
+
+def touch_projects(projects: list[Path]) -> None:
+    """Change the fingerprints of the project files, invalidating every cache."""
+    for project in projects:
+        for name in ("pixi.toml", "pixi.lock", "notebook.ipynb"):
+            now = time.time_ns()
+            os.utime(project / name, ns=(now, now))
+
+
+def read_pixi_calls(log_file: Path) -> Counter[str]:
+    try:
+        return Counter(log_file.read_text().split())
+    except FileNotFoundError:
+        return Counter()
+
+
+def summarize(latencies: list[float]) -> dict[str, float]:
+    ordered = sorted(latencies)
+    if len(ordered) > 1:
+        percentiles = statistics.quantiles(ordered, n=100, method="inclusive")
+    else:
+        percentiles = ordered * 99
+    return {
+        "mean": statistics.fmean(ordered),
+        "p50": percentiles[49],
+        "p90": percentiles[89],
+        "p99": percentiles[98],
+        "max": ordered[-1],
+    }
+
+
+Operation = Callable[[Path], Awaitable[bool]]
+
+
+async def run_case(
+    operation: Operation,
+    *,
+    projects: list[Path],
+    cache: str,
+    concurrency: int,
+    rounds: int,
+    invalidate: Callable[[], None],
+) -> dict[str, Any]:
+    async def timed(project: Path) -> tuple[float, bool]:
+        start = time.perf_counter()
+        ok = await operation(project)
+        return time.perf_counter() - start, ok
+
+    if cache == "warm":
+        await asyncio.gather(*(operation(project) for project in projects))
+
+    latencies: list[float] = []
+    failures = 0
+    elapsed = 0.0
+    for _ in range(rounds):
+        if cache == "cold":
+            invalidate()
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(timed(projects[i % len(projects)]) for i in range(concurrency))
+        )
+        elapsed += time.perf_counter() - start
+        latencies.extend(latency for latency, _ in results)
+        failures += sum(not ok for _, ok in results)
+
+    return {
+        "operations": len(latencies),
+        "failures": failures,
+        "seconds": elapsed,
+        "throughput": len(latencies) / elapsed,
+        "latency": summarize(latencies),
+    }
+
+
+def readiness_operation() -> Operation:
+    async def operation(project: Path) -> bool:
+        result = await verify_env_readiness(
+            environment_name="default",
+            cwd=project,
+            env=os.environ.copy(),
+            required_package="ipykernel",
+            kernel_name="Python (Pixi)",
+            logger=logger,
+        )
+        return isinstance(result, Success)
+
+    return operation
+
+
+def pre_launch_operation() -> Operation:
+    async def operation(project: Path) -> bool:
+        kernel_spec = KernelSpec.from_resource_dir(str(KERNEL_SPEC_DIR))
+        provisioner = PixiKernelProvisioner(
+            kernel_id=str(uuid.uuid4()), kernel_spec=kernel_spec, parent=None
+        )
+        env = {**os.environ, "JPY_SESSION_NAME": str(project / "notebook.ipynb")}
+        kwargs = await provisioner.pre_launch(cwd=str(project), env=env)
+        # Fallback kernels run `python -m pixi_kernel`
+        return "pixi_kernel" not in kwargs["cmd"]
+
+    return operation
+
+
+def restart_operation() -> Operation:
+    idle: dict[Path, list[PixiKernelProvisioner]] = {}
+
+    async def operation(project: Path) -> bool:
+        provisioners = idle.setdefault(project, [])
+        if provisioners:
+            provisioner = provisioners.pop()
+        else:
+            kernel_spec = KernelSpec.from_resource_dir(str(KERNEL_SPEC_DIR))
+            provisioner = PixiKernelProvisioner(
+                kernel_id=str(uuid.uuid4()), kernel_spec=kernel_spec, parent=None
+            )
+        env = {**os.environ, "JPY_SESSION_NAME": str(project / "notebook.ipynb")}
+        try:
+            kwargs = await provisioner.pre_launch(cwd=str(project), env=env)
+        finally:
+            # Set when the kernel process is started, which isn't measured
+            provisioner._launched = True
+            provisioners.append(provisioner)
+        return "pixi_kernel" not in kwargs["cmd"]
+
+    return operation
+
+
+class JupyterServer:
+    """A Jupyter server with the pixi-kernel extension, running in a subprocess."""
+
+    def __init__(self, root_dir: Path, env: dict[str, str]) -> None:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.token = uuid.uuid4().hex
+        self.root_dir = root_dir
+        self.env = env
+        self.process: subprocess.Popen[bytes] | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> None:
+        self.process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "jupyter_server",
+                "--allow-root",
+                "--no-browser",
+                f"--ServerApp.port={self.port}",
+                f"--ServerApp.root_dir={self.root_dir}",
+                f"--IdentityProvider.token={self.token}",
+                '--ServerApp.jpserver_extensions={"pixi_kernel": True}',
+            ],
+            env=self.env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+    async def wait_until_ready(self) -> None:
+        assert self.process is not None
+        client = AsyncHTTPClient()
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError("The Jupyter server exited while starting")
+            try:
+                await client.fetch(f"{self.url}/api/status", headers=self.headers)
+                return
+            except (OSError, HTTPClientError):
+                await asyncio.sleep(0.2)
+        raise RuntimeError("Timed out waiting for the Jupyter server to start")
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {"Authorization": f"token {self.token}"}
+
+    def stop(self) -> None:
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+
+
+def envs_operation(server: JupyterServer, max_clients: int) -> Operation:
+    client = AsyncHTTPClient(force_instance=True, max_clients=max_clients)
+
+    async def operation(project: Path) -> bool:
+        body = {"serverRoot": str(server.root_dir), "localPath": f"{project.name}/notebook.ipynb"}
+        try:
+            response = await client.fetch(
+                f"{server.url}/pixi-kernel/envs",
+                method="POST",
+                headers=server.headers,
+                body=json.dumps(body),
+            )
+        except HTTPClientError:
+            return False
+        return "default" in json.loads(response.body)["environments"]
+
+    return operation
+
+
+def isolated_environment(home: Path, bin_dir: Path, args: argparse.Namespace) -> dict[str, str]:
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if not key.startswith(("PIXI", "FAKE_PIXI_", "JPY_", "JUPYTER_"))
+    }
+    env.update(
+        {
+            # No config file, store, trace file or project watcher from the user
+            "HOME": str(home),
+            "PATH": os.pathsep.join([str(bin_dir), env.get("PATH", "")]),
+            "PIXI_KERNEL_WATCH": "false",
+            "PIXI_KERNEL_LAUNCH_MODE": args.launch_mode,
+            "PIXI_KERNEL_LAUNCH_POLICY": args.launch_policy,
+            "FAKE_PIXI_LATENCY": str(args.latency),
+            "FAKE_PIXI_OUTPUT_SIZE": str(args.output_size),
+            "FAKE_PIXI_FAIL": args.fail,
+            "FAKE_PIXI_LOG": str(home / "pixi-calls.log"),
+        }
+    )
+    return env
+
+
+async def run_benchmarks(args: argparse.Namespace, root: Path) -> list[dict[str, Any]]:
+    bin_dir = root / "bin"
+    install_fake_pixi(bin_dir)
+    projects = create_projects(root / "projects", args.projects)
+    (root / "home").mkdir()
+    env = isolated_environment(root / "home", bin_dir, args)
+    os.environ.clear()
+    os.environ.update(env)
+    log_file = Path(env["FAKE_PIXI_LOG"])
+
+    def invalidate() -> None:
+        touch_projects(projects)
+        # Only reset in this process, the Jupyter server keeps its Pixi version check
+        pixi_kernel.compatibility._pixi_path_cache = None
+        pixi_kernel.compatibility._pixi_probes.clear()
+
+    results = []
+    for benchmark in args.benchmarks:
+        server = None
+        if benchmark == "envs":
+            server = JupyterServer(root / "projects", env)
+            server.start()
+            await server.wait_until_ready()
+
+        try:
+            for cache in args.cache:
+                for concurrency in args.concurrency:
+                    if benchmark == "readiness":
+                        operation = readiness_operation()
+                    elif benchmark == "pre_launch":
+                        operation = pre_launch_operation()
+                    elif benchmark == "restart":
+                        operation = restart_operation()
+                    else:
+                        assert server is not None
+                        operation = envs_operation(server, max_clients=concurrency)
+
+                    calls_before = read_pixi_calls(log_file)
+                    result = await run_case(
+                        operation,
+                        projects=projects,
+                        cache=cache,
+                        concurrency=concurrency,
+                        rounds=args.rounds,
+                        invalidate=invalidate,
+                    )
+                    calls = read_pixi_calls(log_file) - calls_before
+                    results.append(
+                        {
+                            "benchmark": benchmark,
+                            "cache": cache,
+                            "concurrency": concurrency,
+                            **result,
+                            # Including the unmeasured priming run of warm caches
+                            "pixi_calls": dict(sorted(calls.items())),
+                        }
+                    )
+                    print_result(results[-1])
+        finally:
+            if server is not None:
+                server.stop()
+    return results
+
+
+def print_result(result: dict[str, Any]) -> None:
+    latency = result["latency"]
+    print(
+        f"{result['benchmark']:>10} {result['cache']:>4} x{result['concurrency']:<3} "
+        f"{result['throughput']:9.1f} ops/s  "
+        f"p50 {latency['p50'] * 1000:8.2f} ms  p99 {latency['p99'] * 1000:8.2f} ms  "
+        f"failures {result['failures']}",
+        file=sys.stderr,
+    )
+
+
+def compare(results: list[dict[str, Any]], baseline: dict[str, Any], tolerance: float) -> int:
+    """Report median latencies that got worse than the baseline by more than `tolerance`."""
+    previous = {(r["benchmark"], r["cache"], r["concurrency"]): r for r in baseline["results"]}
+    regressions = 0
+    for result in results:
+        old = previous.get((result["benchmark"], result["cache"], result["concurrency"]))
+        if old is None:
+            continue
+        old_p50, new_p50 = old["latency"]["p50"], result["latency"]["p50"]
+        # Ignore sub-millisecond noise
+        if new_p50 > old_p50 * (1 + tolerance) and new_p50 - old_p50 > 0.001:
+            regressions += 1
+            print(
+                f"Regression in {result['benchmark']} ({result['cache']}, "
+                f"x{result['concurrency']}): p50 {old_p50 * 1000:.2f} ms -> "
+                f"{new_p50 * 1000:.2f} ms",
+                file=sys.stderr,
+            )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+
+    try:
+        pixi_kernel_version = version("pixi-kernel")
+    except PackageNotFoundError:
+        pixi_kernel_version = "unknown"
+
+    with tempfile.TemporaryDirectory(prefix="pixi-kernel-bench-") as root:
+        results = asyncio.run(run_benchmarks(args, Path(root)))
+
+    report = {
+        "pixi_kernel": pixi_kernel_version,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "parameters": {
+            key: str(value) if isinstance(value, Path) else value
+            for key, value in vars(args).items()
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        args.output.write_text(output + "\n")
+
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text())
+        if compare(results, baseline, args.tolerance) > 0:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""A programmable stand-in for the `pixi` binary, so benchmarks run offline and reproducibly.
+
+It implements just enough of `--version`, `info --json`, `list --json`, `install`,
+`shell-hook --json` and `run` for pixi-kernel, and is configured with environment variables,
+which pixi-kernel passes on to Pixi:
+
+- `FAKE_PIXI_LATENCY`: seconds every command takes, `FAKE_PIXI_LATENCY_<COMMAND>` overrides it
+  for one command, e.g. `FAKE_PIXI_LATENCY_INSTALL=2`. Commands are `VERSION`, `INFO`, `LIST`,
+  `INSTALL` and `SHELL_HOOK`.
+- `FAKE_PIXI_OUTPUT_SIZE`: approximate bytes of output, as extra dependencies in `info`, extra
+  packages in `list` and progress lines in `install`. `FAKE_PIXI_OUTPUT_SIZE_<COMMAND>` overrides
+  it for one command.
+- `FAKE_PIXI_FAIL`: comma-separated `command[:mode]` entries making commands fail. Modes are
+  `exit`, the default, to exit with an error, `garbage` to print unparseable output and `hang` to
+  never finish.
+- `FAKE_PIXI_VERSION`: version reported by `--version`, 0.50.0 by default.
+- `FAKE_PIXI_LOG`: file every invocation is appended to, one command per line.
+
+Run it through `install_fake_pixi`, which writes a `pixi` executable calling this file.
+"""
+
+import json
+import os
+import stat
+import sys
+import time
+from pathlib import Path
+
+COMMANDS = ("version", "info", "list", "install", "shell-hook")
+
+
+def install_fake_pixi(bin_dir: Path) -> Path:
+    """Write a `pixi` executable running this file to `bin_dir` and return its path."""
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    pixi = bin_dir / "pixi"
+    # Without site packages the stub starts in a few milliseconds
+    pixi.write_text(
+        f'#!/bin/sh\nexec "{sys.executable}" -I -S "{Path(__file__).resolve()}" "$@"\n'
+    )
+    pixi.chmod(pixi.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return pixi
+
+
+def _setting(name: str, command: str, default: str) -> str:
+    suffix = command.upper().replace("-", "_")
+    return os.environ.get(
+        f"FAKE_PIXI_{name}_{suffix}", os.environ.get(f"FAKE_PIXI_{name}", default)
+    )
+
+
+def _failure_mode(command: str) -> str | None:
+    for entry in os.environ.get("FAKE_PIXI_FAIL", "").split(","):
+        name, _, mode = entry.strip().partition(":")
+        if name == command:
+            return mode or "exit"
+    return None
+
+
+def _find_manifest(cwd: Path) -> Path | None:
+    for directory in (cwd, *cwd.parents):
+        for name in ("pixi.toml", "pyproject.toml"):
+            if (directory / name).is_file():
+                return directory / name
+    return None
+
+
+def _environment_names(manifest: Path) -> list[str]:
+    # Benchmark projects list their environments in a comment, e.g. `# environments: default,test`
+    for line in manifest.read_text().splitlines():
+        if line.startswith("# environments:"):
+            return [name.strip() for name in line.split(":", 1)[1].split(",")]
+    return ["default"]
+
+
+def _option(args: list[str], name: str, default: str) -> str:
+    for flag in (f"--{name}", f"-{name[0]}"):
+        if flag in args:
+            return args[args.index(flag) + 1]
+    return default
+
+
+def _prefix(manifest: Path, environment: str) -> Path:
+    return manifest.parent / ".pixi" / "envs" / environment
+
+
+def _padding(size: int, item_size: int = 32) -> list[str]:
+    return [f"fake-package-{i:06d}" for i in range(max(size, 0) // item_size)]
+
+
+def main(args: list[str]) -> int:
+    command = "version" if args[:1] == ["--version"] else args[0] if args else ""
+    if command not in (*COMMANDS, "run", "project"):
+        print(f"fake pixi: unsupported command {command}", file=sys.stderr)
+        return 2
+
+    log_file = os.environ.get("FAKE_PIXI_LOG")
+    if log_file:
+        with Path(log_file).open("a") as file:
+            file.write(f"{command}\n")
+
+    if command == "run":
+        # `pixi run [--locked|--frozen|--no-install]... --environment <name> <command>...`
+        rest = args[1:]
+        while rest[0].startswith("-"):
+            rest = rest[2:] if rest[0] in ("--environment", "-e") else rest[1:]
+        os.execvp(rest[0], rest)
+
+    if command == "project":
+        print("fake pixi: failed to parse the manifest", file=sys.stderr)
+        return 1
+
+    time.sleep(float(_setting("LATENCY", command, "0")))
+    output_size = int(_setting("OUTPUT_SIZE", command, "0"))
+
+    failure_mode = _failure_mode(command)
+    if failure_mode == "hang":
+        time.sleep(24 * 60 * 60)
+    if failure_mode == "exit":
+        print(f"fake pixi: {command} failed", file=sys.stderr)
+        return 1
+    if failure_mode == "garbage":
+        print("fake pixi garbage output")
+        return 0
+
+    if command == "version":
+        print(f"pixi {os.environ.get('FAKE_PIXI_VERSION', '0.50.0')}")
+        return 0
+
+    manifest = _find_manifest(Path.cwd())
+    if manifest is None:
+        if command == "info":
+            print(json.dumps({"project_info": None, "environments_info": []}))
+            return 0
+        print("fake pixi: could not find a Pixi project", file=sys.stderr)
+        return 1
+
+    environment = _option(args, "environment", "default")
+    if command == "info":
+        environments = [
+            {
+                "name": name,
+                "dependencies": ["python", *_padding(output_size)],
+                "pypi_dependencies": [],
+                "prefix": str(_prefix(manifest, name)),
+            }
+            for name in _environment_names(manifest)
+        ]
+        info = {
+            "project_info": {"manifest_path": str(manifest)},
+            "environments_info": environments,
+        }
+        print(json.dumps(info))
+    elif command == "list":
+        names = ["python", "ipykernel", *_padding(output_size)]
+        print(json.dumps([{"name": name} for name in names]))
+    elif command == "install":
+        (_prefix(manifest, environment) / "conda-meta").mkdir(parents=True, exist_ok=True)
+        for line in _padding(output_size, item_size=64):
+            print(f"installing {line}".ljust(63), file=sys.stderr)
+        print(f"The {environment} environment has been installed.", file=sys.stderr)
+    elif command == "shell-hook":
+        prefix = _prefix(manifest, environment)
+        path = os.pathsep.join([str(prefix / "bin"), os.environ.get("PATH", "")])
+        variables = {"CONDA_PREFIX": str(prefix), "PIXI_ENVIRONMENT_NAME": environment}
+        print(json.dumps({"environment_variables": {**variables, "PATH": path}}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -4,6 +4,8 @@ import platform
 from pathlib import Path
 
 import pixi_kernel.compatibility
+import pixi_kernel.info
+import pixi_kernel.store
 import pytest
 from returns.result import Failure
 
@@ -24,6 +26,17 @@ if platform.system() == "Windows":
 @pytest.fixture(autouse=True)
 def _clear_pixi_path_cache():
     pixi_kernel.compatibility._pixi_path_cache = None
+    pixi_kernel.compatibility._pixi_probes.clear()
+
+
+@pytest.fixture(autouse=True)
+def _clear_pixi_info_cache():
+    pixi_kernel.info._pixi_info_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def _disable_store():
+    pixi_kernel.store.configure_store(None)
 
 
 @pytest.fixture
@@ -0,0 +1,53 @@
+import json
+import logging
+from pathlib import Path
+
+import pixi_kernel.compatibility
+import pytest
+from pixi_kernel.activation import get_activation_env
+from pixi_kernel.fingerprint import project_fingerprint
+from returns.result import Success
+
+
+@pytest.fixture
+def shell_hook_calls(monkeypatch: pytest.MonkeyPatch) -> list[tuple[str, ...]]:
+    calls: list[tuple[str, ...]] = []
+
+    async def mock_subprocess_exec(cmd, *args, **kwargs):
+        calls.append(args)
+        variables = {"PATH": f"/prefix/bin:{kwargs['env']['PATH']}", "HOME": "/home/user"}
+        return 0, json.dumps({"environment_variables": variables}), ""
+
+    monkeypatch.setattr(pixi_kernel.compatibility, "find_pixi_binary", lambda: Success("pixi"))
+    monkeypatch.setattr(pixi_kernel.compatibility, "subprocess_exec", mock_subprocess_exec)
+    return calls
+
+
+@pytest.fixture
+def project(tmp_path: Path) -> Path:
+    (tmp_path / "pixi.toml").write_text("[workspace]\n")
+    (tmp_path / "pixi.lock").write_text("version: 6\n")
+    (tmp_path / ".pixi" / "envs" / "default" / "conda-meta").mkdir(parents=True)
+    return tmp_path
+
+
+async def test_activation_is_persisted(project: Path, shell_hook_calls: list[tuple[str, ...]]):
+    kwargs = {
+        "environment_name": "default",
+        "prefix": str(project / ".pixi" / "envs" / "default"),
+        "fingerprint": project_fingerprint(project),
+        "cwd": project,
+        "env": {"PATH": "/usr/bin", "HOME": "/home/user"},
+        "logger": logging.getLogger("pixi_kernel"),
+    }
+
+    first = await get_activation_env(**kwargs)
+    second = await get_activation_env(**kwargs)
+
+    assert first.unwrap() == second.unwrap() == {"PATH": "/prefix/bin:/usr/bin"}
+    assert shell_hook_calls == [("shell-hook", "--json", "--environment", "default")]
+
+    kwargs["env"] = {"PATH": "/bin"}
+    result = await get_activation_env(**kwargs)
+    assert result.unwrap()["PATH"] == "/prefix/bin:/bin"
+    assert len(shell_hook_calls) == 2
@@ -0,0 +1,26 @@
+import sys
+
+from pixi_kernel.async_subprocess import subprocess_stream
+
+SCRIPT = """
+import sys
+print("resolving", flush=True)
+sys.stderr.write("downloading 10%\\rdownloading 100%\\n")
+sys.stderr.flush()
+print("x" * 1000)
+sys.exit(3)
+"""
+
+
+async def test_subprocess_stream():
+    lines: list[str] = []
+    returncode, stdout, stderr = await subprocess_stream(
+        sys.executable, "-c", SCRIPT, on_output=lines.append, max_output=100
+    )
+
+    assert returncode == 3
+    assert sorted(lines) == sorted(
+        ["resolving", "downloading 10%", "downloading 100%", "x" * 1000]
+    )
+    assert stdout == "x" * 99 + "\n"
+    assert stderr.endswith("downloading 100%\n")
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import time
+
+import pixi_kernel.blocking
+import pytest
+from pixi_kernel.blocking import (
+    FileSystemTimeoutError,
+    add_blocking_observer,
+    configure_blocking,
+    measure_blocking,
+    run_blocking,
+)
+from pixi_kernel.tracing import start_span, use_span
+
+
+@pytest.fixture
+def short_timeout():
+    configure_blocking(threads=4, timeout=0.05)
+    yield
+    configure_blocking(threads=4, timeout=10)
+
+
+async def test_run_blocking_uses_the_pool():
+    launch = start_span("launch")
+    with use_span(launch):
+        name, parent = await run_blocking(
+            lambda: (threading.current_thread().name, start_span("metadata").parent)
+        )
+    assert name.startswith("pixi-kernel-fs")
+    assert parent is launch
+
+
+@pytest.mark.usefixtures("short_timeout")
+async def test_run_blocking_timeout():
+    release = threading.Event()
+    with pytest.raises(FileSystemTimeoutError, match=r"within 0\.05 seconds"):
+        await run_blocking(release.wait, 5)
+    release.set()
+
+
+async def test_measure_blocking(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(pixi_kernel.blocking, "_blocking_observers", [])
+    steps: list[tuple[str, float]] = []
+    add_blocking_observer(lambda operation, seconds: steps.append((operation, seconds)))
+
+    async def work() -> str:
+        time.sleep(0.02)  # noqa: ASYNC251
+        await asyncio.sleep(0)
+        time.sleep(0.03)  # noqa: ASYNC251
+        return "done"
+
+    launch = start_span("launch")
+    with use_span(launch):
+        assert await measure_blocking("test", work()) == "done"
+
+    assert [operation for operation, _ in steps] == ["test", "test"]
+    blocking = [seconds for _, seconds in steps]
+    assert blocking[0] >= 0.02
+    assert blocking[1] >= 0.03
+    assert launch.attributes["blocking_time"] == pytest.approx(sum(blocking))
+
+
+async def test_measure_blocking_forwards_cancellation():
+    cancelled = False
+
+    async def work() -> None:
+        nonlocal cancelled
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+
+    task = asyncio.create_task(measure_blocking("test", work()))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert cancelled
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import stat
 import sys
@@ -5,8 +6,14 @@ import tempfile
 from pathlib import Path
 
 import msgspec
+import pixi_kernel.compatibility
 import pytest
-from pixi_kernel.compatibility import find_pixi_binary
+from pixi_kernel.compatibility import (
+    PixiVersion,
+    find_pixi_binary,
+    has_compatible_pixi,
+    parse_pixi_version,
+)
 from returns.result import Failure, Success
 
 
@@ -103,3 +110,55 @@ def test_find_pixi_via_default_path_success():
 def test_find_pixi_not_found_anywhere():
     result = find_pixi_binary()
     assert isinstance(result, Failure)
+
+
+@pytest.mark.parametrize(
+    ("output", "expected"),
+    [
+        ("pixi 0.50.2\n", PixiVersion(0, 50, 2)),
+        ("pixi 0.51.0-beta.1\n", PixiVersion(0, 51, 0, "beta.1")),
+        ("pixi 0.50.2+abc123\n", PixiVersion(0, 50, 2)),
+        ("WARN something\npixi v1.0.0 (nightly)\n", PixiVersion(1, 0, 0)),
+        ("pixi 0.50\n", None),
+        ("wrong output", None),
+    ],
+)
+def test_parse_pixi_version(output: str, expected: PixiVersion | None):
+    assert parse_pixi_version(output) == expected
+
+
+def test_pixi_version_is_at_least():
+    assert PixiVersion(0, 39, 0).is_at_least((0, 39, 0))
+    assert PixiVersion(0, 40, 0, "rc.1").is_at_least((0, 39, 0))
+    assert not PixiVersion(0, 39, 0, "rc.1").is_at_least((0, 39, 0))
+    assert not PixiVersion(0, 38, 9).is_at_least((0, 39, 0))
+
+
+async def test_pixi_is_probed_again_when_it_changes(
+    pixi_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    version = "0.50.0"
+    calls = 0
+
+    async def mock_subprocess_exec(cmd, *args, **kwargs):
+        nonlocal calls
+        calls += 1
+        return 0, f"pixi {version}\n", ""
+
+    monkeypatch.setattr(
+        pixi_kernel.compatibility, "find_pixi_binary", lambda: Success(str(pixi_path))
+    )
+    monkeypatch.setattr(pixi_kernel.compatibility, "subprocess_exec", mock_subprocess_exec)
+
+    results = await asyncio.gather(*(has_compatible_pixi() for _ in range(3)))
+    assert all(isinstance(result, Success) for result in results)
+    assert isinstance(await has_compatible_pixi(), Success)
+    assert calls == 1
+
+    # Like `pixi self-update` with a broken release
+    version = "0.30.0"
+    pixi_path.write_text("updated")  # noqa: ASYNC240
+    result = await has_compatible_pixi()
+    assert isinstance(result, Failure)
+    assert "outdated" in result.failure()
+    assert calls == 2
@@ -0,0 +1,45 @@
+import logging
+from pathlib import Path
+
+import pytest
+from pixi_kernel.config import Config, load_config
+
+
+@pytest.fixture
+def config_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    config_path = tmp_path / "config.toml"
+    monkeypatch.setattr("pixi_kernel.config.get_config_file", lambda: config_path)
+    return config_path
+
+
+def test_default_config(config_path: Path):
+    assert load_config() == Config()
+
+
+def test_config_file(config_path: Path):
+    config_path.write_text('pixi-path = "/usr/bin/pixi"\nlaunch-mode = "direct"\n')
+    assert load_config().launch_mode == "direct"
+
+
+def test_config_environment_variable(config_path: Path, monkeypatch: pytest.MonkeyPatch):
+    config_path.write_text('launch-mode = "pixi-run"\n')
+    monkeypatch.setenv("PIXI_KERNEL_LAUNCH_MODE", "direct")
+    assert load_config().launch_mode == "direct"
+
+
+def test_invalid_config(config_path: Path):
+    config_path.write_text('launch-mode = "unknown"\n')
+    assert load_config() == Config()
+
+
+def test_invalid_setting_keeps_the_others(
+    config_path: Path, monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+):
+    config_path.write_text('launch-policy = "frozen"\nstore-dir = "/tmp/store"\n')
+    monkeypatch.setenv("PIXI_KERNEL_POOL_SIZE", "abc")
+    with caplog.at_level(logging.WARNING):
+        config = load_config(logging.getLogger())
+    assert config.launch_policy == "frozen"
+    assert config.store_dir == "/tmp/store"
+    assert config.pool_size == Config().pool_size
+    assert "pool-size" in caplog.text
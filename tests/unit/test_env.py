@@ -0,0 +1,47 @@
+import json
+from pathlib import Path
+
+import pixi_kernel.compatibility
+import pytest
+from pixi_kernel.env import DEFAULT_ENVIRONMENT, envs_from_paths
+from returns.result import Success
+
+
+@pytest.fixture
+def pixi_cwds(monkeypatch: pytest.MonkeyPatch) -> list[Path]:
+    cwds: list[Path] = []
+
+    async def mock_subprocess_exec(cmd, *args, cwd, **kwargs):
+        cwds.append(cwd)
+        if not (Path(cwd) / "pixi.toml").exists():
+            return 0, json.dumps({"project_info": None, "environments_info": []}), ""
+
+        environments = [
+            {"name": name, "dependencies": [], "pypi_dependencies": [], "prefix": ""}
+            for name in ("test", "default")
+        ]
+        info = {"project_info": {"manifest_path": "pixi.toml"}, "environments_info": environments}
+        return 0, json.dumps(info), ""
+
+    monkeypatch.setattr(pixi_kernel.compatibility, "find_pixi_binary", lambda: Success("pixi"))
+    monkeypatch.setattr(pixi_kernel.compatibility, "subprocess_exec", mock_subprocess_exec)
+    return cwds
+
+
+async def test_envs_from_paths_runs_pixi_once_per_project(tmp_path: Path, pixi_cwds: list[Path]):
+    projects = [tmp_path / "first", tmp_path / "second"]
+    notebook_dirs = []
+    for project in projects:
+        (project / "a" / "b").mkdir(parents=True)
+        (project / "pixi.toml").write_text("[workspace]\n")
+        notebook_dirs += [project, project / "a", project / "a" / "b"]
+    outside = tmp_path / "outside"
+    outside.mkdir()
+
+    envs = await envs_from_paths([*notebook_dirs, outside], concurrency=1)
+
+    assert envs == {
+        **{path: ["default", "test"] for path in notebook_dirs},
+        outside: [DEFAULT_ENVIRONMENT],
+    }
+    assert len(pixi_cwds) == 3
@@ -0,0 +1,49 @@
+import json
+import sys
+import time
+from pathlib import Path
+
+from jupyter_client.kernelspec import KernelSpecManager
+from jupyter_client.manager import AsyncKernelManager
+
+MESSAGE = "Pixi was not detected in your system."
+
+
+async def test_fallback_kernel(tmp_path: Path):
+    kernel_spec = {
+        "argv": [sys.executable, "-m", "pixi_kernel", "{connection_file}", MESSAGE],
+        "display_name": "Fallback",
+        "language": "python",
+        "env": {"PYTHONPATH": str(Path(__file__).parents[2])},
+    }
+    (tmp_path / "fallback").mkdir()
+    (tmp_path / "fallback" / "kernel.json").write_text(json.dumps(kernel_spec))
+
+    km = AsyncKernelManager(
+        kernel_name="fallback", kernel_spec_manager=KernelSpecManager(kernel_dirs=[str(tmp_path)])
+    )
+    start = time.perf_counter()
+    await km.start_kernel()
+    kc = km.client()
+    kc.start_channels()
+    try:
+        await kc.wait_for_ready(timeout=5)
+        # Includes the Python interpreter startup and a kernel_info round trip
+        assert time.perf_counter() - start < 5
+
+        messages: list[dict] = []
+        reply = await kc.execute_interactive(
+            "print('hello')", output_hook=messages.append, timeout=5
+        )
+        assert reply["content"]["status"] == "error"
+        assert reply["content"]["ename"] == "PixiKernelError"
+        assert reply["content"]["evalue"] == MESSAGE
+
+        streams = [msg["content"] for msg in messages if msg["msg_type"] == "stream"]
+        assert {"name": "stderr", "text": MESSAGE} in streams
+
+        assert await kc.is_alive()
+    finally:
+        kc.stop_channels()
+        await km.shutdown_kernel()
+    assert not await km.is_alive()
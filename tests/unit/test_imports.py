@@ -0,0 +1,60 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+MARKER = "pixi-kernel-import-profile"
+
+
+class ImportProfile:
+    def __init__(self, stderr: str) -> None:
+        lines = stderr.splitlines()
+        lines = lines[lines.index(MARKER) + 1 :]
+        # `import time: self [us] | cumulative [us] | module`, nested modules are indented
+        rows = [line.split("|") for line in lines if line.startswith("import time:")]
+        self.modules = [row[2].strip() for row in rows]
+
+
+def import_profile(module: str, *, preload: str = "") -> ImportProfile:
+    """Import `module` in a fresh interpreter, after the modules Jupyter already has loaded."""
+    code = f"{preload}\nimport sys\nprint({MARKER!r}, file=sys.stderr)\nimport {module}"
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).parents[2],
+    )
+    return ImportProfile(process.stderr)
+
+
+# Import times vary too much between CI runners to be asserted on. The number of modules imported
+# is stable and catches the regressions that matter, like a new top-level import of a heavy
+# dependency.
+@pytest.mark.parametrize(
+    ("module", "preload", "max_modules", "forbidden"),
+    [
+        # Jupyter Server discovers the server extension by importing the package
+        ("pixi_kernel", "", 5, ["jupyter_server", "tornado"]),
+        # The fallback kernel, started with `python -m pixi_kernel`
+        (
+            "pixi_kernel.__main__",
+            "",
+            80,
+            ["IPython", "ipykernel", "jupyter_client", "jupyter_server", "prometheus_client"],
+        ),
+        # Jupyter loads the provisioner entry point whenever it lists kernel specs
+        (
+            "pixi_kernel.provisioner",
+            "import jupyter_client.provisioning, jupyter_client.kernelspec",
+            50,
+            ["prometheus_client", "returns", "sqlite3", "pixi_kernel.readiness"],
+        ),
+    ],
+)
+def test_import_budget(module: str, preload: str, max_modules: int, forbidden: list[str]):
+    profile = import_profile(module, preload=preload)
+    assert len(profile.modules) <= max_modules, profile.modules
+    for name in forbidden:
+        assert name not in profile.modules
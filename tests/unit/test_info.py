@@ -0,0 +1,85 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pixi_kernel.compatibility
+import pytest
+from pixi_kernel.cache import LRUCache
+from pixi_kernel.info import get_pixi_info
+from returns.result import Success
+
+PIXI_INFO = {
+    "project_info": {"manifest_path": "pixi.toml"},
+    "environments_info": [
+        {"name": "default", "dependencies": ["ipykernel"], "pypi_dependencies": [], "prefix": ""},
+    ],
+}
+
+
+@pytest.fixture
+def pixi_calls(monkeypatch: pytest.MonkeyPatch) -> list[tuple[str, ...]]:
+    calls: list[tuple[str, ...]] = []
+
+    async def mock_subprocess_exec(cmd, *args, **kwargs):
+        calls.append(args)
+        return 0, json.dumps(PIXI_INFO), ""
+
+    monkeypatch.setattr(pixi_kernel.compatibility, "find_pixi_binary", lambda: Success("pixi"))
+    monkeypatch.setattr(pixi_kernel.compatibility, "subprocess_exec", mock_subprocess_exec)
+    return calls
+
+
+async def test_pixi_info_cache_hit(tmp_path: Path, pixi_calls: list[tuple[str, ...]]):
+    (tmp_path / "pixi.toml").write_text("[workspace]\n")
+    notebook_dir = tmp_path / "notebooks"
+    notebook_dir.mkdir()
+
+    first = await get_pixi_info(cwd=tmp_path, env={})
+    second = await get_pixi_info(cwd=notebook_dir, env={})
+
+    assert first.unwrap() == second.unwrap()
+    assert pixi_calls == [("info", "--json")]
+
+
+async def test_pixi_info_cache_invalidated(tmp_path: Path, pixi_calls: list[tuple[str, ...]]):
+    (tmp_path / "pixi.toml").write_text("[workspace]\n")
+    await get_pixi_info(cwd=tmp_path, env={})
+
+    (tmp_path / "pixi.lock").write_text("version: 6\n")
+    await get_pixi_info(cwd=tmp_path, env={})
+
+    assert len(pixi_calls) == 2
+
+
+async def test_pixi_info_not_cached_without_project(
+    tmp_path: Path, pixi_calls: list[tuple[str, ...]]
+):
+    (tmp_path / "pyproject.toml").write_text("[project]\nname = 'not-pixi'\n")
+    await get_pixi_info(cwd=tmp_path, env={})
+    await get_pixi_info(cwd=tmp_path, env={})
+
+    assert len(pixi_calls) == 2
+
+
+def test_lru_cache_eviction():
+    cache: LRUCache[str, int] = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+
+    cache.put("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+async def test_concurrent_pixi_info_calls_are_coalesced(
+    tmp_path: Path, pixi_calls: list[tuple[str, ...]]
+):
+    (tmp_path / "pixi.toml").write_text("[workspace]\n")
+
+    results = await asyncio.gather(*(get_pixi_info(cwd=tmp_path, env={}) for _ in range(3)))
+
+    assert all(isinstance(result, Success) for result in results)
+    assert pixi_calls == [("info", "--json")]
@@ -0,0 +1,139 @@
+import logging
+import shutil
+import threading
+from pathlib import Path
+
+import pixi_kernel.install
+import pytest
+from pixi_kernel.blocking import FileSystemTimeoutError, configure_blocking
+from pixi_kernel.fingerprint import project_fingerprint
+from pixi_kernel.install import install_environment, is_install_current, record_install
+from pixi_kernel.store import configure_store
+
+
+@pytest.fixture
+def project(tmp_path: Path) -> Path:
+    (tmp_path / "pixi.toml").write_text("[workspace]\n")
+    (tmp_path / "pixi.lock").write_text("version: 6\n")
+    (tmp_path / ".pixi" / "envs" / "default" / "conda-meta").mkdir(parents=True)
+    return tmp_path
+
+
+async def test_install_is_current_after_record(project: Path):
+    prefix = str(project / ".pixi" / "envs" / "default")
+    fingerprint = project_fingerprint(project)
+    assert not await is_install_current(
+        prefix=prefix, environment="default", fingerprint=fingerprint
+    )
+
+    await record_install(prefix=prefix, environment="default", fingerprint=fingerprint)
+    assert await is_install_current(prefix=prefix, environment="default", fingerprint=fingerprint)
+    assert not await is_install_current(prefix=prefix, environment="test", fingerprint=fingerprint)
+
+
+async def test_install_outdated_after_lockfile_change(project: Path):
+    prefix = str(project / ".pixi" / "envs" / "default")
+    await record_install(
+        prefix=prefix, environment="default", fingerprint=project_fingerprint(project)
+    )
+
+    (project / "pixi.lock").write_text("version: 6\npackages: []\n")
+    fingerprint = project_fingerprint(project)
+    assert not await is_install_current(
+        prefix=prefix, environment="default", fingerprint=fingerprint
+    )
+
+
+async def test_install_never_current_without_lockfile(project: Path):
+    prefix = str(project / ".pixi" / "envs" / "default")
+    (project / "pixi.lock").unlink()
+    fingerprint = project_fingerprint(project)
+
+    await record_install(prefix=prefix, environment="default", fingerprint=fingerprint)
+    assert not await is_install_current(
+        prefix=prefix, environment="default", fingerprint=fingerprint
+    )
+
+
+@pytest.mark.parametrize(
+    ("policy", "options"),
+    [
+        ("strict", []),
+        ("locked", ["--locked"]),
+        ("frozen", ["--frozen"]),
+        ("trusted", ["--frozen"]),
+    ],
+)
+async def test_install_lockfile_options(
+    project: Path, monkeypatch: pytest.MonkeyPatch, policy: str, options: list[str]
+):
+    calls: list[tuple[str, ...]] = []
+
+    async def run_pixi_stream(*args: str, **kwargs):
+        calls.append(args)
+        return 0, "", ""
+
+    monkeypatch.setattr(pixi_kernel.install, "run_pixi_stream", run_pixi_stream)
+    result = await install_environment(
+        environment_name="default",
+        prefix=str(project / ".pixi" / "envs" / "default"),
+        project_root=project,
+        cwd=project,
+        env={},
+        logger=logging.getLogger("pixi_kernel"),
+        policy=policy,
+    )
+    assert result.unwrap() is None
+    assert calls == [("install", *options, "--environment", "default")]
+
+
+async def test_install_current_for_same_or_stricter_options(project: Path):
+    prefix = str(project / ".pixi" / "envs" / "default")
+    fingerprint = project_fingerprint(project)
+    current = {"prefix": prefix, "environment": "default", "fingerprint": fingerprint}
+
+    # A frozen install of an outdated lockfile must not skip the next strict install
+    await record_install(**current, options=("--frozen",))
+    assert await is_install_current(**current, options=("--frozen",))
+    assert not await is_install_current(**current, options=("--locked",))
+    assert not await is_install_current(**current)
+
+    await record_install(**current)
+    assert await is_install_current(**current)
+    assert await is_install_current(**current, options=("--locked",))
+    assert await is_install_current(**current, options=("--frozen",))
+
+
+async def test_store_record_needs_the_environment(tmp_path: Path, project: Path):
+    configure_store(str(tmp_path / "store"))
+    prefix = str(project / ".pixi" / "envs" / "default")
+    fingerprint = project_fingerprint(project)
+    await record_install(prefix=prefix, environment="default", fingerprint=fingerprint)
+    # Only the store record is left, like for a read-only prefix
+    (project / ".pixi" / "envs" / "default" / "conda-meta" / "pixi-kernel").unlink()
+    assert await is_install_current(prefix=prefix, environment="default", fingerprint=fingerprint)
+
+    shutil.rmtree(project / ".pixi")
+    assert not await is_install_current(
+        prefix=prefix, environment="default", fingerprint=fingerprint
+    )
+
+
+async def test_install_state_times_out(project: Path, monkeypatch: pytest.MonkeyPatch):
+    # A hanging network file system fails the launch instead of blocking the event loop
+    release = threading.Event()
+    monkeypatch.setattr(pixi_kernel.install, "_read_install_state", lambda _: release.wait(5))
+    configure_blocking(threads=4, timeout=0.05)
+    try:
+        with pytest.raises(FileSystemTimeoutError):
+            await install_environment(
+                environment_name="default",
+                prefix=str(project / ".pixi" / "envs" / "default"),
+                project_root=project,
+                cwd=project,
+                env={},
+                logger=logging.getLogger(),
+            )
+    finally:
+        release.set()
+        configure_blocking(threads=4, timeout=10)
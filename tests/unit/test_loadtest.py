@@ -0,0 +1,53 @@
+import random
+from pathlib import Path
+
+import pytest
+from pixi_kernel.loadtest import (
+    DEFAULT_KERNEL,
+    Workload,
+    _is_pixi_command,
+    arrival_times,
+    parse_workloads,
+    summarize,
+)
+
+
+def test_parse_workloads(tmp_path: Path):
+    workloads = parse_workloads([f"{tmp_path}:default,test", str(tmp_path)], ["a", "b"])
+    assert workloads == [
+        Workload(project=str(tmp_path), environment=environment, kernel=kernel)
+        for environment in ("default", "test", "default")
+        for kernel in ("a", "b")
+    ]
+
+
+def test_parse_workloads_defaults(monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
+    monkeypatch.chdir(tmp_path)
+    assert parse_workloads(None, None) == [
+        Workload(project=str(tmp_path), environment="default", kernel=DEFAULT_KERNEL)
+    ]
+
+
+@pytest.mark.parametrize("arrival", ["poisson", "uniform"])
+def test_arrival_times(arrival: str):
+    times = arrival_times(1000, 50, arrival, random.Random(0))
+    assert times[0] == 0
+    assert times == sorted(times)
+    # 1000 arrivals at 50 per second take about 20 seconds
+    assert 18 < times[-1] < 22
+
+
+def test_is_pixi_command():
+    assert _is_pixi_command(["/usr/bin/pixi", "info", "--json"], None)
+    assert _is_pixi_command(["python", "-I", "-S", "/fake/pixi.py", "list"], "/fake/pixi.py")
+    assert not _is_pixi_command(["/usr/bin/pixi", "run", "python"], None)
+    assert not _is_pixi_command(["python", "-m", "ipykernel_launcher"], None)
+
+
+def test_summarize():
+    assert summarize([]) is None
+    summary = summarize([float(i) for i in range(1, 101)])
+    assert summary is not None
+    assert summary.count == 100
+    assert summary.p50 == pytest.approx(50.5)
+    assert summary.max == 100
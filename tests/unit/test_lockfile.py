@@ -0,0 +1,81 @@
+import shutil
+from pathlib import Path
+
+import pixi_kernel.lockfile
+import pytest
+from pixi_kernel.lockfile import get_lock_index, get_locked_packages
+
+data_dir = Path(__file__).parent / "data"
+
+
+@pytest.fixture(autouse=True)
+def _clear_lock_index_cache():
+    pixi_kernel.lockfile._lock_index_cache.clear()
+
+
+async def test_transitive_dependency():
+    lockfile = data_dir / "transitive_dependency" / "pixi.lock"
+    for platform in ("linux-64", "linux-aarch64", "osx-64", "osx-arm64", "win-64"):
+        default = await get_locked_packages(lockfile, "default", platform)
+        test = await get_locked_packages(lockfile, "test", platform)
+        assert default is not None
+        assert test is not None
+        assert "python" in default
+        assert "ipykernel" not in default
+        assert "ipykernel" in test
+
+
+async def test_conda_names_with_dashes():
+    lockfile = data_dir / "transitive_dependency" / "pixi.lock"
+    packages = await get_locked_packages(lockfile, "default", "linux-64")
+    assert packages is not None
+    assert {"_libgcc_mutex", "ca-certificates", "ld_impl_linux-64"} <= packages
+
+
+async def test_pypi_names():
+    lockfile = data_dir / "pyproject_project" / "pixi.lock"
+    packages = await get_locked_packages(lockfile, "default", "linux-64")
+    assert packages is not None
+    assert {"ipykernel", "jupyter-client", "python"} <= packages
+
+
+async def test_unknown_environment_and_platform():
+    lockfile = data_dir / "pixi_project" / "pixi.lock"
+    assert await get_locked_packages(lockfile, "missing", "linux-64") is None
+    assert await get_locked_packages(lockfile, "default", "emscripten-wasm32") is None
+
+
+async def test_missing_lockfile(tmp_path: Path):
+    assert await get_lock_index(tmp_path / "pixi.lock") is None
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "not a lockfile\n",
+        "version: 1\nenvironments: {}\n",
+        # The pypi package is missing from the top-level package list
+        (
+            "version: 6\nenvironments:\n  default:\n    packages:\n      linux-64:\n"
+            "      - pypi: ./local\npackages: []\n"
+        ),
+    ],
+)
+async def test_unparseable_lockfile(tmp_path: Path, content: str):
+    lockfile = tmp_path / "pixi.lock"
+    lockfile.write_text(content)
+    assert await get_lock_index(lockfile) is None
+
+
+async def test_cache_invalidation(tmp_path: Path):
+    lockfile = tmp_path / "pixi.lock"
+    shutil.copy(data_dir / "missing_ipykernel" / "pixi.lock", lockfile)
+    first = await get_lock_index(lockfile)
+    assert first is not None
+    assert await get_lock_index(lockfile) is first
+
+    shutil.copy(data_dir / "transitive_dependency" / "pixi.lock", lockfile)
+    second = await get_lock_index(lockfile)
+    assert second is not None
+    assert second is not first
+    assert "test" in second
@@ -0,0 +1,83 @@
+from pathlib import Path
+from typing import Any
+
+import pixi_kernel.compatibility
+import pytest
+from pixi_kernel.compatibility import run_pixi_stream
+from pixi_kernel.lockfile import get_lock_index
+from pixi_kernel.metrics import REGISTRY, generate_metrics
+from pixi_kernel.tracing import span, start_span
+from returns.result import Success
+
+
+def sample(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_launch_span_metrics():
+    launches = sample("pixi_kernel_launch_duration_seconds_count", fallback="true")
+    fallbacks = sample("pixi_kernel_fallback_launches_total", reason="install")
+
+    launch = start_span("launch")
+    launch.set(fallback=True, fallback_reason="install")
+    launch.end()
+    # Ending a span twice must not count it twice
+    launch.end()
+
+    assert sample("pixi_kernel_launch_duration_seconds_count", fallback="true") == launches + 1
+    assert sample("pixi_kernel_fallback_launches_total", reason="install") == fallbacks + 1
+
+
+def test_pixi_command_metrics():
+    installs = sample("pixi_kernel_pixi_command_duration_seconds_count", command="install")
+    failures = sample("pixi_kernel_pixi_command_failures_total", command="install")
+    versions = sample("pixi_kernel_pixi_command_duration_seconds_count", command="version")
+    install_bytes = sample("pixi_kernel_install_output_bytes_total")
+
+    with span("pixi install") as install_span:
+        install_span.set(exit_code=1, output_bytes=1000)
+    with span("pixi --version") as version_span:
+        version_span.set(exit_code=0)
+
+    assert sample("pixi_kernel_pixi_command_duration_seconds_count", command="install") == (
+        installs + 1
+    )
+    assert sample("pixi_kernel_pixi_command_failures_total", command="install") == failures + 1
+    assert sample("pixi_kernel_pixi_command_duration_seconds_count", command="version") == (
+        versions + 1
+    )
+    assert sample("pixi_kernel_install_output_bytes_total") == install_bytes + 1000
+
+
+async def test_install_output_bytes(monkeypatch: pytest.MonkeyPatch):
+    async def get_pixi_binary():
+        return Success("pixi")
+
+    async def subprocess_stream(*args: str, on_output: Any, **kwargs: Any):
+        on_output("Installed 2 packages")
+        on_output("✔ default")
+        return 0, "", ""
+
+    monkeypatch.setattr(pixi_kernel.compatibility, "get_pixi_binary", get_pixi_binary)
+    monkeypatch.setattr(pixi_kernel.compatibility, "subprocess_stream", subprocess_stream)
+    install_bytes = sample("pixi_kernel_install_output_bytes_total")
+
+    await run_pixi_stream("install", on_output=lambda line: None)
+    assert sample("pixi_kernel_install_output_bytes_total") == install_bytes + 21 + 12
+
+
+async def test_cache_metrics(tmp_path: Path):
+    lockfile = tmp_path / "pixi.lock"
+    lockfile.write_text("version: 6\nenvironments: {}\npackages: []\n")
+
+    hits = sample("pixi_kernel_cache_requests_total", cache="lock-index", result="hit")
+    misses = sample("pixi_kernel_cache_requests_total", cache="lock-index", result="miss")
+
+    await get_lock_index(lockfile)
+    await get_lock_index(lockfile)
+
+    assert sample("pixi_kernel_cache_requests_total", cache="lock-index", result="miss") == (
+        misses + 1
+    )
+    assert sample("pixi_kernel_cache_requests_total", cache="lock-index", result="hit") == hits + 1
+    assert b"pixi_kernel_launches_in_progress" in generate_metrics()
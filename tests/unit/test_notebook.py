@@ -0,0 +1,88 @@
+import json
+from pathlib import Path
+
+import pixi_kernel.notebook
+import pytest
+from pixi_kernel.notebook import NotebookMetadataError, read_notebook_environment
+
+
+@pytest.fixture(autouse=True)
+def _clear_notebook_cache():
+    pixi_kernel.notebook._notebook_cache.clear()
+
+
+def write_notebook(path: Path, metadata: dict, *, sort_keys: bool = True) -> Path:
+    notebook = {
+        "cells": [
+            {
+                "cell_type": "code",
+                "metadata": {"tags": ['"metadata": {}', "\\"]},
+                "outputs": [{"data": {"image/png": "A" * 100_000}, "metadata": {}}],
+                "source": ['print("\\"metadata\\": []")'],
+            }
+        ],
+        "nbformat": 4,
+        "nbformat_minor": 5,
+        "metadata": metadata,
+    }
+    path.write_text(json.dumps(notebook, indent=1, sort_keys=sort_keys))
+    return path
+
+
+METADATA = {
+    "kernelspec": {"name": "python3"},
+    "pixi-kernel": {"environment": "test"},
+    "widgets": {"state": {"metadata": {"nested": True}}},
+}
+
+
+@pytest.mark.parametrize("sort_keys", [True, False])
+def test_read_environment(tmp_path: Path, sort_keys: bool):
+    notebook = write_notebook(tmp_path / "notebook.ipynb", METADATA, sort_keys=sort_keys)
+    assert read_notebook_environment(notebook) == "test"
+
+
+@pytest.mark.parametrize("sort_keys", [True, False])
+def test_scan_across_chunks(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, sort_keys: bool):
+    # Only scanning from the start of the notebook, in chunks that split strings and escapes
+    monkeypatch.setattr(pixi_kernel.notebook, "TAIL_SIZES", ())
+    notebook = write_notebook(tmp_path / "notebook.ipynb", METADATA, sort_keys=sort_keys)
+    for chunk_size in (1, 2, 3, 7, 4096):
+        monkeypatch.setattr(pixi_kernel.notebook, "CHUNK_SIZE", chunk_size)
+        pixi_kernel.notebook._notebook_cache.clear()
+        assert read_notebook_environment(notebook) == "test"
+
+
+@pytest.mark.parametrize("metadata", [{}, {"pixi-kernel": {}}, {"pixi-kernel": None}])
+def test_missing_environment(tmp_path: Path, metadata: dict):
+    notebook = write_notebook(tmp_path / "notebook.ipynb", metadata)
+    with pytest.raises(NotebookMetadataError):
+        read_notebook_environment(notebook)
+
+
+@pytest.mark.parametrize("content", ["", "{}", "[]", '{"metadata": 1}', "not JSON"])
+def test_invalid_notebook(tmp_path: Path, content: str):
+    notebook = tmp_path / "notebook.ipynb"
+    notebook.write_text(content)
+    with pytest.raises(NotebookMetadataError):
+        read_notebook_environment(notebook)
+
+
+def test_missing_notebook(tmp_path: Path):
+    with pytest.raises(FileNotFoundError):
+        read_notebook_environment(tmp_path / "notebook.ipynb")
+
+
+def test_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    notebook = write_notebook(tmp_path / "notebook.ipynb", METADATA)
+    assert read_notebook_environment(notebook) == "test"
+
+    def fail(*args, **kwargs):
+        raise AssertionError("notebook read again")
+
+    monkeypatch.setattr(pixi_kernel.notebook, "_read_metadata", fail)
+    assert read_notebook_environment(notebook) == "test"
+
+    monkeypatch.undo()
+    write_notebook(notebook, {"pixi-kernel": {"environment": "other"}})
+    assert read_notebook_environment(notebook) == "other"
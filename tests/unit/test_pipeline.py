@@ -0,0 +1,83 @@
+import asyncio
+import logging
+
+from pixi_kernel.pipeline import Step, run_steps
+from returns.result import Failure, Success
+
+logger = logging.getLogger("pixi_kernel")
+
+
+async def test_independent_steps_run_concurrently():
+    started: list[str] = []
+
+    async def slow(name: str):
+        started.append(name)
+        await asyncio.sleep(0.1)
+        return Success(name)
+
+    async def combine(a: str, b: str):
+        return Success(a + b)
+
+    steps = [
+        Step("a", lambda: slow("a")),
+        Step("b", lambda: slow("b")),
+        Step("ab", combine, depends_on=("a", "b")),
+    ]
+    result = await asyncio.wait_for(run_steps(steps, logger=logger), timeout=0.19)
+    assert result.unwrap() == {"a": "a", "b": "b", "ab": "ab"}
+    assert started == ["a", "b"]
+
+
+async def test_failure_cancels_later_steps():
+    cancelled = asyncio.Event()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        return Failure("failed")
+
+    async def wait_forever():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return Success(None)
+
+    steps = [Step("fail", fail), Step("wait", wait_forever)]
+    result = await asyncio.wait_for(run_steps(steps, logger=logger), timeout=1)
+    assert result == Failure("failed")
+    assert cancelled.is_set()
+
+
+async def test_earliest_failure_is_reported():
+    async def fail_slowly():
+        await asyncio.sleep(0.05)
+        return Failure("first")
+
+    async def fail_fast():
+        return Failure("second")
+
+    steps = [Step("first", fail_slowly), Step("second", fail_fast)]
+    result = await run_steps(steps, logger=logger)
+    assert result == Failure("first")
+
+
+async def test_cancelled_step_does_not_cancel_its_dependencies():
+    async def slow():
+        await asyncio.sleep(0.05)
+        return Failure("slow")
+
+    async def fail_fast():
+        return Failure("fast")
+
+    async def dependent(slow: None):
+        return Success(None)
+
+    # The failure of "fast" cancels "dependent" while it waits for "slow"
+    steps = [
+        Step("slow", slow),
+        Step("fast", fail_fast),
+        Step("dependent", dependent, depends_on=("slow",)),
+    ]
+    result = await asyncio.wait_for(run_steps(steps, logger=logger), timeout=1)
+    assert result == Failure("slow")
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import msgspec
+import pytest
+from pixi_kernel.pool import KernelPool, LaunchTemplate
+
+KEY = ("/project", "default", "/kernels/pixi-kernel-python3")
+FINGERPRINT = (None, None, None)
+
+
+@pytest.fixture
+def pool():
+    pool = KernelPool()
+    yield pool
+    pool.clear()
+
+
+@pytest.fixture
+def template(tmp_path: Path) -> LaunchTemplate:
+    connection_file = str(tmp_path / "kernel-1234.json")
+    return LaunchTemplate(
+        cmd=[sys.executable, "-c", "import time; time.sleep(60)", connection_file],
+        connection_file=connection_file,
+        launch_kwargs={"env": {"JPY_SESSION_NAME": "notebook.ipynb"}},
+        ip="127.0.0.1",
+        transport="tcp",
+        signature_scheme="hmac-sha256",
+        kernel_name="pixi-kernel-python3",
+    )
+
+
+async def refill(pool: KernelPool, template: LaunchTemplate, **kwargs) -> None:
+    options = {"size": 2, "max_kernels": 8, "idle_ttl": 60, "logger": logging.getLogger()}
+    await pool.refill(KEY, FINGERPRINT, template, **{**options, **kwargs})
+
+
+async def test_take_pooled_kernel(pool: KernelPool, template: LaunchTemplate):
+    await refill(pool, template)
+    assert len(pool) == 2
+
+    kernel = pool.take(KEY, FINGERPRINT)
+    assert kernel is not None
+    assert kernel.process.poll() is None
+    assert kernel.connection_file.is_file()
+    assert kernel.process.args[-1] == str(kernel.connection_file)
+    assert len(pool) == 1
+    kernel.discard()
+
+
+async def test_pool_max_kernels(pool: KernelPool, template: LaunchTemplate):
+    await refill(pool, template, size=4, max_kernels=3)
+    assert len(pool) == 3
+
+
+async def test_evict_on_fingerprint_change(pool: KernelPool, template: LaunchTemplate):
+    await refill(pool, template)
+    assert pool.take(KEY, (None, None, (1, 2, 3))) is None
+    assert len(pool) == 0
+
+
+async def test_evict_expired(pool: KernelPool, template: LaunchTemplate):
+    await refill(pool, template)
+    pool.evict_expired(idle_ttl=0)
+    assert len(pool) == 0
+
+
+async def test_refill_does_not_block_the_event_loop(
+    pool: KernelPool, template: LaunchTemplate, monkeypatch: pytest.MonkeyPatch
+):
+    start_kernel = KernelPool._start_kernel
+    threads: list[str] = []
+
+    def record_thread(*args):
+        threads.append(threading.current_thread().name)
+        return start_kernel(*args)
+
+    monkeypatch.setattr(KernelPool, "_start_kernel", staticmethod(record_thread))
+    await refill(pool, template)
+    assert len(threads) == 2
+    assert threading.main_thread().name not in threads
+
+
+async def test_expired_kernels_are_evicted_by_a_single_timer(
+    pool: KernelPool, template: LaunchTemplate
+):
+    await refill(pool, template, idle_ttl=0.05)
+    await refill(pool, template, size=3, idle_ttl=0.05)
+    assert len(pool) == 3
+    await asyncio.sleep(0.2)
+    assert len(pool) == 0
+    assert pool._expiry is None
+
+
+def is_running(pid: int) -> bool:
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except FileNotFoundError:
+        return False
+    # Killed children of killed processes may never be reaped in containers
+    return stat.rsplit(")", 1)[1].split()[0] not in ("Z", "X")
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="Reads the process state from /proc")
+async def test_discard_kills_the_process_group(pool: KernelPool, template: LaunchTemplate):
+    # Like `pixi run`, which starts the kernel as its own child
+    grandchild = [sys.executable, "-c", "import time; time.sleep(60)"]
+    child = (
+        f"import subprocess, time; print(subprocess.Popen({grandchild!r}).pid, flush=True); "
+        "time.sleep(60)"
+    )
+    template = msgspec.structs.replace(
+        template, cmd=[sys.executable, "-c", child], launch_kwargs={"stdout": subprocess.PIPE}
+    )
+    await refill(pool, template, size=1)
+    kernel = pool.take(KEY, FINGERPRINT)
+    assert kernel is not None
+    assert kernel.process.stdout is not None
+    grandchild_pid = int(await asyncio.to_thread(kernel.process.stdout.readline))
+    assert is_running(grandchild_pid)
+
+    kernel.discard()
+    assert kernel.process.returncode is not None
+    for _ in range(50):
+        if not is_running(grandchild_pid):
+            break
+        await asyncio.sleep(0.01)
+    assert not is_running(grandchild_pid)
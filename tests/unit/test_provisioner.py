@@ -0,0 +1,213 @@
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Any
+
+import pixi_kernel.compatibility
+import pixi_kernel.readiness
+import pytest
+from jupyter_client.kernelspec import KernelSpec
+from jupyter_client.manager import KernelManager
+from jupyter_client.provisioning.local_provisioner import LocalProvisioner
+from pixi_kernel.pool import KernelPool, LaunchTemplate
+from pixi_kernel.provisioner import PixiKernelProvisioner
+from pixi_kernel.types import Environment
+from returns.result import Failure, Success
+
+
+def write_notebook(path: Path, environment: str) -> None:
+    metadata = {"pixi-kernel": {"environment": environment}}
+    path.write_text(json.dumps({"cells": [], "metadata": metadata, "nbformat": 4}))
+
+
+class Launcher:
+    def __init__(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        self.project = tmp_path / "project"
+        self.project.mkdir()
+        (self.project / "pixi.toml").write_text("[workspace]\n")
+        self.notebook = self.project / "notebook.ipynb"
+        write_notebook(self.notebook, "default")
+
+        self.prefix = self.project / ".pixi" / "envs" / "default"
+        (self.prefix / "conda-meta").mkdir(parents=True)
+        pixi = tmp_path / "pixi"
+        pixi.write_text("")
+
+        self.resource_dir = tmp_path / "kernel"
+        self.resource_dir.mkdir()
+        kernel_json = {
+            "argv": ["pixi", "run", "python", "-m", "ipykernel", "-f", "{connection_file}"],
+            "display_name": "Pixi - Python 3 (ipykernel)",
+            "language": "python",
+            "metadata": {"pixi-kernel": {"required-package": "ipykernel"}},
+        }
+        (self.resource_dir / "kernel.json").write_text(json.dumps(kernel_json))
+
+        self.readiness_checks: list[str] = []
+        self.broken = False
+
+        async def verify_env_readiness(*, environment_name: Any, **kwargs: Any):
+            name = await environment_name
+            self.readiness_checks.append(name)
+            if self.broken:
+                return Failure("The project is broken.")
+            prefix = str(self.prefix)
+            return Success(
+                Environment(name=name, dependencies=[], pypi_dependencies=[], prefix=prefix)
+            )
+
+        self.pixi_found = True
+
+        async def get_pixi_binary():
+            return Success(str(pixi)) if self.pixi_found else Failure(None)
+
+        async def pre_launch(provisioner: LocalProvisioner, **kwargs: Any) -> dict[str, Any]:
+            return kwargs
+
+        monkeypatch.setattr(pixi_kernel.readiness, "verify_env_readiness", verify_env_readiness)
+        monkeypatch.setattr(pixi_kernel.compatibility, "get_pixi_binary", get_pixi_binary)
+        monkeypatch.setattr(LocalProvisioner, "pre_launch", pre_launch)
+
+        self.provisioner = PixiKernelProvisioner(
+            kernel_id="kernel", kernel_spec=KernelSpec.from_resource_dir(str(self.resource_dir))
+        )
+        self.provisioner.log = logging.getLogger("test")
+
+    def set_metadata(self, **metadata: str) -> None:
+        # Kernel managers read the kernel spec, with its metadata, before creating the provisioner
+        kernel_spec = self.provisioner.kernel_spec
+        kernel_spec.metadata["pixi-kernel"].update(metadata)
+        (self.resource_dir / "kernel.json").write_text(kernel_spec.to_json())
+
+    async def launch(self) -> list[str]:
+        env = {"JPY_SESSION_NAME": str(self.notebook), "PATH": ""}
+        await self.provisioner.pre_launch(cwd=str(self.project), env=env)
+        # Set once the kernel process is started
+        self.provisioner._launched = True
+        return list(self.provisioner.kernel_spec.argv)
+
+
+@pytest.fixture
+def launcher(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Launcher:
+    return Launcher(tmp_path, monkeypatch)
+
+
+async def test_restart_reuses_launch_state(launcher: Launcher):
+    argv = await launcher.launch()
+    assert argv[:4] == [str(launcher.project.parent / "pixi"), "run", "--environment", "default"]
+    assert await launcher.launch() == argv
+    assert await launcher.launch() == argv
+    assert launcher.readiness_checks == ["default"]
+
+
+async def test_restart_after_project_change(launcher: Launcher):
+    await launcher.launch()
+    (launcher.project / "pixi.toml").write_text("[workspace]\nname = 'changed'\n")
+    await launcher.launch()
+    assert launcher.readiness_checks == ["default", "default"]
+
+
+async def test_restart_after_install(launcher: Launcher):
+    await launcher.launch()
+    conda_meta = launcher.prefix / "conda-meta"
+    (conda_meta / "numpy-2.0.0.json").write_text("{}")
+    # Directory timestamps can be coarser than the time between the two launches
+    os.utime(conda_meta, ns=(0, 0))
+    await launcher.launch()
+    assert launcher.readiness_checks == ["default", "default"]
+
+
+async def test_restart_after_notebook_change(launcher: Launcher):
+    await launcher.launch()
+    # Saving the notebook doesn't invalidate the launch state, selecting another environment does
+    write_notebook(launcher.notebook, "default")
+    await launcher.launch()
+    assert launcher.readiness_checks == ["default"]
+
+    write_notebook(launcher.notebook, "test")
+    argv = await launcher.launch()
+    assert argv[2:4] == ["--environment", "test"]
+    assert launcher.readiness_checks == ["default", "test"]
+
+
+async def test_restart_after_fallback(launcher: Launcher):
+    await launcher.launch()
+    launcher.broken = True
+    (launcher.project / "pixi.toml").write_text("[workspace]\nname = 'broken'\n")
+    argv = await launcher.launch()
+    assert argv[1:3] == ["-m", "pixi_kernel"]
+
+    # The fix may not touch the project files, e.g. a network drive that came back
+    launcher.broken = False
+    await launcher.launch()
+    await launcher.launch()
+    assert launcher.readiness_checks == ["default", "default", "default"]
+
+
+@pytest.mark.parametrize(
+    ("policy", "options"),
+    [
+        ("strict", []),
+        ("locked", ["--locked"]),
+        ("frozen", ["--frozen"]),
+        ("trusted", ["--frozen", "--no-install"]),
+    ],
+)
+async def test_launch_policy(launcher: Launcher, policy: str, options: list[str]):
+    launcher.set_metadata(**{"launch-policy": policy})
+    argv = await launcher.launch()
+    assert argv[1:] == [
+        "run",
+        *options,
+        "--environment",
+        "default",
+        *["python", "-m", "ipykernel", "-f", "{connection_file}"],
+    ]
+
+
+async def test_invalid_launch_policy(launcher: Launcher):
+    launcher.set_metadata(**{"launch-policy": "yolo"})
+    argv = await launcher.launch()
+    assert argv[1:3] == ["-m", "pixi_kernel"]
+    assert "launch-policy" in argv[-1]
+
+
+async def test_launch_without_pixi(launcher: Launcher):
+    # Like the trusted policy, which doesn't run Pixi before the kernel
+    launcher.pixi_found = False
+    argv = await launcher.launch()
+    assert argv[1:3] == ["-m", "pixi_kernel"]
+    assert "Pixi was not detected" in argv[-1]
+
+
+async def test_adopt_pooled_kernel(launcher: Launcher, tmp_path: Path):
+    # The kernel manager writes its own connection file before launching
+    km = KernelManager(connection_file=str(tmp_path / "kernel-1234.json"))
+    km.write_connection_file()
+    template = LaunchTemplate(
+        cmd=[sys.executable, "-c", "import time; time.sleep(60)", km.connection_file],
+        connection_file=km.connection_file,
+        launch_kwargs={},
+        ip=km.ip,
+        transport=km.transport,
+        signature_scheme=km.session.signature_scheme,
+        kernel_name=km.kernel_name,
+    )
+    kernel = KernelPool._start_kernel((None, None, None), template)
+    try:
+        pooled_info = json.loads(kernel.connection_file.read_text())
+        connection_info = await launcher.provisioner._adopt_pooled_kernel(
+            kernel, cwd=str(launcher.project)
+        )
+        assert launcher.provisioner.pid == kernel.process.pid
+        assert not kernel.connection_file.exists()
+
+        # What the kernel manager does with the connection info returned by `launch_kernel`
+        km._reconcile_connection_info(connection_info)
+        assert km.session.key == pooled_info["key"].encode()
+        assert km.shell_port == pooled_info["shell_port"]
+        assert json.loads(Path(km.connection_file).read_text()) == pooled_info  # noqa: ASYNC240
+    finally:
+        kernel.discard()
@@ -1,9 +1,12 @@
+import asyncio
 import logging
 import os
 import subprocess
 import sys
 from pathlib import Path
 
+import pixi_kernel.compatibility
+import pixi_kernel.readiness
 import pytest
 from pixi_kernel.compatibility import (
     MINIMUM_PIXI_VERSION,
@@ -12,6 +15,8 @@ from pixi_kernel.compatibility import (
     PIXI_VERSION_ERROR,
 )
 from pixi_kernel.readiness import PIXI_KERNEL_NOT_FOUND, verify_env_readiness
+from pixi_kernel.types import Environment, PixiInfo, Project
+from returns.result import Success
 
 data_dir = Path(__file__).parent / "data"
 
@@ -126,6 +131,37 @@ async def test_pyproject_project(kwargs: dict):
     assert Path(environment.prefix).parts[-2:] == ("envs", "default")
 
 
+@pytest.fixture
+def installed_project(tmp_path: Path) -> Path:
+    (tmp_path / "pixi.toml").write_text("[workspace]\n")
+    (tmp_path / ".pixi" / "envs" / "default" / "conda-meta").mkdir(parents=True)
+    return tmp_path
+
+
+async def test_trusted_installed_environment(
+    kwargs: dict, installed_project: Path, monkeypatch: pytest.MonkeyPatch
+):
+    async def subprocess_exec(*args, **kwargs):
+        raise AssertionError("Pixi must not run")
+
+    monkeypatch.setattr(pixi_kernel.compatibility, "find_pixi_binary", lambda: Success("pixi"))
+    monkeypatch.setattr(pixi_kernel.compatibility, "subprocess_exec", subprocess_exec)
+    kwargs["cwd"] = installed_project
+    kwargs["policy"] = "trusted"
+
+    result = await verify_env_readiness(**kwargs)
+    assert result.unwrap().prefix == str(installed_project / ".pixi" / "envs" / "default")
+
+
+@pytest.mark.usefixtures("_patch_find_pixi_binary")
+async def test_trusted_without_pixi(kwargs: dict, installed_project: Path):
+    kwargs["cwd"] = installed_project
+    kwargs["policy"] = "trusted"
+
+    result = await verify_env_readiness(**kwargs)
+    assert result.failure() == PIXI_NOT_FOUND
+
+
 async def test_transitive_dependency(kwargs: dict):
     kwargs["environment_name"] = "test"
     kwargs["cwd"] = data_dir / "transitive_dependency"
@@ -134,6 +170,59 @@ async def test_transitive_dependency(kwargs: dict):
     assert Path(environment.prefix).parts[-2:] == ("envs", "test")
 
 
+@pytest.fixture
+def slow_install(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Mock Pixi for the `transitive_dependency` project, with an install that never finishes."""
+    project = data_dir / "transitive_dependency"
+    info = PixiInfo(
+        environments=[
+            Environment(name=name, dependencies=[], pypi_dependencies=[], prefix=f"/envs/{name}")
+            for name in ("default", "test")
+        ],
+        project=Project(manifest_path=str(project / "pixi.toml")),
+    )
+    pixi_commands: list[str] = []
+
+    async def succeed(**kwargs):
+        return Success(None)
+
+    async def get_pixi_info(**kwargs):
+        return Success(info)
+
+    async def install_environment(**kwargs):
+        await asyncio.Event().wait()
+
+    async def run_pixi(*args: str, **kwargs):
+        pixi_commands.append(args[0])
+        return 0, "[]", ""
+
+    monkeypatch.setattr(pixi_kernel.readiness, "has_compatible_pixi", succeed)
+    monkeypatch.setattr(pixi_kernel.readiness, "get_pixi_binary", succeed)
+    monkeypatch.setattr(pixi_kernel.readiness, "get_pixi_info", get_pixi_info)
+    monkeypatch.setattr(pixi_kernel.readiness, "install_environment", install_environment)
+    monkeypatch.setattr(pixi_kernel.readiness, "run_pixi", run_pixi)
+    return pixi_commands
+
+
+async def test_missing_package_in_frozen_lockfile(kwargs: dict, slow_install: list[str]):
+    # The lockfile is used as it is, so the launch fails without waiting for `pixi install`
+    kwargs["policy"] = "frozen"
+    result = await asyncio.wait_for(verify_env_readiness(**kwargs), 1)
+    assert result.failure() == PIXI_KERNEL_NOT_FOUND.format(
+        kernel_name="Pixi", required_package="ipykernel", prefix="/envs/default"
+    )
+    assert slow_install == []
+
+
+async def test_missing_package_in_lockfile_waits_for_install(
+    kwargs: dict, slow_install: list[str]
+):
+    # `pixi install` may still update the lockfile, `pixi list` checks once it is done
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(verify_env_readiness(**kwargs), 0.2)
+    assert slow_install == []
+
+
 @pytest.fixture
 def env_for_pixi_in_pixi():
     cwd = data_dir / "pixi_in_pixi"
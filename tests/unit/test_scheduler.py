@@ -0,0 +1,175 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+import pytest
+from pixi_kernel.scheduler import (
+    PixiBusyError,
+    PixiScheduler,
+    Priority,
+    current_priority,
+    pixi_priority,
+)
+from pixi_kernel.singleflight import SingleFlight
+
+
+async def hold(
+    scheduler: PixiScheduler,
+    project: Path | None,
+    priority: Priority,
+    release: asyncio.Event,
+    order: list[str],
+    name: str,
+) -> None:
+    async with scheduler.slot(project, priority):
+        order.append(name)
+        await release.wait()
+
+
+async def test_waiters_run_by_priority_then_arrival():
+    scheduler = PixiScheduler(concurrency=1, project_concurrency=1, queue_limit=10)
+    release = asyncio.Event()
+    order: list[str] = []
+
+    tasks = [asyncio.create_task(hold(scheduler, None, Priority.LAUNCH, release, order, "first"))]
+    await asyncio.sleep(0)
+    for name, priority in [
+        ("warm-up", Priority.WARM_UP),
+        ("envs", Priority.ENVS),
+        ("launch-1", Priority.LAUNCH),
+        ("launch-2", Priority.LAUNCH),
+    ]:
+        tasks.append(asyncio.create_task(hold(scheduler, None, priority, release, order, name)))
+        await asyncio.sleep(0)
+    assert scheduler.running == 1
+    assert scheduler.queued == 4
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert order == ["first", "launch-1", "launch-2", "envs", "warm-up"]
+    assert scheduler.running == 0
+
+
+async def test_busy_project_does_not_block_others(tmp_path: Path):
+    scheduler = PixiScheduler(concurrency=4, project_concurrency=1, queue_limit=10)
+    release = asyncio.Event()
+    order: list[str] = []
+    busy, other = tmp_path / "busy", tmp_path / "other"
+
+    tasks = [
+        asyncio.create_task(hold(scheduler, busy, Priority.LAUNCH, release, order, "busy-1")),
+        asyncio.create_task(hold(scheduler, busy, Priority.LAUNCH, release, order, "busy-2")),
+        asyncio.create_task(hold(scheduler, other, Priority.LAUNCH, release, order, "other")),
+    ]
+    await asyncio.sleep(0.01)
+    assert order == ["busy-1", "other"]
+    assert scheduler.queued == 1
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert order == ["busy-1", "other", "busy-2"]
+
+
+async def test_rejects_when_the_queue_is_full():
+    scheduler = PixiScheduler(concurrency=1, project_concurrency=1, queue_limit=1)
+    release = asyncio.Event()
+    order: list[str] = []
+
+    running = asyncio.create_task(hold(scheduler, None, Priority.LAUNCH, release, order, "a"))
+    await asyncio.sleep(0)
+    warm_up = asyncio.create_task(hold(scheduler, None, Priority.WARM_UP, release, order, "b"))
+    await asyncio.sleep(0)
+
+    # Lower priority waiters don't count against launches
+    launch = asyncio.create_task(hold(scheduler, None, Priority.LAUNCH, release, order, "c"))
+    await asyncio.sleep(0)
+    assert scheduler.queued == 2
+
+    with pytest.raises(PixiBusyError, match="1 Pixi commands are already waiting"):
+        async with scheduler.slot(None, Priority.LAUNCH):
+            pass
+
+    release.set()
+    await asyncio.gather(running, warm_up, launch)
+    assert order == ["a", "c", "b"]
+
+
+async def test_cancelled_waiter_leaves_the_queue():
+    scheduler = PixiScheduler(concurrency=1, project_concurrency=1, queue_limit=10)
+    release = asyncio.Event()
+    order: list[str] = []
+
+    running = asyncio.create_task(hold(scheduler, None, Priority.LAUNCH, release, order, "a"))
+    await asyncio.sleep(0)
+    waiting = asyncio.create_task(hold(scheduler, None, Priority.LAUNCH, release, order, "b"))
+    await asyncio.sleep(0)
+    assert scheduler.queued == 1
+
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert scheduler.queued == 0
+
+    release.set()
+    await running
+    assert scheduler.running == 0
+
+
+async def join_flight(
+    flights: SingleFlight[str, None], priority: Priority, install: Callable[[], Awaitable[None]]
+) -> None:
+    with pixi_priority(priority):
+        await flights.run("install", install)
+
+
+async def test_flight_waits_with_the_highest_priority_of_its_callers():
+    scheduler = PixiScheduler(concurrency=1, project_concurrency=1, queue_limit=10)
+    release = asyncio.Event()
+    order: list[str] = []
+    flights: SingleFlight[str, None] = SingleFlight()
+
+    async def install() -> None:
+        async with scheduler.slot(None, current_priority()):
+            order.append("install")
+
+    running = asyncio.create_task(hold(scheduler, None, Priority.LAUNCH, release, order, "a"))
+    await asyncio.sleep(0)
+    envs = asyncio.create_task(hold(scheduler, None, Priority.ENVS, release, order, "envs"))
+    warm_up = asyncio.create_task(join_flight(flights, Priority.WARM_UP, install))
+    await asyncio.sleep(0.01)
+    assert scheduler.queued == 2
+
+    # A launch joining the queued warm-up moves it ahead of the environment list
+    launch = asyncio.create_task(join_flight(flights, Priority.LAUNCH, install))
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(running, envs, warm_up, launch)
+    assert order == ["a", "install", "envs"]
+
+
+async def test_flight_is_not_rejected_as_its_first_caller():
+    scheduler = PixiScheduler(concurrency=1, project_concurrency=1, queue_limit=1)
+    release = asyncio.Event()
+    start_install = asyncio.Event()
+    order: list[str] = []
+    flights: SingleFlight[str, None] = SingleFlight()
+
+    async def install() -> None:
+        await start_install.wait()
+        async with scheduler.slot(None, current_priority()):
+            order.append("install")
+
+    running = asyncio.create_task(hold(scheduler, None, Priority.LAUNCH, release, order, "a"))
+    await asyncio.sleep(0)
+    envs = asyncio.create_task(hold(scheduler, None, Priority.ENVS, release, order, "envs"))
+    warm_up = asyncio.create_task(join_flight(flights, Priority.WARM_UP, install))
+    await asyncio.sleep(0)
+    launch = asyncio.create_task(join_flight(flights, Priority.LAUNCH, install))
+    await asyncio.sleep(0)
+
+    # A warm-up would be rejected behind the environment list, a launch waits
+    start_install.set()
+    await asyncio.sleep(0.01)
+    release.set()
+    await asyncio.gather(running, envs, warm_up, launch)
+    assert order == ["a", "install", "envs"]
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+from pixi_kernel.singleflight import SingleFlight
+
+
+async def test_concurrent_calls_share_a_run():
+    flights: SingleFlight[str, int] = SingleFlight()
+    calls = 0
+
+    async def work() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    assert await asyncio.gather(*(flights.run("key", work) for _ in range(3))) == [1, 1, 1]
+    assert "key" not in flights
+
+    # Calls after the shared run is done start a new one
+    assert await flights.run("key", work) == 2
+
+
+async def test_exceptions_propagate_to_all_callers():
+    flights: SingleFlight[str, int] = SingleFlight()
+
+    async def fail() -> int:
+        await asyncio.sleep(0.01)
+        raise RuntimeError("failed")
+
+    results = await asyncio.gather(
+        flights.run("key", fail), flights.run("key", fail), return_exceptions=True
+    )
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+async def test_cancelling_a_caller_keeps_the_shared_run():
+    flights: SingleFlight[str, str] = SingleFlight()
+    started = asyncio.Event()
+
+    async def work() -> str:
+        started.set()
+        await asyncio.sleep(0.05)
+        return "done"
+
+    first = asyncio.create_task(flights.run("key", work))
+    await started.wait()
+    second = asyncio.create_task(flights.run("key", work))
+    first.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert await second == "done"
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import threading
+from pathlib import Path
+
+import pixi_kernel.compatibility
+import pixi_kernel.info
+import pytest
+from pixi_kernel.fingerprint import project_fingerprint
+from pixi_kernel.info import get_pixi_info
+from pixi_kernel.store import Store, configure_store, get_store
+from returns.result import Success
+
+
+@pytest.fixture
+def store(tmp_path: Path):
+    configure_store(str(tmp_path / "store"))
+    store = get_store()
+    assert store is not None
+    yield store
+    configure_store(None)
+
+
+async def test_fingerprint_must_match(store: Store):
+    await store.put("namespace", "key", (1, 2, 3), {"a": [1, 2]})
+    assert await store.get("namespace", "key", (1, 2, 3), dict[str, list[int]]) == {"a": [1, 2]}
+    assert await store.get("namespace", "key", (1, 2, 4), dict[str, list[int]]) is None
+    assert await store.get("namespace", "other", (1, 2, 3), dict[str, list[int]]) is None
+    # Values that don't match the expected type are misses
+    assert await store.get("namespace", "key", (1, 2, 3), str) is None
+
+
+async def test_unusable_directory(tmp_path: Path):
+    (tmp_path / "file").write_text("")
+    store = Store(tmp_path / "file")
+    await store.put("namespace", "key", (), "value")
+    assert await store.get("namespace", "key", (), str) is None
+
+
+async def test_store_runs_off_the_event_loop(store: Store, monkeypatch: pytest.MonkeyPatch):
+    threads: list[str] = []
+    get = store._get
+
+    def record_thread(*args):
+        threads.append(threading.current_thread().name)
+        return get(*args)
+
+    monkeypatch.setattr(store, "_get", record_thread)
+    assert await store.get("namespace", "key", (), str) is None
+    assert threads[0].startswith("pixi-kernel-fs")
+
+
+async def test_concurrent_connections(tmp_path: Path):
+    # Stores with their own connection, like Jupyter servers in different processes
+    async def write_entries(worker: int) -> None:
+        store = Store(tmp_path)
+        for i in range(50):
+            await store.put("namespace", f"{worker}-{i}", (), i)
+        store.close()
+
+    await asyncio.gather(*(write_entries(worker) for worker in range(4)))
+
+    store = Store(tmp_path)
+    for worker in range(4):
+        for i in range(50):
+            assert await store.get("namespace", f"{worker}-{i}", (), int) == i
+
+
+async def test_pixi_info_survives_restarts(
+    tmp_path: Path, store: Store, monkeypatch: pytest.MonkeyPatch
+):
+    (tmp_path / "pixi.toml").write_text("[workspace]\n")
+    calls = 0
+
+    async def mock_subprocess_exec(cmd, *args, **kwargs):
+        nonlocal calls
+        calls += 1
+        info = {
+            "project_info": {"manifest_path": str(tmp_path / "pixi.toml")},
+            "environments_info": [],
+        }
+        return 0, json.dumps(info), ""
+
+    monkeypatch.setattr(pixi_kernel.compatibility, "find_pixi_binary", lambda: Success("pixi"))
+    monkeypatch.setattr(pixi_kernel.compatibility, "subprocess_exec", mock_subprocess_exec)
+
+    first = await get_pixi_info(cwd=tmp_path, env={})
+    # A new server process starts with empty in-memory caches
+    pixi_kernel.info._pixi_info_cache.clear()
+    second = await get_pixi_info(cwd=tmp_path, env={})
+
+    assert first.unwrap() == second.unwrap()
+    assert calls == 1
+    assert (
+        await store.get("pixi-info", str(tmp_path), project_fingerprint(tmp_path), dict)
+        is not None
+    )
@@ -0,0 +1,84 @@
+import asyncio
+import json
+import logging
+import threading
+from pathlib import Path
+
+import pytest
+from pixi_kernel.pipeline import Step, run_steps
+from pixi_kernel.tracing import configure_tracing, flush_tracing, span, start_span, use_span
+from returns.result import Failure, Success
+
+
+@pytest.fixture
+def trace_file(tmp_path: Path):
+    trace_file = tmp_path / "traces" / "launches.jsonl"
+    configure_tracing(trace_file=str(trace_file), opentelemetry=False)
+    yield trace_file
+    configure_tracing(trace_file=None, opentelemetry=False)
+
+
+def read_spans(trace_file: Path) -> dict[str, dict]:
+    assert flush_tracing(timeout=5)
+    spans = [json.loads(line) for line in trace_file.read_text().splitlines()]
+    return {span["name"]: span for span in spans}
+
+
+async def test_nested_spans(trace_file: Path):
+    def read_metadata() -> None:
+        with span("metadata"):
+            pass
+
+    launch = start_span("launch", kernel="Python")
+    with use_span(launch):
+        with span("info") as info:
+            info.set(exit_code=0)
+            await asyncio.to_thread(read_metadata)
+        with pytest.raises(ValueError, match="failed"), span("install"):
+            raise ValueError("failed")
+    launch.end()
+
+    spans = read_spans(trace_file)
+    assert spans["launch"]["parent_id"] is None
+    assert spans["launch"]["attributes"] == {"kernel": "Python"}
+    assert spans["info"]["parent_id"] == spans["launch"]["span_id"]
+    assert spans["info"]["attributes"] == {"exit_code": 0}
+    assert spans["metadata"]["parent_id"] == spans["info"]["span_id"]
+    assert spans["install"]["attributes"] == {"error": "ValueError"}
+    assert {s["trace_id"] for s in spans.values()} == {spans["launch"]["trace_id"]}
+    assert spans["launch"]["duration"] >= spans["info"]["duration"]
+
+
+async def test_failed_step_is_recorded(trace_file: Path):
+    async def succeed():
+        return Success(None)
+
+    async def fail():
+        return Failure("failed")
+
+    launch = start_span("launch")
+    with use_span(launch):
+        steps = [Step("pixi", succeed), Step("info", fail)]
+        await run_steps(steps, logger=logging.getLogger("pixi_kernel"))
+    launch.end()
+
+    spans = read_spans(trace_file)
+    assert spans["launch"]["attributes"] == {"failed_step": "info"}
+    assert spans["pixi"]["attributes"] == {"failed": False}
+    assert spans["info"]["attributes"] == {"failed": True}
+
+
+async def test_spans_are_written_by_a_thread(trace_file: Path, monkeypatch: pytest.MonkeyPatch):
+    threads: list[str] = []
+    mkdir = Path.mkdir
+
+    def record_thread(self: Path, *args, **kwargs) -> None:
+        threads.append(threading.current_thread().name)
+        mkdir(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "mkdir", record_thread)
+    with span("launch"):
+        pass
+
+    assert "launch" in read_spans(trace_file)
+    assert threads == ["pixi-kernel-trace"]
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import logging
+from pathlib import Path
+
+import pixi_kernel.compatibility
+import pytest
+from pixi_kernel.warmup import find_pixi_projects, warm_up_projects
+from returns.result import Success
+
+
+def test_find_pixi_projects(tmp_path: Path):
+    for project in ["a", "b/c", "b/c/d/e", ".hidden", "node_modules/f"]:
+        (tmp_path / project).mkdir(parents=True)
+        (tmp_path / project / "pixi.toml").write_text("[workspace]\n")
+    (tmp_path / "g").mkdir()
+    (tmp_path / "g" / "pyproject.toml").write_text("[tool.pixi.workspace]\n")
+    (tmp_path / "h").mkdir()
+    (tmp_path / "h" / "pyproject.toml").write_text("[project]\n")
+
+    projects = find_pixi_projects(tmp_path, max_depth=2, ignore=[".*", "node_modules"])
+    assert sorted(p.relative_to(tmp_path).as_posix() for p in projects) == ["a", "b/c", "g"]
+
+
+class MockPixi:
+    """Pixi for projects with a `default` and a `test` environment, `pixi info` fails in `broken`."""
+
+    def __init__(self) -> None:
+        self.installs: list[tuple[str, str]] = []
+        self.running = 0
+        self.max_running = 0
+
+    async def _run(self) -> None:
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+
+    async def subprocess_exec(self, cmd: str, *args: str, **kwargs):
+        if args == ("--version",):
+            return 0, "pixi 0.50.0\n", ""
+        assert args == ("info", "--json")
+        cwd = Path(kwargs["cwd"])
+        await self._run()
+        if cwd.name == "broken":
+            return 1, "", "Failed to parse pixi.toml"
+        info = {
+            "project_info": {"manifest_path": str(cwd / "pixi.toml")},
+            "environments_info": [
+                {
+                    "name": name,
+                    "dependencies": ["ipykernel"],
+                    "pypi_dependencies": [],
+                    "prefix": str(cwd / ".pixi" / "envs" / name),
+                }
+                for name in ("default", "test")
+            ],
+        }
+        return 0, json.dumps(info), ""
+
+    async def subprocess_stream(self, cmd: str, *args: str, cwd: Path, on_output, **kwargs):
+        assert args[0] == "install"
+        await self._run()
+        self.installs.append((Path(cwd).name, args[-1]))
+        return 0, "", ""
+
+
+@pytest.fixture
+def pixi(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> MockPixi:
+    for project in ["a", "b", "broken", "c"]:
+        (tmp_path / project).mkdir()
+        (tmp_path / project / "pixi.toml").write_text("[workspace]\n")
+
+    # The binary is fingerprinted, so that Pixi updates are noticed
+    binary = tmp_path / "bin" / "pixi"
+    binary.parent.mkdir()
+    binary.write_text("")
+
+    pixi = MockPixi()
+    monkeypatch.setattr(
+        pixi_kernel.compatibility, "find_pixi_binary", lambda: Success(str(binary))
+    )
+    monkeypatch.setattr(pixi_kernel.compatibility, "subprocess_exec", pixi.subprocess_exec)
+    monkeypatch.setattr(pixi_kernel.compatibility, "subprocess_stream", pixi.subprocess_stream)
+    return pixi
+
+
+@pytest.mark.parametrize("concurrency", [1, 2])
+async def test_warm_up_concurrency(tmp_path: Path, pixi: MockPixi, concurrency: int):
+    await warm_up_projects(
+        tmp_path, max_depth=1, ignore=[], concurrency=concurrency, logger=logging.getLogger()
+    )
+    assert len(pixi.installs) == 6
+    assert pixi.max_running == concurrency
+
+
+async def test_warm_up_failed_project(
+    tmp_path: Path, pixi: MockPixi, caplog: pytest.LogCaptureFixture
+):
+    await warm_up_projects(
+        tmp_path, max_depth=1, ignore=[], concurrency=2, logger=logging.getLogger()
+    )
+
+    # The broken project is logged and skipped, the others are still installed
+    assert f"Failed to warm up {tmp_path / 'broken'}" in caplog.text
+    assert "Failed to parse pixi.toml" in caplog.text
+    assert sorted(pixi.installs) == [
+        (project, environment) for project in "abc" for environment in ("default", "test")
+    ]
@@ -0,0 +1,59 @@
+import asyncio
+import logging
+from pathlib import Path
+
+import pixi_kernel.watcher
+import pytest
+from pixi_kernel.info import _pixi_info_cache
+from pixi_kernel.types import PixiInfo
+from pixi_kernel.watcher import ProjectWatcher
+
+
+@pytest.fixture(params=[False, True], ids=["polling", "watchfiles"])
+def _watch_backend(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch):
+    if request.param:
+        pytest.importorskip("watchfiles")
+    monkeypatch.setattr(pixi_kernel.watcher, "HAS_WATCHFILES", request.param)
+
+
+@pytest.mark.usefixtures("_watch_backend")
+async def test_watcher_invalidates_pixi_info(tmp_path: Path):
+    (tmp_path / "pixi.toml").write_text("[workspace]\n")
+    pixi_info = PixiInfo(environments=[], project=None)
+    _pixi_info_cache.put(tmp_path, ((), pixi_info))
+
+    watcher = ProjectWatcher(
+        poll_interval=0.05, reinstall=False, debounce=0, logger=logging.getLogger()
+    )
+    watcher.track(tmp_path, "default")
+    task = asyncio.create_task(watcher.run())
+    try:
+        await asyncio.sleep(0.2)
+        assert tmp_path in _pixi_info_cache
+
+        (tmp_path / "pixi.lock").write_text("version: 6\n")
+        for _ in range(50):
+            await asyncio.sleep(0.1)
+            if tmp_path not in _pixi_info_cache:
+                break
+        assert tmp_path not in _pixi_info_cache
+    finally:
+        task.cancel()
+
+
+async def test_finished_reinstalls_are_forgotten(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    installs: list[Path] = []
+
+    async def install(project_root: Path) -> None:
+        installs.append(project_root)
+
+    watcher = ProjectWatcher(
+        poll_interval=0.05, reinstall=True, debounce=0, logger=logging.getLogger()
+    )
+    monkeypatch.setattr(watcher, "_install", install)
+    watcher._on_change(tmp_path)
+    # Replaces the pending reinstall
+    watcher._on_change(tmp_path)
+    await asyncio.sleep(0.05)
+    assert installs == [tmp_path]
+    assert watcher._reinstall_tasks == {}